@@ -1,9 +1,13 @@
+import logging
 import time
 import threading
 import psutil
 import data_manager # Import the data manager module
+import metrics
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 # You might need platform-specific imports here
 # For Windows:
 try:
@@ -12,15 +16,40 @@ try:
 except ImportError:
     win32gui = None
     win32process = None
-    print("Warning: win32gui and win32process not found. Activity tracking may be limited on Windows.")
+    logger.warning("win32gui and win32process not found. Activity tracking may be limited on Windows.")
+
+
+class SystemClock:
+    """The real clock. Soak tests pass a simulated clock with the same three methods instead."""
+    def now(self):
+        return datetime.now()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def wait(self, event, timeout):
+        """Blocks until event is set or timeout seconds passed; returns True if the event was set."""
+        return event.wait(max(timeout, 0))
 
 
 class ActivityTracker:
-    def __init__(self):
+    def __init__(self, clock=None, probe=None, writer=None, sleep_interval=10):
+        """
+        clock: Provides now(), monotonic() and wait(event, timeout); defaults to SystemClock.
+        probe: Callable returning the current ActiveInfo; defaults to get_active_process_name().
+        writer: Activity writer (add()/flush()); defaults to data_manager.create_activity_writer().
+        sleep_interval: Seconds between samples; can be changed while tracking with set_interval().
+        """
         self._is_tracking = False
         self._thread = None
-        self._sleep_interval = 10 # Original sleep interval
-        self._check_interval = 0.1 # How often to check the stop flag during sleep
+        self._clock = clock or SystemClock()
+        self._probe = probe or self.get_active_process_name
+        self._sleep_interval = sleep_interval # Original sleep interval: 10
+        self._interval_changed = False
+        self._wake = threading.Event() # Set to interrupt the wait for the next sample (stop, new interval)
+        # Samples are buffered and appended in batches instead of one file write per tick
+        # (or collapsed into runs of identical activity, depending on data_manager.ACTIVITY_FORMAT)
+        self._writer = writer or data_manager.create_activity_writer(interval=sleep_interval, monotonic=self._clock.monotonic)
 
 
     def get_active_window_title(self):
@@ -68,51 +97,105 @@ class ActivityTracker:
 
 
         except Exception as e:
-            print(f"Error getting active process name: {e}")
+            logger.warning("Error getting active process name: %s", e)
             return "Tracking Error"
 
 
     def track_loop(self):
-        """The main loop for activity tracking."""
-        print("ActivityTracker: track_loop started.")
+        """
+        The main loop for activity tracking. Samples are due on a fixed grid of monotonic-clock
+        deadlines, one interval apart, so the time spent sampling and writing never pushes later
+        samples back (no drift). Between samples the thread blocks on an Event until the next
+        deadline: one wakeup per sample, and stop_tracking()/set_interval() interrupt it at once.
+        """
+        logger.info("track_loop started.")
+        next_sample = self._clock.monotonic()
         while self._is_tracking:
-            timestamp = datetime.now()
-            active_info = self.get_active_process_name() # Using simplified check
-
-            # In a real app, you'd process active_info to get meaningful app names
-            # For hackathon, let's just save the active_info string
-            data_manager.save_activity_data(timestamp, active_info)
-
-            # --- Modified sleep mechanism for faster exit ---
-            # Sleep for a short duration and check the flag repeatedly
-            sleep_remaining = self._sleep_interval
-            while sleep_remaining > 0 and self._is_tracking:
-                sleep_duration = min(sleep_remaining, self._check_interval)
-                time.sleep(sleep_duration)
-                sleep_remaining -= sleep_duration
-            # The loop exits quickly if _is_tracking becomes False
-
-
-        print("ActivityTracker: track_loop finished.")
+            with metrics.timer('tracker.tick'):
+                timestamp = self._clock.now()
+                active_info = self._probe() # Using simplified check by default
+
+                # In a real app, you'd process active_info to get meaningful app names
+                # For hackathon, let's just save the active_info string
+                self._writer.add(timestamp, active_info)
+            metrics.count('tracker.samples')
+
+            scheduled = next_sample
+            next_sample = scheduled + self._sleep_interval
+            now = self._clock.monotonic()
+            if next_sample <= now:
+                # Overran the next deadline (machine was suspended, a write stalled): skip the
+                # missed samples instead of taking them in a burst
+                missed = int((now - next_sample) // self._sleep_interval) + 1
+                metrics.count('tracker.missed_samples', missed)
+                next_sample += missed * self._sleep_interval
+
+            while self._is_tracking:
+                woken = self._clock.wait(self._wake, next_sample - self._clock.monotonic())
+                metrics.count('tracker.wakeups')
+                if not woken:
+                    break # Deadline reached
+                self._wake.clear()
+                if self._interval_changed:
+                    # The next sample is due one new interval after the last one (now, if that has passed)
+                    self._interval_changed = False
+                    next_sample = scheduled + self._sleep_interval
+            # The loop exits immediately once _is_tracking becomes False
+
+
+        logger.info("track_loop finished.")
+
+    @property
+    def sample_interval(self):
+        """Seconds between samples."""
+        return self._sleep_interval
+
+    def set_interval(self, seconds):
+        """Changes the seconds between samples, also while tracking (takes effect for the next sample)."""
+        if seconds <= 0:
+            raise ValueError("The sample interval must be positive.")
+        self._sleep_interval = seconds
+        # A run-length writer records the interval with its runs (and widens its max_gap)
+        set_writer_interval = getattr(self._writer, 'set_interval', None)
+        if set_writer_interval is not None:
+            set_writer_interval(seconds)
+        self._interval_changed = True
+        self._wake.set()
 
 
     def start_tracking(self):
         """Starts the activity tracking in a background thread."""
         if not self._is_tracking:
             self._is_tracking = True
+            self._wake.clear()
             self._thread = threading.Thread(target=self.track_loop, daemon=True) # daemon=True allows thread to exit with main app
             self._thread.start()
-            print("Activity tracking started.")
+            logger.info("Activity tracking started.")
+
+    def request_stop(self):
+        """Asks the tracking loop to exit after its current step without waiting for it (safe from any thread)."""
+        self._is_tracking = False
+        self._wake.set() # Ends the wait for the next sample right away
 
     def stop_tracking(self):
         """Stops the activity tracking thread."""
         if self._is_tracking:
-            print("ActivityTracker: Stopping tracking thread.")
-            self._is_tracking = False
-            if self._thread and self._thread.is_alive():
-                # Give the thread a moment to check the flag and exit the sleep loop
-                self._thread.join(timeout=self._sleep_interval + 1) # Wait a bit longer than the max sleep
-            print("ActivityTracker: Tracking stopped.")
+            logger.info("Stopping tracking thread.")
+            self.request_stop()
+        # Also wait for a loop that was asked to stop via request_stop()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            # The wait ends at once; only a sample that is being written can delay the exit
+            self._thread.join(timeout=self._sleep_interval + 1)
+            logger.info("Tracking stopped.")
+        # Always write out whatever is still buffered, even if tracking was already stopped
+        self.flush()
+
+    def flush(self):
+        """Writes any buffered activity samples to disk."""
+        written = self._writer.flush()
+        if written:
+            logger.info("Flushed %d buffered activity samples.", written)
+        return written
 
 # Example Usage (for testing the tracker independently):
 # if __name__ == "__main__":
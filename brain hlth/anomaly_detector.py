@@ -1,27 +1,72 @@
 import pandas as pd
+import sklearn
+from sklearn.base import clone
 from sklearn.ensemble import IsolationForest
 import numpy as np
+import hashlib
+import os
+import pickle
+import threading
+import logging
+import data_manager # For scoring data as it is written (StreamingAnomalyDetector.follow_writes)
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ANOMALY_MODEL_FILE = 'anomaly_model.pkl'
+SCORE_CHUNK_ROWS = 100_000 # Rows per decision_function call in AnomalyDetector.score()
+RUNTIME_PARAMS = ('n_jobs', 'verbose') # IsolationForest parameters that do not change the fitted model
+
+
+def model_params(model):
+    """The estimator parameters that decide what a fit produces (contamination, random_state, ...)."""
+    return {key: value for key, value in model.get_params().items() if key not in RUNTIME_PARAMS}
+
+
+def data_fingerprint(numeric_data):
+    """
+    Fingerprint of training data: row count, time range (for a DatetimeIndex), feature names and a
+    content hash. Equal fingerprints mean retraining would produce the same model.
+    """
+    row_hashes = pd.util.hash_pandas_object(numeric_data, index=True).to_numpy()
+    digest = hashlib.sha256(row_hashes.tobytes())
+    digest.update(repr(list(numeric_data.columns)).encode())
+    index = numeric_data.index
+    time_range = [index.min().isoformat(), index.max().isoformat()] \
+        if isinstance(index, pd.DatetimeIndex) and len(index) else None
+    return {'rows': len(numeric_data), 'time_range': time_range, 'hash': digest.hexdigest()}
+
 
 class AnomalyDetector:
     """
     Implements basic anomaly detection on time-series data using Isolation Forest.
+    A fitted model can be saved with its training-data fingerprint and loaded at the next start
+    (see ensure_trained), so scoring is available immediately instead of after a retrain.
     """
-    def __init__(self, contamination='auto', random_state=42):
+    def __init__(self, contamination='auto', random_state=42, n_jobs=None):
         """
         Initializes the Isolation Forest model.
         contamination: The proportion of outliers in the data set. 'auto' or a float between 0 and 0.5.
         random_state: Seed for reproducibility.
+        n_jobs: Cores used to build the trees (-1 = all, None = 1). Results do not depend on it.
         """
-        self.model = IsolationForest(contamination=contamination, random_state=random_state)
+        self.model = IsolationForest(contamination=contamination, random_state=random_state, n_jobs=n_jobs)
         self._is_trained = False
+        self.fingerprint_ = None # data_fingerprint() of the data the current model was fitted on
+        self._training_thread = None
 
-    def train(self, data):
+    @metrics.timed('anomaly.train')
+    def train(self, data, model_path=None):
         """
         Trains the anomaly detection model on the provided data.
         Data should be a pandas DataFrame with numerical features.
+        Training is skipped if the model was already fitted on identical data (same fingerprint).
+        The fit happens on a copy of the model that replaces the current one when done, so scoring
+        from other threads keeps working during a retrain.
+        model_path: If given, the fitted model is saved there (see save()).
         """
         if data.empty:
-            print("Warning: Cannot train anomaly detector on empty data.")
+            logger.warning("Cannot train anomaly detector on empty data.")
             return
 
         # Isolation Forest expects numerical data.
@@ -29,79 +74,364 @@ class AnomalyDetector:
         numeric_data = data.select_dtypes(include=np.number).dropna()
 
         if numeric_data.empty:
-             print("Warning: No numeric data available for training.")
+             logger.warning("No numeric data available for training.")
              return
 
+        fingerprint = data_fingerprint(numeric_data)
+        if self._is_trained and fingerprint == self.fingerprint_:
+            logger.info("Anomaly detector is already trained on this data, skipping training.")
+            return
+
         try:
-            self.model.fit(numeric_data)
+            model = clone(self.model)
+            model.fit(numeric_data)
+            self.model, self.fingerprint_ = model, fingerprint
             self._is_trained = True
-            print("Anomaly detector trained successfully.")
+            logger.info("Anomaly detector trained successfully.")
         except Exception as e:
-            print(f"Error during anomaly detector training: {e}")
-            self._is_trained = False
+            logger.error("Error during anomaly detector training: %s", e)
+            return
+        if model_path is not None:
+            self.save(model_path)
+
+    # --- Persistence ---
+
+    def save(self, path=ANOMALY_MODEL_FILE):
+        """Stores the fitted model, its parameters, training-data fingerprint and feature names (atomically)."""
+        if not self._is_trained:
+            logger.warning("Anomaly detector is not trained. Nothing to save.")
+            return
+        saved = {
+            'model': self.model,
+            'fingerprint': self.fingerprint_,
+            'params': model_params(self.model),
+            'feature_names_in': list(self.model.feature_names_in_),
+            'sklearn_version': sklearn.__version__,
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(saved, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path) # Never leave a half-written model behind
+
+    def load(self, path=ANOMALY_MODEL_FILE, feature_names=None):
+        """
+        Loads a model stored by save(). Returns True on success, False if there is no usable model
+        (missing, unreadable, saved by another scikit-learn version, fitted with other parameters than
+        this detector's, or - if feature_names is given - on other features).
+        """
+        try:
+            with open(path, 'rb') as f:
+                saved = pickle.load(f)
+            if saved.get('sklearn_version') != sklearn.__version__:
+                logger.warning("%s was saved with scikit-learn %s, ignoring it.", path, saved.get('sklearn_version'))
+                return False
+            if saved.get('params') != model_params(self.model):
+                logger.info("%s was fitted with other parameters (%s), ignoring it.", path, saved.get('params'))
+                return False
+            if feature_names is not None and list(saved['model'].feature_names_in_) != list(feature_names):
+                logger.info("%s was fitted on other features, ignoring it.", path)
+                return False
+            self.model, self.fingerprint_ = saved['model'], saved['fingerprint']
+        except FileNotFoundError:
+            return False
+        except (pickle.UnpicklingError, EOFError, AttributeError, KeyError, ImportError) as e:
+            logger.warning("Could not load anomaly model from %s: %s", path, e)
+            return False
+        self._is_trained = True
+        logger.info("Anomaly detector loaded from %s (trained on %d rows).", path, self.fingerprint_['rows'])
+        return True
+
+    def ensure_trained(self, data, path=ANOMALY_MODEL_FILE, background=True):
+        """
+        Warm start: loads the saved model and retrains only if data differs from what it was trained on.
+        With background=True the retrain runs on a daemon thread while the loaded (possibly stale) model
+        keeps scoring, and the new model is saved when done. Returns the training thread, or None if no
+        training was needed (or it ran synchronously).
+        """
+        numeric_data = data.select_dtypes(include=np.number).dropna()
+        self.load(path, feature_names=numeric_data.columns)
+        if self._is_trained and not numeric_data.empty and data_fingerprint(numeric_data) == self.fingerprint_:
+            logger.info("Saved model matches the data, no training needed.")
+            return None
+        if not background:
+            self.train(data, model_path=path)
+            return None
+        if self._training_thread is not None and self._training_thread.is_alive():
+            return self._training_thread # One retrain at a time
+        self._training_thread = threading.Thread(target=self.train, args=(data,), kwargs={'model_path': path},
+                                                 name="AnomalyRetrain", daemon=True)
+        self._training_thread.start()
+        return self._training_thread
+
+    def wait_for_training(self, timeout=None):
+        """Blocks until a background retrain started by ensure_trained() has finished."""
+        if self._training_thread is not None:
+            self._training_thread.join(timeout)
 
 
+    @metrics.timed('anomaly.score')
+    def score(self, data, chunk_size=None):
+        """
+        Labels and scores data in one decision_function pass (IsolationForest's predict is just
+        decision_function < 0), processing chunk_size rows at a time (default SCORE_CHUNK_ROWS)
+        so scoring years of feature rows never materializes more than one chunk's intermediates.
+        Returns a DataFrame indexed like the scored rows with columns 'Label' (-1 anomaly, 1 normal)
+        and 'Score' (lower = more anomalous). Rows with missing features are skipped.
+        Raises if the detector is not trained or the data lacks the training columns.
+        """
+        chunk_size = chunk_size or SCORE_CHUNK_ROWS
+        model = self.model # The same model for every chunk, even if a background retrain swaps it meanwhile
+        training_columns = list(model.feature_names_in_)
+        index_parts, score_parts = [], []
+        for start in range(0, len(data), chunk_size):
+            # Align with the training columns and drop incomplete rows chunk by chunk, not on a full copy
+            chunk = data.iloc[start:start + chunk_size][training_columns].dropna()
+            if chunk.empty:
+                continue
+            score_parts.append(model.decision_function(chunk))
+            index_parts.append(chunk.index)
+        if not score_parts:
+            return pd.DataFrame({'Label': pd.Series([], dtype=int), 'Score': pd.Series([], dtype=float)})
+        scores = np.concatenate(score_parts)
+        index = index_parts[0].append(index_parts[1:]) if len(index_parts) > 1 else index_parts[0]
+        return pd.DataFrame({'Label': np.where(scores < 0, -1, 1), 'Score': scores}, index=index)
+
     def predict(self, data):
         """
         Predicts anomalies in new data.
         Returns a pandas Series where -1 indicates an anomaly and 1 indicates a normal point.
         Data should have the same structure as the training data.
+        Use score() to get labels and scores from a single pass.
         """
         if not self._is_trained:
-            print("Warning: Anomaly detector is not trained. Cannot predict.")
+            logger.warning("Anomaly detector is not trained. Cannot predict.")
             return pd.Series(1, index=data.index) # Return all normal if not trained
 
         if data.empty:
-             print("Warning: Cannot predict on empty data.")
+             logger.warning("Cannot predict on empty data.")
              return pd.Series([], index=[])
 
-        # Ensure data is numeric and handle potential NaNs, matching training data columns
-        numeric_data = data.select_dtypes(include=np.number)
-        # Align columns with the data used for training
-        training_columns = self.model.feature_names_in_
-        numeric_data = numeric_data[training_columns].dropna() # Drop NaNs for prediction too
-
-        if numeric_data.empty:
-             print("Warning: No valid numeric data available for prediction after alignment/dropna.")
-             return pd.Series(1, index=data.index) # Return all normal if no valid data
-
         try:
-            predictions = self.model.predict(numeric_data)
-            # Return predictions as a pandas Series with the original index
-            return pd.Series(predictions, index=numeric_data.index)
+            scored = self.score(data)
         except Exception as e:
-            print(f"Error during anomaly prediction: {e}")
+            logger.error("Error during anomaly prediction: %s", e)
             return pd.Series(1, index=data.index) # Return all normal on error
 
+        if scored.empty:
+             logger.warning("No valid numeric data available for prediction after alignment/dropna.")
+             return pd.Series(1, index=data.index) # Return all normal if no valid data
+        return scored['Label']
+
     def get_anomaly_scores(self, data):
         """
         Calculates anomaly scores for data. Lower scores indicate higher anomaly likelihood.
         Returns a pandas Series with anomaly scores.
+        Use score() to get labels and scores from a single pass.
         """
         if not self._is_trained:
-            print("Warning: Anomaly detector is not trained. Cannot get scores.")
+            logger.warning("Anomaly detector is not trained. Cannot get scores.")
             return pd.Series(0, index=data.index) # Return 0 scores if not trained
 
         if data.empty:
-             print("Warning: Cannot get scores on empty data.")
+             logger.warning("Cannot get scores on empty data.")
              return pd.Series([], index=[])
 
-        # Ensure data is numeric and handle potential NaNs, matching training data columns
-        numeric_data = data.select_dtypes(include=np.number)
-        training_columns = self.model.feature_names_in_
-        numeric_data = numeric_data[training_columns].dropna()
+        try:
+            scored = self.score(data)
+        except Exception as e:
+            logger.error("Error getting anomaly scores: %s", e)
+            return pd.Series(0, index=data.index) # Return 0 scores on error
 
-        if numeric_data.empty:
-             print("Warning: No valid numeric data available for scoring after alignment/dropna.")
+        if scored.empty:
+             logger.warning("No valid numeric data available for scoring after alignment/dropna.")
              return pd.Series(0, index=data.index) # Return 0 scores if no valid data
+        return scored['Score']
 
+
+class StreamingAnomalyDetector:
+    """
+    Online alternative to AnomalyDetector with the same train/predict/get_anomaly_scores contract.
+    Keeps an exponentially weighted mean and variance per feature, so learning from a new sample
+    is O(1) and never needs a retrain. A sample's anomaly score is threshold - (largest |z-score|
+    over its features): negative means anomaly, like IsolationForest's decision_function.
+    Samples are clipped to mean +/- clip standard deviations before they update the statistics,
+    so a burst of outliers cannot drag the baseline along with it (a robust z-score). Features
+    whose variance is still degenerate (a constant warmup, e.g. only neutral moods) are not
+    clipped, otherwise their baseline could never learn any spread.
+    """
+    def __init__(self, threshold=3.5, halflife=50, warmup=10, clip=None, min_std=1e-6):
+        """
+        threshold: |z| above which a sample counts as anomalous.
+        halflife: Number of samples after which an old sample's weight has halved.
+        warmup: Samples to see before anything is flagged (the statistics are meaningless before).
+        clip: Clipping range in standard deviations for updates (defaults to threshold).
+        min_std: Lower bound for the standard deviation, so constant features do not divide by zero.
+        """
+        self.threshold = threshold
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.warmup = warmup
+        self.clip = threshold if clip is None else clip
+        self.min_std = min_std
+        self.feature_names_in_ = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._mean = None
+        self._var = None
+        self._count = 0
+        self._is_trained = False
+
+    @property
+    def sample_count(self):
+        """Number of samples learned from."""
+        return self._count
+
+    # --- Learning ---
+
+    def train(self, data):
+        """
+        Starts over and learns from every row of data (a DataFrame with numerical features), in order.
+        Same role as AnomalyDetector.train, but later rows can be added with update()/observe().
+        """
+        numeric_data = data.select_dtypes(include=np.number).dropna()
+        if numeric_data.empty:
+            logger.warning("No numeric data available for training.")
+            return
+        with self._lock:
+            self._reset()
+            self.feature_names_in_ = np.array(numeric_data.columns, dtype=object)
+            for row in numeric_data.to_numpy(dtype=float):
+                self._update_locked(row)
+        logger.info("Streaming anomaly detector trained on %d samples.", len(numeric_data))
+
+    def update(self, sample):
+        """Learns from one sample (dict/Series of feature -> value). O(1); NaN samples are ignored."""
+        with self._lock:
+            values = self._sample_values(sample)
+            if values is not None:
+                self._update_locked(values)
+
+    @metrics.timed('anomaly.observe')
+    def observe(self, sample):
+        """
+        Scores one new sample against what was seen so far, then learns from it.
+        Returns the anomaly score (negative = anomaly), or None if the sample has no usable values.
+        """
+        with self._lock:
+            values = self._sample_values(sample)
+            if values is None:
+                return None
+            score = float(self._score_rows(values[np.newaxis, :])[0])
+            self._update_locked(values)
+            return score
+
+    def _sample_values(self, sample):
+        """Feature vector for one sample, fixing the feature names on first use; None if incomplete."""
+        if self.feature_names_in_ is None:
+            self.feature_names_in_ = np.array(list(sample.keys()), dtype=object)
         try:
-            scores = self.model.decision_function(numeric_data)
-            # Return scores as a pandas Series with the original index
-            return pd.Series(scores, index=numeric_data.index)
-        except Exception as e:
-            print(f"Error getting anomaly scores: {e}")
-            return pd.Series(0, index=data.index) # Return 0 scores on error
+            values = np.array([float(sample[name]) for name in self.feature_names_in_])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return None if np.isnan(values).any() else values
+
+    def _update_locked(self, values):
+        if self._count == 0:
+            self._mean = values.copy()
+            self._var = np.zeros_like(values)
+        else:
+            if self._count >= self.warmup:
+                std = np.sqrt(self._var)
+                limit = np.where(std > self.min_std, self.clip * std, np.inf) # No clip range without spread yet
+                values = np.clip(values, self._mean - limit, self._mean + limit)
+            diff = values - self._mean
+            increment = self.alpha * diff
+            self._mean += increment
+            self._var = (1 - self.alpha) * (self._var + diff * increment)
+        self._count += 1
+        self._is_trained = True
+
+    # --- Scoring ---
+
+    def _score_rows(self, rows):
+        """Scores a 2-D array of feature rows against the current statistics (no learning)."""
+        if self._count < self.warmup:
+            return np.full(len(rows), float(self.threshold)) # Too early to call anything anomalous
+        std = np.maximum(np.sqrt(self._var), self.min_std)
+        z = np.abs(rows - self._mean) / std
+        return self.threshold - z.max(axis=1)
+
+    def _numeric_rows(self, data):
+        numeric_data = data.select_dtypes(include=np.number)
+        return numeric_data[list(self.feature_names_in_)].dropna()
+
+    def predict(self, data):
+        """
+        Predicts anomalies in data without learning from it.
+        Returns a pandas Series where -1 indicates an anomaly and 1 indicates a normal point.
+        """
+        if not self._is_trained:
+            logger.warning("Anomaly detector is not trained. Cannot predict.")
+            return pd.Series(1, index=data.index) # Return all normal if not trained
+        if data.empty:
+            logger.warning("Cannot predict on empty data.")
+            return pd.Series([], index=[])
+        scores = self.get_anomaly_scores(data)
+        return pd.Series(np.where(scores < 0, -1, 1), index=scores.index)
+
+    def get_anomaly_scores(self, data):
+        """
+        Calculates anomaly scores for data without learning from it. Lower scores indicate higher
+        anomaly likelihood; below 0 is an anomaly. Returns a pandas Series with anomaly scores.
+        """
+        if not self._is_trained:
+            logger.warning("Anomaly detector is not trained. Cannot get scores.")
+            return pd.Series(0, index=data.index) # Return 0 scores if not trained
+        if data.empty:
+            logger.warning("Cannot get scores on empty data.")
+            return pd.Series([], index=[])
+        numeric_data = self._numeric_rows(data)
+        with self._lock:
+            scores = self._score_rows(numeric_data.to_numpy(dtype=float))
+        return pd.Series(scores, index=numeric_data.index)
+
+    # --- Live Scoring of Saved Data ---
+
+    def follow_writes(self, kind, on_score=None, bucket_seconds=3600):
+        """
+        Scores data as data_manager writes it, learning as it goes.
+        'subjective': every new mood entry is one sample with feature SentimentScore.
+        'activity': samples are grouped into buckets of bucket_seconds; when a bucket is complete
+        it is one sample with features Samples and DistinctActivities.
+        on_score(timestamp, score, is_anomaly) is called for every scored sample, on the writing thread.
+        Returns the write listener, for data_manager.remove_write_listener().
+        """
+        bucket = {'start': None, 'samples': 0, 'activities': set()}
+
+        def emit(timestamp, sample):
+            score = self.observe(sample)
+            if score is not None and on_score is not None:
+                on_score(timestamp, score, bool(score < 0))
+
+        def listener(written_kind, records):
+            if written_kind != kind:
+                return
+            for record in records:
+                timestamp = pd.Timestamp(record.get('Timestamp'))
+                if kind == 'subjective':
+                    emit(timestamp, {'SentimentScore': record.get('SentimentScore')})
+                    continue
+                start = timestamp.floor(f'{bucket_seconds}s')
+                if bucket['start'] is not None and start != bucket['start']:
+                    emit(bucket['start'], {'Samples': bucket['samples'], 'DistinctActivities': len(bucket['activities'])})
+                    bucket.update(samples=0, activities=set())
+                bucket['start'] = start
+                bucket['samples'] += 1
+                bucket['activities'].add(record.get('ActiveInfo'))
+
+        data_manager.add_write_listener(listener)
+        return listener
 
 
 # Example Usage (for testing independently):
@@ -1,17 +1,21 @@
 import customtkinter as ctk
 import tkinter as tk
-import threading
+import logging
+import sys
 import time
-from activity_tracker import ActivityTracker
+import metrics # Timers, counters and logging setup (standard library only, cheap to import)
 from mood_input_window import MoodInputWindow
 # Removed import for SchedulingWindow
 # Removed import for Scheduler
-import data_manager
 from datetime import datetime
+from task_runner import LatestTaskRunner # Background computation with results delivered via after()
 
-# Import InsightsGenerator to get the simple conclusion
-from insights_generator import InsightsGenerator
-from visualization_window import VisualizationWindow # Import the visualization window
+_process_started = time.perf_counter() # Reference point for the startup time logged once loading finishes
+logger = logging.getLogger(__name__)
+
+# The heavy modules (pandas via data_manager, matplotlib via insights_generator/visualization_window,
+# psutil via activity_tracker) are imported on first use, see App._load_components(), so the main
+# window paints before they are loaded.
 
 
 # Set the appearance mode and color theme
@@ -25,7 +29,14 @@ class App(ctk.CTk):
     simple conclusion display, and weekly visualization.
     Scheduling functionality has been entirely removed.
     """
-    def __init__(self):
+    COMPUTING_DELAY_MS = 150 # Show "Computing..." only for computations slower than this
+
+    def __init__(self, fast_startup=True):
+        """
+        fast_startup: Show the window first and load data and heavy modules on a background thread
+        (the buttons that need them are enabled once they are ready). False loads everything before
+        the window is shown, as before.
+        """
         super().__init__()
 
         # --- Main Window Configuration ---
@@ -38,7 +49,10 @@ class App(ctk.CTk):
         self.grid_rowconfigure(3, weight=0) # Exit button row
 
         # --- Initialize Components ---
-        self.tracker = ActivityTracker()
+        # Tracker, repository and insights generator are created by _load_components()
+        self.tracker = None
+        self.repository = None
+        self.insights_generator = None
         self.mood_window = None
         # Removed self.scheduling_window
         self.visualization_window = None
@@ -47,7 +61,8 @@ class App(ctk.CTk):
         # self.scheduler = Scheduler(master_app=self)
         # self.scheduler.start_scheduler()
 
-        self.insights_generator = InsightsGenerator() # Initialize insights generator for conclusion
+        # Insights are computed off the main thread so saving a mood entry never freezes the window
+        self.task_runner = LatestTaskRunner(self, name="InsightsWorker")
 
 
         # --- UI Layout ---
@@ -69,14 +84,13 @@ class App(ctk.CTk):
         # self.schedule_button = ctk.CTkButton(master=self.buttons_frame, text="Set Prompt Interval", command=self.open_scheduling_window)
         # self.schedule_button.grid(row=0, column=1, pady=10, padx=10)
 
-        self.viz_button = ctk.CTkButton(master=self.buttons_frame, text="View Weekly Insights", command=self.open_visualization_window) # Updated text
+        self.viz_button = ctk.CTkButton(master=self.buttons_frame, text="View Weekly Insights", command=self.open_visualization_window, state="disabled") # Enabled once the data is loaded
         self.viz_button.grid(row=0, column=1, pady=10, padx=10) # Adjusted column to fill the space
 
 
         # --- Conclusion Display ---
         self.conclusion_label = ctk.CTkLabel(master=self, text="Conclusion: Loading...", font=("", 16, "bold"), wraplength=550)
         self.conclusion_label.grid(row=2, column=0, pady=20, padx=20, sticky="nsew")
-        self.update_conclusion_display() # Display initial conclusion on startup
 
 
         # --- Exit Button ---
@@ -84,11 +98,49 @@ class App(ctk.CTk):
         self.exit_button.grid(row=3, column=0, pady=10, padx=20) # Placed in a new row
 
 
+        # --- Handle App Closing ---
+        self.protocol("WM_DELETE_WINDOW", self.on_closing)
+
+        # --- Load Data, Start Tracking and Display the Initial Conclusion ---
+        if fast_startup:
+            self.task_runner.submit("startup", self._load_components,
+                                    on_done=self._on_components_loaded, on_error=self._on_components_failed)
+        else:
+            self._on_components_loaded(self._load_components())
+
+
+    def _load_components(self):
+        """
+        Imports the heavy modules and builds the data-backed components. Runs on the worker thread
+        in fast startup mode, so it must not touch widgets. Returns the initial conclusion.
+        """
+        import data_repository
+        from activity_tracker import ActivityTracker
+        from insights_generator import InsightsGenerator # Import InsightsGenerator to get the simple conclusion
+        # One shared data repository; the insights generator reads from it and we get told when it changes
+        repository = data_repository.get_repository()
+        insights_generator = InsightsGenerator(repository=repository) # Initialize insights generator for conclusion
+        tracker = ActivityTracker()
+        # Computing the first conclusion here also warms up the data the UI needs first
+        return repository, insights_generator, tracker, insights_generator.get_simple_conclusion()
+
+    def _on_components_loaded(self, components):
+        """Main loop: wires up the loaded components and starts tracking."""
+        self.repository, self.insights_generator, self.tracker, conclusion = components
+        # The conclusion only depends on subjective data, so activity samples never trigger a refresh
+        self.repository.subscribe(self.on_data_changed, kinds=('subjective',))
+        self.show_conclusion(conclusion) # Display initial conclusion on startup
+        self.viz_button.configure(state="normal")
         # --- Start Tracking on App Initialization ---
         self.tracker.start_tracking()
+        startup_seconds = time.perf_counter() - _process_started
+        metrics.record('app.startup', startup_seconds)
+        logger.info("Startup complete in %.2fs.", startup_seconds)
 
-        # --- Handle App Closing ---
-        self.protocol("WM_DELETE_WINDOW", self.on_closing)
+    def _on_components_failed(self, error):
+        """Main loop: loading the data failed; keep the window usable for mood entries."""
+        self.status_label.configure(text=f"Could not load data: {error}")
+        self.conclusion_label.configure(text="Conclusion: Unavailable (could not read mood data).")
 
 
     def open_mood_input(self):
@@ -131,16 +183,18 @@ class App(ctk.CTk):
                   optional_text = getattr(self.mood_window, 'optional_text', "")
                   timestamp = datetime.now()
 
+                  import data_manager # Already loaded by the startup thread unless the user was very quick
                   data_manager.save_subjective_data(timestamp, selected_color, selected_emotion, sentiment_score, optional_text) # Save sentiment
-                  print(f"Mood input received and saved: Color={selected_color}, Emotion={selected_emotion}, Sentiment={sentiment_score}, Text='{optional_text}'")
+                  logger.info("Mood input received and saved: Color=%s, Emotion=%s, Sentiment=%s, Text='%s'",
+                              selected_color, selected_emotion, sentiment_score, optional_text)
 
-                  # --- Update Conclusion After Saving ---
-                  self.update_conclusion_display()
+                  # --- Conclusion Update ---
+                  # No explicit refresh needed: the save notifies the repository, which calls on_data_changed
                   # Removed call to scheduler.update_last_prompt_time()
 
 
              else:
-                  print("Mood input window closed without selection or incomplete input.")
+                  logger.info("Mood input window closed without selection or incomplete input.")
 
         else:
             self.mood_window.lift()
@@ -153,8 +207,9 @@ class App(ctk.CTk):
         Ensures only one visualization window can be open at a time.
         """
         if self.visualization_window is None or not self.visualization_window.winfo_exists():
+            from visualization_window import VisualizationWindow # Pulls in matplotlib's Tk backend on first use
             # Pass the insights generator to the visualization window
-            self.visualization_window = VisualizationWindow(master=self)
+            self.visualization_window = VisualizationWindow(master=self, insights_generator=self.insights_generator)
             # Position the new window (optional)
             self.visualization_window.update()
             main_window_x = self.winfo_x()
@@ -172,15 +227,40 @@ class App(ctk.CTk):
         else:
             self.visualization_window.lift()
 
+    def on_data_changed(self, kind, version):
+        """Repository subscriber: refreshes the conclusion after new subjective data is saved."""
+        # Always deferred: Tk widgets may only be touched from the main loop, and on the main thread
+        # the save that triggered this has not returned yet
+        self.after(0, self.update_conclusion_display)
+
     def update_conclusion_display(self):
-        """Loads data and updates the conclusion label based on the simple AI logic."""
-        print("App: Updating conclusion display.")
-        # Reload data in insights generator to get the latest subjective data
-        # (This might be inefficient for a real app, but fine for a hackathon prototype)
-        self.insights_generator = InsightsGenerator()
-        conclusion = self.insights_generator.get_simple_conclusion()
+        """
+        Starts recomputing the conclusion on the worker thread; the label is updated when it is done.
+        A newer request (e.g. another save) supersedes one that is still running.
+        """
+        if self.insights_generator is None:
+            return # Still starting up; the initial conclusion is shown once loading finishes
+        logger.debug("Updating conclusion display.")
+        # The insights generator reads from the shared repository, which already holds the latest entries
+        self.task_runner.submit("conclusion", self.insights_generator.get_simple_conclusion,
+                                on_done=self.show_conclusion, on_error=self.show_conclusion_error)
+        # Only show the computing state if the result does not arrive almost immediately, to avoid flicker
+        self.after(self.COMPUTING_DELAY_MS, self.show_computing_state)
+
+    def show_computing_state(self):
+        """Shows that a conclusion is being computed, if one still is."""
+        if self.task_runner.is_pending("conclusion"):
+            self.conclusion_label.configure(text="Conclusion: Computing...")
+
+    def show_conclusion(self, conclusion):
+        """Worker callback (on the main loop): displays the computed conclusion."""
         self.conclusion_label.configure(text=f"Conclusion: {conclusion}")
-        print(f"App: Conclusion updated to: {conclusion}")
+        logger.info("Conclusion updated to: %s", conclusion)
+
+    def show_conclusion_error(self, error):
+        """Worker callback (on the main loop): the conclusion could not be computed."""
+        self.conclusion_label.configure(text="Conclusion: Unavailable (could not read mood data).")
+        logger.error("Error computing conclusion: %s", error)
 
 
     def on_closing(self):
@@ -188,12 +268,28 @@ class App(ctk.CTk):
         Handles actions to perform when the main application window is closed.
         Stops the background tracker before closing the GUI.
         """
-        print("Closing application. Stopping tracker.")
-        self.tracker.stop_tracking()
-        # Removed call to scheduler.stop_scheduler()
-        self.destroy()
+        logger.info("Closing application. Stopping tracker.")
+        self.task_runner.shutdown() # Also drops a startup that is still loading
+        if self.repository is not None:
+            self.repository.unsubscribe(self.on_data_changed)
+        try:
+            if self.tracker is not None:
+                self.tracker.stop_tracking()
+        finally:
+            # Guarantee buffered activity samples reach disk even if stopping the thread failed
+            if self.tracker is not None:
+                self.tracker.flush()
+            # Removed call to scheduler.stop_scheduler()
+            try:
+                metrics.dump() # Inspect with: python -m report_cli metrics
+            except OSError as e:
+                logger.warning("Could not write %s: %s", metrics.METRICS_FILE, e)
+            self.destroy()
 
 # --- Main Application Entry Point ---
+# python app.py [--eager]   (--eager: load everything before showing the window)
+# MOOD_TRACKER_LOG_LEVEL=INFO (or DEBUG) shows the log; the default only shows warnings and errors.
 if __name__ == "__main__":
-    app = App()
+    metrics.configure_logging()
+    app = App(fast_startup="--eager" not in sys.argv)
     app.mainloop()
@@ -0,0 +1,157 @@
+"""
+Batch analytics over many users' data folders (one folder per workstation, each holding the
+usual data files). Every user is analysed in a worker process: conclusion, weekly average
+sentiment and anomalous days. Results are streamed into one consolidated CSV as workers finish.
+
+    python -m report_cli batch --root USERS_DIR --out results.csv [--workers N] [--max-memory-mb MB]
+                               [--contamination 0.05]
+"""
+import csv
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import data_manager
+from insights_generator import simple_conclusion
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource # Unix only; used to cap the memory of each worker
+except ImportError:
+    resource = None
+
+BATCH_COLUMNS = ['User', 'Entries', 'LastEntry', 'RecentAverage', 'Conclusion',
+                 'WeeklySentiment', 'AnomalousDays', 'AnomalyDates', 'Error']
+DEFAULT_MAX_MEMORY_MB = 2048
+TASKS_PER_WORKER = 50 # Workers are replaced after this many users, so memory cannot creep up over a long batch
+MIN_DAYS_FOR_ANOMALIES = 14 # Fewer days with mood entries than this are not enough to train the detector
+# Expected share of anomalous days. IsolationForest's 'auto' flags a quarter or more of a user's days,
+# which makes the column noise; an explicit share keeps only the clearly unusual ones.
+DEFAULT_CONTAMINATION = 0.05
+
+
+def find_user_dirs(root_dir):
+    """Subdirectories of root_dir that contain data files for at least one data set, sorted by name."""
+    markers = (data_manager.SUBJECTIVE_FILE, data_manager.ACTIVITY_FILE, data_manager.ACTIVITY_SESSIONS_FILE,
+               data_manager.SQLITE_FILE, data_manager.COLUMNAR_DIR, 'subjective', 'activity')
+    user_dirs = []
+    for name in sorted(os.listdir(root_dir)):
+        path = os.path.join(root_dir, name)
+        if os.path.isdir(path) and any(os.path.exists(os.path.join(path, marker)) for marker in markers):
+            user_dirs.append(path)
+    return user_dirs
+
+
+def _limit_memory(max_memory_mb):
+    """Worker initializer: caps the worker's address space so one huge data folder cannot take the machine down."""
+    if resource is None or not max_memory_mb:
+        return # Not enforceable on this platform; TASKS_PER_WORKER still recycles workers
+    limit = int(max_memory_mb) * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def daily_features(subjective, activity):
+    """Per-day features of one user (days with at least one scored mood entry)."""
+    scores = subjective.set_index('Timestamp')['SentimentScore']
+    daily = pd.DataFrame({'MeanSentiment': scores.resample('D').mean(), 'Entries': scores.resample('D').count()})
+    daily = daily[daily['Entries'] > 0]
+    if not activity.empty:
+        info = activity.set_index('Timestamp')['ActiveInfo']
+        daily['ActivitySamples'] = info.resample('D').size().reindex(daily.index, fill_value=0)
+        daily['DistinctActivities'] = info.resample('D').nunique().reindex(daily.index, fill_value=0)
+    return daily
+
+
+def sentiment_summary(data_dir, min_submissions=3):
+    """
+    The scored mood entries of one data folder and what the batch row and the headless report show:
+    (entries sorted by Timestamp, recent average or None, conclusion, weekly average Series).
+    """
+    subjective = data_manager.load_subjective_data(columns=['Timestamp', 'SentimentScore'], data_dir=data_dir)
+    subjective['SentimentScore'] = pd.to_numeric(subjective['SentimentScore'], errors='coerce')
+    subjective = subjective.dropna(subset=['SentimentScore']).sort_values('Timestamp', kind='stable')
+    # An empty or missing file comes back with an untyped Timestamp column, which resample() rejects
+    subjective['Timestamp'] = pd.to_datetime(subjective['Timestamp'])
+    recent = subjective['SentimentScore'].tail(min_submissions)
+    average = float(recent.mean()) if not recent.empty else None
+    weekly = subjective.set_index('Timestamp')['SentimentScore'].resample('W').mean().dropna()
+    return subjective, average, simple_conclusion(len(recent), average, min_submissions), weekly
+
+
+def _anomalous_days(daily, contamination=DEFAULT_CONTAMINATION):
+    """Dates the anomaly detector flags (-1) among the user's days; empty if there are too few days."""
+    if len(daily) < MIN_DAYS_FOR_ANOMALIES:
+        return []
+    from anomaly_detector import AnomalyDetector # sklearn is only needed by the workers that get this far
+    detector = AnomalyDetector(contamination=contamination)
+    detector.train(daily)
+    predictions = detector.predict(daily)
+    return [day.date().isoformat() for day in predictions.index[predictions == -1]]
+
+
+def analyze_user(user_dir, min_submissions=3, contamination=DEFAULT_CONTAMINATION):
+    """Runs in a worker process: the batch result row for one user folder."""
+    row = dict.fromkeys(BATCH_COLUMNS, '')
+    row['User'] = os.path.basename(os.path.normpath(user_dir))
+    try:
+        subjective, average, conclusion, weekly = sentiment_summary(user_dir, min_submissions)
+        activity = data_manager.load_activity_data(data_dir=user_dir)
+        activity['Timestamp'] = pd.to_datetime(activity['Timestamp'])
+        anomalies = _anomalous_days(daily_features(subjective, activity), contamination)
+
+        row.update({
+            'Entries': len(subjective),
+            'LastEntry': subjective['Timestamp'].iloc[-1].isoformat() if not subjective.empty else '',
+            'RecentAverage': round(average, 4) if average is not None else '',
+            'Conclusion': conclusion,
+            'WeeklySentiment': json.dumps([[week.date().isoformat(), round(float(mean), 4)] for week, mean in weekly.items()]),
+            'AnomalousDays': len(anomalies),
+            'AnomalyDates': json.dumps(anomalies),
+        })
+    except Exception as e: # Includes MemoryError from the worker's memory cap
+        row['Error'] = f"{type(e).__name__}: {e}"
+    finally:
+        if data_manager.STORAGE_BACKEND == 'sqlite':
+            data_manager.sqlite_store.close_connections() # One connection per user folder would pile up
+    return row
+
+
+def run_batch(root_dir, out_path, workers=None, max_memory_mb=DEFAULT_MAX_MEMORY_MB, min_submissions=3,
+              contamination=DEFAULT_CONTAMINATION):
+    """
+    Analyses every user folder under root_dir in a process pool and appends one row per user to the
+    CSV at out_path as soon as that user is done (so partial results survive an interrupted batch).
+    contamination: Expected share of anomalous days per user (see AnomalyDetector).
+    Yields the rows in completion order.
+    """
+    user_dirs = find_user_dirs(root_dir)
+    logger.info("Analysing %d user folders from %s.", len(user_dirs), root_dir)
+    with open(out_path, 'w', newline='') as out_file, \
+         ProcessPoolExecutor(max_workers=workers, initializer=_limit_memory, initargs=(max_memory_mb,),
+                             max_tasks_per_child=TASKS_PER_WORKER) as pool:
+        writer = csv.DictWriter(out_file, fieldnames=BATCH_COLUMNS)
+        writer.writeheader()
+        futures = {pool.submit(analyze_user, user_dir, min_submissions, contamination): user_dir for user_dir in user_dirs}
+        for future in as_completed(futures):
+            try:
+                row = future.result()
+            except Exception as e: # The worker itself died (e.g. killed for exceeding memory)
+                row = dict.fromkeys(BATCH_COLUMNS, '')
+                row['User'] = os.path.basename(os.path.normpath(futures[future]))
+                row['Error'] = f"{type(e).__name__}: {e}"
+            writer.writerow(row)
+            out_file.flush()
+            yield row
+
+
+def load_batch_results(path):
+    """Reads a batch output CSV back, decoding the JSON columns."""
+    df = pd.read_csv(path, keep_default_na=False)
+    for col in ('WeeklySentiment', 'AnomalyDates'):
+        df[col] = df[col].map(lambda value: json.loads(value) if value else [])
+    return df
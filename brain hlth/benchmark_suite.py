@@ -0,0 +1,217 @@
+"""
+Analytics benchmark suite: times the data and analytics paths on synthetic histories of
+increasing size (see synthetic_data.py) and records their peak memory:
+    load_subjective  data_manager.load_subjective_data()
+    load_activity    data_manager.load_activity_data()
+    conclusion       InsightsGenerator.get_simple_conclusion()
+    weekly_plot      InsightsGenerator.generate_weekly_sentiment_plot()
+    anomaly_train    AnomalyDetector.train() on the hourly FeaturePipeline features
+    anomaly_predict  AnomalyDetector.predict() on the same features
+
+    python benchmark_suite.py [--days 7 90 365 1825] [--runs 3] [--only load_activity ...]
+                              [--data-root DIR] [--save-baseline] [--tolerance 0.25]
+
+Every measurement runs in a fresh Python process, in a scratch directory that links to the
+dataset's CSV files, so nothing is cached between runs (no warm imports, no rollups.db or
+weekly_sentiment.json left behind). seconds is the wall time of the call alone; peak_mb is the
+highest resident memory seen during the call above what the process used just before it
+(sampled every few milliseconds). Datasets are generated once per size and kept in --data-root.
+With a saved baseline (BENCHMARK_BASELINE_FILE) the script exits with status 1 if any median
+time or peak memory regressed by more than the tolerance, so it can run in CI.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCHMARK_BASELINE_FILE = 'benchmark_baseline.json'
+DEFAULT_DAYS = [7, 90, 365, 1825] # A week up to 5 years
+BENCHMARKS = ['load_subjective', 'load_activity', 'conclusion', 'weekly_plot', 'anomaly_train', 'anomaly_predict']
+MIN_SLACK_SECONDS = 0.05 # Differences below these are noise, whatever the tolerance says
+MIN_SLACK_MB = 20
+_COMPLETE_MARKER = '.complete' # Written after a dataset is fully generated
+
+
+# --- Child Process ---
+
+class _PeakMemory:
+    """Samples the process's resident memory on a thread while the with-block runs."""
+    def __init__(self, interval=0.002):
+        import psutil
+        self._process = psutil.Process()
+        self._interval = interval
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.baseline = self.peak = self._process.memory_info().rss
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self._interval):
+            self.peak = max(self.peak, self._process.memory_info().rss)
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._process.memory_info().rss)
+        return False
+
+    @property
+    def peak_mb(self):
+        return (self.peak - self.baseline) / (1024 * 1024)
+
+
+def _prepare(name):
+    """Untimed setup for a benchmark; returns the call to time."""
+    import data_manager
+    if name == 'load_subjective':
+        return data_manager.load_subjective_data
+    if name == 'load_activity':
+        return data_manager.load_activity_data
+    if name in ('conclusion', 'weekly_plot'):
+        from insights_generator import InsightsGenerator
+        generator = InsightsGenerator()
+        return generator.get_simple_conclusion if name == 'conclusion' else generator.generate_weekly_sentiment_plot
+    from anomaly_detector import AnomalyDetector
+    from feature_pipeline import FeaturePipeline
+    features = FeaturePipeline().features()
+    detector = AnomalyDetector()
+    if name == 'anomaly_train':
+        return lambda: detector.train(features)
+    detector.train(features)
+    return lambda: detector.predict(features)
+
+
+def run_one(name):
+    """Runs in the child process (working directory = the scratch copy of a dataset)."""
+    import matplotlib
+    matplotlib.use('Agg')
+    call = _prepare(name)
+    with _PeakMemory() as memory:
+        started = time.perf_counter()
+        call()
+        seconds = time.perf_counter() - started
+    return {'seconds': seconds, 'peak_mb': memory.peak_mb}
+
+
+# --- Suite ---
+
+def ensure_dataset(data_root, days, seed, interval):
+    """Directory with the synthetic dataset for these parameters, generating it if needed."""
+    path = os.path.join(data_root, f"{days}d_seed{seed}_{interval}s")
+    if not os.path.exists(os.path.join(path, _COMPLETE_MARKER)):
+        import synthetic_data
+        print(f"Generating {days} days of synthetic data in {path}...")
+        activity_rows, subjective_rows = synthetic_data.write_dataset(path, days, seed, interval)
+        with open(os.path.join(path, _COMPLETE_MARKER), 'w') as f:
+            json.dump({'activity_rows': activity_rows, 'subjective_rows': subjective_rows}, f)
+    return path
+
+
+def _link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError: # Different file system, or links not supported
+        shutil.copyfile(source, target)
+
+
+def measure_once(name, dataset_dir):
+    """Runs one benchmark in a fresh interpreter and scratch directory; returns its timings dict."""
+    import data_manager
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [app_dir, os.environ.get('PYTHONPATH')])))
+    scratch = tempfile.mkdtemp(prefix='benchmark_')
+    try:
+        for file_name in (data_manager.ACTIVITY_FILE, data_manager.SUBJECTIVE_FILE):
+            _link_or_copy(os.path.join(dataset_dir, file_name), os.path.join(scratch, file_name))
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-one', name],
+                                cwd=scratch, env=env, capture_output=True, text=True)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Benchmark {name} failed:\n{result.stderr}")
+    # The modules print their own progress; the timings are the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(days_list, names, runs, data_root, seed, interval):
+    """Median timings: {'<days>d': {benchmark: {'seconds': ..., 'peak_mb': ...}}}."""
+    results = {}
+    for days in days_list:
+        dataset_dir = ensure_dataset(data_root, days, seed, interval)
+        size = results.setdefault(f"{days}d", {})
+        for name in names:
+            samples = [measure_once(name, dataset_dir) for _ in range(runs)]
+            size[name] = {key: statistics.median(s[key] for s in samples) for key in ('seconds', 'peak_mb')}
+            print(f"{days:>5} days  {name:<16} {size[name]['seconds']:8.3f} s  {size[name]['peak_mb']:8.1f} MB")
+    return results
+
+
+def check_regressions(results, baseline, tolerance):
+    """Returns messages for every measurement more than `tolerance` above its baseline."""
+    problems = []
+    for size, benchmarks in results.items():
+        for name, values in benchmarks.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue # Not in the baseline yet
+            for key, slack, unit in (('seconds', MIN_SLACK_SECONDS, 's'), ('peak_mb', MIN_SLACK_MB, 'MB')):
+                limit = max(base[key] * (1 + tolerance), base[key] + slack)
+                if values[key] > limit:
+                    problems.append(f"{size} {name} {key}: {values[key]:.3f} {unit} > {limit:.3f} {unit} "
+                                    f"(baseline {base[key]:.3f} {unit})")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark data loading and analytics on synthetic histories.")
+    parser.add_argument('--days', type=int, nargs='+', default=DEFAULT_DAYS, help="History sizes in days")
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=BENCHMARKS, help="Benchmarks to run")
+    parser.add_argument('--runs', type=int, default=3, help="Fresh processes per measurement (the median is reported)")
+    parser.add_argument('--data-root', default='benchmark_data', help="Where the synthetic datasets are kept")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic datasets")
+    parser.add_argument('--interval', type=int, default=10, help="Seconds between synthetic activity samples")
+    parser.add_argument('--baseline', default=BENCHMARK_BASELINE_FILE, help="Baseline results file")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed regression vs. the baseline (0.25 = 25%%)")
+    parser.add_argument('--run-one', help=argparse.SUPPRESS) # Internal: the child process
+    args = parser.parse_args(argv)
+
+    if args.run_one:
+        print(json.dumps(run_one(args.run_one)))
+        return 0
+
+    results = measure(args.days, args.only, args.runs, os.path.abspath(args.data_root), args.seed, args.interval)
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline): # Keep sizes and benchmarks that were not run this time
+            with open(args.baseline, 'r') as f:
+                baseline = json.load(f)
+        for size, benchmarks in results.items():
+            baseline.setdefault(size, {}).update(benchmarks)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline saved to {args.baseline}.")
+        return 0
+    try:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    problems = check_regressions(results, baseline, args.tolerance)
+    for problem in problems:
+        print(f"Benchmark regression: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""
+Optional typed columnar storage used by data_manager when STORAGE_BACKEND = 'columnar'.
+Each data set is a directory of Parquet files with native datetime64 timestamps, categorical
+text columns and an int8 SentimentScore, so loading needs no CSV parsing or type coercion and
+can read just the columns (and, via row-group statistics, just the time range) it needs.
+
+Layout (append-friendly):
+    <dataset>/part-<timestamp>.parquet   one small file per append (a saved entry or a flushed batch)
+    <dataset>/chunk-<timestamp>.parquet  parts merged by compact(); never rewritten afterwards
+    <dataset>/compaction.json            only while a compaction is being published (see _merge_locked)
+Parquet files cannot be appended to, so appends create parts and compaction keeps the file count bounded.
+Chunks are merged in tiers: whenever the newest CHUNK_FANOUT chunks are of the same size class they
+become one chunk of the next class, so a data set has O(log rows) files and every row is rewritten
+only O(log rows) times. File names use UTC, so they stay chronological across DST changes.
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import pandas as pd
+
+try:
+    import pyarrow # Required by pandas for Parquet I/O
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_COLUMNS = ['Timestamp', 'ActiveInfo']
+SUBJECTIVE_COLUMNS = ['Timestamp', 'ColorChoice', 'Emotion', 'SentimentScore', 'OptionalText']
+
+# Column dtypes stored on disk
+ACTIVITY_DTYPES = {'ActiveInfo': 'category'}
+SUBJECTIVE_DTYPES = {'ColorChoice': 'category', 'Emotion': 'category', 'SentimentScore': 'Int8', 'OptionalText': 'string'}
+SCHEMAS = {'activity': (ACTIVITY_COLUMNS, ACTIVITY_DTYPES), 'subjective': (SUBJECTIVE_COLUMNS, SUBJECTIVE_DTYPES)}
+
+# Written before a merged chunk is published and removed once its source files are gone; while it
+# exists, readers skip the sources it lists, so rows are never seen twice (or lost on a crash)
+COMPACTION_MANIFEST = 'compaction.json'
+
+COMPACT_AFTER_PARTS = 64 # Merge the small part files once this many have accumulated
+CHUNK_FANOUT = 8 # Chunks of one size class merged into one of the next class
+CHUNK_TIER_BASE_ROWS = 4096 # Chunks below CHUNK_TIER_BASE_ROWS * CHUNK_FANOUT rows are the smallest class
+
+_lock = threading.Lock() # Appends and compaction come from both the tracker thread and the UI thread
+_last_name = {} # dataset_dir -> last file name stem, to keep names unique within the same microsecond
+_time_ranges = {} # file path -> (min, max) Timestamp from its Parquet statistics; files are never rewritten
+
+
+def is_available():
+    """True if pyarrow is installed."""
+    return pyarrow is not None
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError("The columnar storage backend requires pyarrow (pip install pyarrow).")
+
+
+def _prepare(df, kind):
+    """Casts a normalized DataFrame to the on-disk schema of kind ('activity' or 'subjective')."""
+    columns, dtypes = SCHEMAS[kind]
+    df = df[columns].copy()
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce').astype('datetime64[ns]')
+    df = df.dropna(subset=['Timestamp'])
+    if 'SentimentScore' in dtypes:
+        df['SentimentScore'] = pd.to_numeric(df['SentimentScore'], errors='coerce').round()
+    return df.astype(dtypes).reset_index(drop=True)
+
+
+def _restore_categories(df):
+    """concat turns categoricals with different per-file dictionaries into plain objects; re-categorize them."""
+    for col in ('ActiveInfo', 'ColorChoice', 'Emotion'):
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object).astype('category')
+    return df
+
+
+def _new_file_name(dataset_dir, prefix):
+    """Returns a unique, chronologically sortable file name in dataset_dir."""
+    now_ns = time.time_ns()
+    stem = time.strftime('%Y%m%dT%H%M%S', time.gmtime(now_ns // 1_000_000_000)) + f"{now_ns % 1_000_000_000:09d}"
+    if _last_name.get(dataset_dir, '') >= stem:
+        stem = _last_name[dataset_dir] + '_'
+    _last_name[dataset_dir] = stem
+    return os.path.join(dataset_dir, f"{prefix}-{stem}.parquet")
+
+
+def _part_files(dataset_dir):
+    return sorted(glob.glob(os.path.join(dataset_dir, 'part-*.parquet')))
+
+
+def _chunk_files(dataset_dir):
+    return sorted(glob.glob(os.path.join(dataset_dir, 'chunk-*.parquet')))
+
+
+def _stem(path):
+    """'chunk-<stem>.parquet' -> '<stem>'."""
+    return os.path.basename(path).split('-', 1)[1][:-len('.parquet')]
+
+
+def _chunk_tier(rows):
+    """Size class of a chunk: 0 below CHUNK_TIER_BASE_ROWS * CHUNK_FANOUT rows, one more per CHUNK_FANOUT times as many."""
+    tier = 0
+    limit = CHUNK_TIER_BASE_ROWS * CHUNK_FANOUT
+    while rows >= limit:
+        tier += 1
+        limit *= CHUNK_FANOUT
+    return tier
+
+
+def _time_range(path):
+    """(min, max) Timestamp of a file from its footer statistics (cached), or None if they are missing."""
+    if path not in _time_ranges:
+        import pyarrow.parquet as pq
+        metadata = pq.read_metadata(path)
+        column = metadata.schema.names.index('Timestamp')
+        lows, highs = [], []
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(column).statistics
+            if stats is None or not stats.has_min_max:
+                return None
+            lows.append(pd.Timestamp(stats.min))
+            highs.append(pd.Timestamp(stats.max))
+        _time_ranges[path] = (min(lows), max(highs)) if lows else None
+    return _time_ranges[path]
+
+
+def _overlaps(path, start, end):
+    """False only if the file's statistics show it has no rows in [start, end)."""
+    if start is None and end is None:
+        return True
+    try:
+        bounds = _time_range(path)
+    except (OSError, ValueError):
+        return True # Let the read itself decide
+    if bounds is None:
+        return True
+    return (start is None or bounds[1] >= pd.Timestamp(start)) and (end is None or bounds[0] < pd.Timestamp(end))
+
+
+def _read_manifest(dataset_dir):
+    """The pending compaction {'chunk': name, 'replaces': [names]}, or None."""
+    try:
+        with open(os.path.join(dataset_dir, COMPACTION_MANIFEST), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _replaced_files(dataset_dir):
+    """Names of the files a published chunk has already replaced but that are not removed yet."""
+    manifest = _read_manifest(dataset_dir)
+    if manifest is None or not os.path.exists(os.path.join(dataset_dir, manifest['chunk'])):
+        return set() # No compaction, or it stopped before the chunk was published: the sources still count
+    return set(manifest['replaces'])
+
+
+def data_files(dataset_dir):
+    """All Parquet files of a data set, oldest first."""
+    files = _chunk_files(dataset_dir) + _part_files(dataset_dir)
+    replaced = _replaced_files(dataset_dir)
+    return [f for f in files if os.path.basename(f) not in replaced] if replaced else files
+
+
+def _finish_compaction_locked(dataset_dir):
+    """Completes or rolls back a compaction that was interrupted (e.g. by a crash)."""
+    manifest = _read_manifest(dataset_dir)
+    if manifest is None:
+        return
+    chunk_path = os.path.join(dataset_dir, manifest['chunk'])
+    if os.path.exists(chunk_path): # Published: the sources are redundant
+        for name in manifest['replaces']:
+            _time_ranges.pop(os.path.join(dataset_dir, name), None)
+            try:
+                os.remove(os.path.join(dataset_dir, name))
+            except FileNotFoundError:
+                pass
+    elif os.path.exists(chunk_path + '.tmp'): # Not published: the sources are still the data
+        os.remove(chunk_path + '.tmp')
+    os.remove(os.path.join(dataset_dir, COMPACTION_MANIFEST))
+
+
+def append(dataset_dir, df, kind):
+    """Appends rows (already in the data set's column layout) of kind 'activity' or 'subjective' as a new part file."""
+    _require_pyarrow()
+    if df.empty:
+        return
+    df = _prepare(df, kind)
+    with _lock:
+        os.makedirs(dataset_dir, exist_ok=True)
+        path = _new_file_name(dataset_dir, 'part')
+        df.to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path) # Readers never see a half-written file
+        if len(_part_files(dataset_dir)) >= COMPACT_AFTER_PARTS:
+            _compact_locked(dataset_dir)
+
+
+def compact(dataset_dir, full=False):
+    """
+    Merges the part files of a data set into one chunk file, then merges chunk tiers (see CHUNK_FANOUT).
+    With full=True every file (chunks included) is rewritten into a single chunk.
+    """
+    _require_pyarrow()
+    with _lock:
+        _compact_locked(dataset_dir, full)
+
+
+def _compact_locked(dataset_dir, full=False):
+    _finish_compaction_locked(dataset_dir)
+    if full:
+        files = data_files(dataset_dir)
+        if len(files) >= 2:
+            _merge_locked(dataset_dir, files, _merged_chunk_path(dataset_dir, files))
+        return
+    parts = _part_files(dataset_dir)
+    if len(parts) >= 2:
+        # Named after the first part so chunks stay in chronological order
+        _merge_locked(dataset_dir, parts, os.path.join(dataset_dir, f"chunk-{_stem(parts[0])}.parquet"))
+    _merge_tiers_locked(dataset_dir)
+
+
+def _merged_chunk_path(dataset_dir, files):
+    """
+    Name for a chunk replacing files that include chunks: the last file's stem plus '+', which sorts
+    after every older chunk and before the chunks later parts become, and never names an existing file.
+    """
+    return os.path.join(dataset_dir, f"chunk-{_stem(files[-1])}+.parquet")
+
+
+def _merge_tiers_locked(dataset_dir):
+    """While the newest CHUNK_FANOUT chunks share a size class, merges them into one chunk of the next class."""
+    import pyarrow.parquet as pq
+    while True:
+        chunks = _chunk_files(dataset_dir)
+        if len(chunks) < CHUNK_FANOUT:
+            return
+        tail = chunks[-CHUNK_FANOUT:]
+        tiers = {_chunk_tier(pq.read_metadata(f).num_rows) for f in tail}
+        if len(tiers) != 1:
+            return
+        _merge_locked(dataset_dir, tail, _merged_chunk_path(dataset_dir, tail))
+
+
+def _merge_locked(dataset_dir, files, path):
+    """Replaces files with one chunk at path holding all of their rows, sorted by Timestamp."""
+    df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+    df = _restore_categories(df.sort_values('Timestamp', kind='stable'))
+    # The chunk is published before anything is removed; the manifest, written first, tells readers
+    # (and the next compaction after a crash) which files it replaces
+    manifest_path = os.path.join(dataset_dir, COMPACTION_MANIFEST)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump({'chunk': os.path.basename(path), 'replaces': [os.path.basename(f) for f in files]}, f)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    df.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    _finish_compaction_locked(dataset_dir)
+
+
+def read(dataset_dir, columns=None, start=None, end=None):
+    """
+    Reads rows with start <= Timestamp < end, loading only the requested columns.
+    Returns None if the data set does not exist yet.
+    """
+    _require_pyarrow()
+    files = data_files(dataset_dir)
+    if not files:
+        return None
+    if columns is not None and 'Timestamp' not in columns:
+        columns = ['Timestamp'] + list(columns)
+
+    filters = []
+    if start is not None:
+        filters.append(('Timestamp', '>=', pd.Timestamp(start)))
+    if end is not None:
+        filters.append(('Timestamp', '<', pd.Timestamp(end)))
+    try:
+        # Files whose statistics lie outside the window are not opened at all
+        frames = [pd.read_parquet(f, columns=columns, filters=filters or None) for f in files if _overlaps(f, start, end)]
+    except FileNotFoundError: # A compaction finished while reading; its chunk now holds those rows
+        files = data_files(dataset_dir)
+        frames = [pd.read_parquet(f, columns=columns, filters=filters or None) for f in files if _overlaps(f, start, end)]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.read_parquet(files[0], columns=columns).iloc[0:0]
+    if len(frames) == 1:
+        return frames[0]
+    df = _restore_categories(pd.concat(frames, ignore_index=True))
+    if not df['Timestamp'].is_monotonic_increasing: # Files overlap in time (e.g. parts written before an older chunk)
+        df = df.sort_values('Timestamp', kind='stable', ignore_index=True)
+    return df
+
+
+def import_csv(dataset_dir, csv_path, normalize, kind, chunksize=500_000):
+    """
+    Converts a CSV file of kind 'activity' or 'subjective' into a columnar data set, one chunk file per `chunksize` rows.
+    normalize is data_manager's per-chunk cleanup (_normalize_activity / _normalize_subjective).
+    Returns the number of rows written.
+    """
+    _require_pyarrow()
+    if data_files(dataset_dir):
+        logger.info("%s already contains data, skipping import of %s.", dataset_dir, csv_path)
+        return 0
+    written = 0
+    try:
+        os.makedirs(dataset_dir, exist_ok=True)
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            chunk = _prepare(normalize(chunk), kind)
+            if chunk.empty:
+                continue
+            with _lock:
+                path = _new_file_name(dataset_dir, 'chunk')
+                chunk.to_parquet(path + '.tmp', index=False)
+                os.replace(path + '.tmp', path)
+            written += len(chunk)
+    except FileNotFoundError:
+        logger.info("%s not found, nothing to import.", csv_path)
+    except pd.errors.EmptyDataError:
+        pass
+    return written
+
+
+# One-shot migration of the CSV files in the current directory:
+#   python columnar_store.py
+if __name__ == "__main__":
+    import data_manager
+    data_manager.migrate_csv_to_columnar()
@@ -0,0 +1,87 @@
+import math
+import threading
+from collections import deque
+from datetime import datetime
+import data_manager
+
+
+class RollingConclusion:
+    """
+    Incremental state behind the simple conclusion: the last `window` sentiment scores in a
+    ring buffer plus their running sum. It is seeded once from disk and then updated from
+    data_manager's write notifications, so asking for the average after a new mood entry
+    is constant-time and does no I/O.
+    """
+    def __init__(self, window=3):
+        """window: Number of most recent entries averaged (InsightsGenerator.min_submissions)."""
+        self.window = window
+        self._scores = deque(maxlen=window)
+        self._sum = 0.0
+        self._last_timestamp = None # Newest entry already counted, so nothing is counted twice
+        self._seeded = False
+        self._lock = threading.Lock()
+        data_manager.add_write_listener(self._on_write)
+
+    def close(self):
+        """Stops following new writes."""
+        data_manager.remove_write_listener(self._on_write)
+
+    def seed(self):
+        """Loads the newest `window` scored entries from disk (only the first call does any work)."""
+        with self._lock:
+            if self._seeded:
+                return
+            recent = data_manager.load_recent_subjective_data(self.window, columns=['SentimentScore'])
+            for timestamp, score in zip(recent['Timestamp'], recent['SentimentScore']):
+                self._push_locked(score, timestamp)
+            self._seeded = True
+
+    def push(self, score, timestamp=None):
+        """Adds one sentiment score; NaN/None scores are ignored like the batch conclusion drops them."""
+        with self._lock:
+            self._push_locked(score, timestamp)
+
+    def _push_locked(self, score, timestamp):
+        if timestamp is not None:
+            if self._last_timestamp is not None and timestamp <= self._last_timestamp:
+                return # Already counted (written to disk just before we seeded)
+            self._last_timestamp = timestamp
+        try:
+            score = float(score)
+        except (TypeError, ValueError):
+            return
+        if math.isnan(score):
+            return
+        if len(self._scores) == self.window:
+            self._sum -= self._scores[0] # Oldest score falls out of the window
+        self._scores.append(score)
+        self._sum += score
+
+    def _on_write(self, kind, records):
+        """data_manager write listener."""
+        if kind != 'subjective':
+            return
+        with self._lock:
+            if not self._seeded:
+                return # seed() will read these rows from disk
+            for record in records:
+                timestamp = record.get('Timestamp')
+                if isinstance(timestamp, str):
+                    try:
+                        timestamp = datetime.fromisoformat(timestamp)
+                    except ValueError:
+                        timestamp = None
+                self._push_locked(record.get('SentimentScore'), timestamp)
+
+    @property
+    def count(self):
+        """Number of scores currently in the window (at most `window`)."""
+        with self._lock:
+            return len(self._scores)
+
+    def average(self):
+        """Average of the scores in the window, or None if it is empty."""
+        with self._lock:
+            if not self._scores:
+                return None
+            return self._sum / len(self._scores)
@@ -1,11 +1,94 @@
 import pandas as pd
+import numpy as np
+import io
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
+import sqlite_store
+import columnar_store
+import metrics
+
+logger = logging.getLogger(__name__)
 
 ACTIVITY_FILE = 'activity_data.csv'
 SUBJECTIVE_FILE = 'subjective_data.csv'
 SCHEDULE_FILE = 'schedule_settings.json' # Added for scheduling
 
+# --- Data Locations ---
+# All file names in this module are relative to the working directory. The load functions (and
+# storage_signature) also accept data_dir to resolve them against another directory for that call
+# only, e.g. to analyse many users' data folders in one process. The module's parse caches are
+# only used for the default location, so such calls do not keep other users' data in memory.
+
+def _path(name, data_dir=None):
+    """Resolves one of the file/directory names below for data_dir (None = working directory)."""
+    return name if data_dir is None else os.path.join(data_dir, name)
+
+# --- Storage Backend ---
+# 'csv' keeps the flat files above. 'sqlite' stores both data sets in SQLITE_FILE with an
+# indexed Timestamp column (see sqlite_store.py); run import_csv_to_sqlite() once to migrate.
+# 'columnar' stores typed Parquet files under COLUMNAR_DIR (see columnar_store.py, needs pyarrow);
+# run migrate_csv_to_columnar() once to migrate.
+STORAGE_BACKEND = 'csv'
+SQLITE_FILE = 'mood_tracker.db'
+COLUMNAR_DIR = 'mood_data'
+
+def _columnar_dir(kind, data_dir=None):
+    return os.path.join(_path(COLUMNAR_DIR, data_dir), kind)
+
+# --- Time Partitioning (CSV backend) ---
+# None keeps one ever-growing file per data set. 'month' or 'day' rotates rows by their Timestamp into
+# <PARTITION_ROOT>/<kind>/<period>.csv (e.g. activity/2026-10.csv), and range loads only open the
+# partitions overlapping the requested window. Use partition_csv_files() to split existing files.
+PARTITION_BY = None
+PARTITION_ROOT = ''
+PARTITION_READER_CACHE_SIZE = 4 # Partitions whose parsed rows stay cached (least recently used are dropped)
+
+# --- Activity Format ---
+# 'samples' writes one ACTIVITY_FILE row per tracker tick. 'sessions' writes one ACTIVITY_SESSIONS_FILE
+# row (Start, End, ActiveInfo, Interval) per run of identical ActiveInfo; load_activity_data() expands the
+# runs back into one sample every Interval seconds (the tracker's interval while the run was recorded;
+# ACTIVITY_SAMPLE_INTERVAL for rows written before it was stored). Use convert_activity_to_sessions() to migrate.
+ACTIVITY_FORMAT = 'samples'
+ACTIVITY_SESSIONS_FILE = 'activity_sessions.csv'
+ACTIVITY_SAMPLE_INTERVAL = 10 # Default seconds between tracker samples (ActivityTracker._sleep_interval)
+SESSION_COLUMNS = ['Start', 'End', 'ActiveInfo', 'Interval']
+
+# --- Write Notifications ---
+# Callbacks registered here are called as callback(kind, records) after every successful write,
+# where kind is 'activity' or 'subjective' and records is a list of dicts (one per row, raw values).
+# They run on the thread that did the write (the tracker thread for activity samples).
+_write_listeners = []
+_last_write_listeners = [] # Run after all of the above, whatever the registration order
+
+def add_write_listener(callback, last=False):
+    """
+    Registers a callback to be notified of every row written through this module.
+    last=True callbacks run after every other listener has seen the write; use it for listeners
+    that pass the change on to consumers, which may read state the other listeners maintain.
+    """
+    listeners = _last_write_listeners if last else _write_listeners
+    if callback not in listeners:
+        listeners.append(callback)
+
+def remove_write_listener(callback):
+    """Unregisters a callback added with add_write_listener()."""
+    for listeners in (_write_listeners, _last_write_listeners):
+        if callback in listeners:
+            listeners.remove(callback)
+
+def _notify_write(kind, records):
+    for callback in _write_listeners + _last_write_listeners:
+        try:
+            callback(kind, records)
+        except Exception as e:
+            # A failing listener must never lose or block a write
+            logger.error("Write listener %s failed: %s", callback, e)
+
+@metrics.timed('data.save_activity')
 def save_activity_data(timestamp, active_info):
     """Appends activity data to the activity CSV file."""
     # Ensure timestamp is in a consistent format, e.g., ISO
@@ -13,14 +96,104 @@ def save_activity_data(timestamp, active_info):
         timestamp = timestamp.isoformat()
 
     data = {'Timestamp': [timestamp], 'ActiveInfo': [active_info]} # Changed ActiveApp to ActiveInfo for clarity
-    df = pd.DataFrame(data)
-    if not os.path.isfile(ACTIVITY_FILE):
-        df.to_csv(ACTIVITY_FILE, index=False)
+    if STORAGE_BACKEND == 'sqlite':
+        sqlite_store.insert_activity(SQLITE_FILE, [(timestamp, active_info)])
+    elif STORAGE_BACKEND == 'columnar':
+        columnar_store.append(_columnar_dir('activity'), pd.DataFrame(data), 'activity')
+    elif PARTITION_BY:
+        _append_partitioned('activity', pd.DataFrame(data))
     else:
-        df.to_csv(ACTIVITY_FILE, mode='a', header=False, index=False)
+        df = pd.DataFrame(data)
+        if not os.path.isfile(ACTIVITY_FILE):
+            df.to_csv(ACTIVITY_FILE, index=False)
+        else:
+            df.to_csv(ACTIVITY_FILE, mode='a', header=False, index=False)
+    _notify_write('activity', [{'Timestamp': timestamp, 'ActiveInfo': active_info}])
     # print(f"Logged activity: {active_info} at {timestamp}") # Keep or remove print for debugging
 
+
+class BufferedActivityWriter:
+    """
+    Write-behind buffer for activity samples.
+    Samples are kept in memory and appended to the activity CSV file in one bulk write
+    once either `max_samples` are pending or the oldest pending sample is `max_age` seconds old.
+    Call flush() before shutting down so no pending samples are lost.
+    """
+    def __init__(self, file_path=None, max_samples=30, max_age=300, fsync=False, monotonic=time.monotonic):
+        """
+        file_path: CSV file to append to. Defaults to ACTIVITY_FILE (resolved at flush time).
+        max_samples: Flush once this many samples are pending.
+        max_age: Flush once the oldest pending sample is this many seconds old.
+        fsync: If True, os.fsync() the file after every flush (durable, but slower on spinning disks).
+        monotonic: Clock for max_age (a simulated clock in soak tests).
+        """
+        self.file_path = file_path
+        self.max_samples = max_samples
+        self.max_age = max_age
+        self.fsync = fsync
+        self._monotonic = monotonic
+        self._pending = []
+        self._oldest_pending = None # monotonic() of the oldest pending sample
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock() # Serializes flushes from the tracker thread and the UI thread
+
+    def add(self, timestamp, active_info):
+        """Queues one activity sample, flushing if the size or age threshold is reached."""
+        # Ensure timestamp is in a consistent format, e.g., ISO
+        if not isinstance(timestamp, str):
+            timestamp = timestamp.isoformat()
+
+        with self._lock:
+            if not self._pending:
+                self._oldest_pending = self._monotonic()
+            self._pending.append((timestamp, active_info))
+            should_flush = len(self._pending) >= self.max_samples or \
+                           self._monotonic() - self._oldest_pending >= self.max_age
+        if should_flush:
+            self.flush()
+
+    def pending_count(self):
+        """Returns the number of samples not yet written to disk."""
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Appends all pending samples to the activity file. Returns the number of rows written."""
+        with self._write_lock, metrics.timer('data.activity_flush'):
+            return self._flush_locked()
+
+    def _flush_locked(self):
+        with self._lock:
+            rows = self._pending
+            self._pending = []
+            self._oldest_pending = None
+        if not rows:
+            return 0
+
+        try:
+            if self.file_path is None and STORAGE_BACKEND == 'sqlite':
+                sqlite_store.insert_activity(SQLITE_FILE, rows)
+            elif self.file_path is None and STORAGE_BACKEND == 'columnar':
+                columnar_store.append(_columnar_dir('activity'), pd.DataFrame(rows, columns=['Timestamp', 'ActiveInfo']),
+                                      'activity')
+            elif self.file_path is None and PARTITION_BY:
+                _append_partitioned('activity', pd.DataFrame(rows, columns=['Timestamp', 'ActiveInfo']), self.fsync)
+            else:
+                _append_csv(self.file_path or ACTIVITY_FILE, pd.DataFrame(rows, columns=['Timestamp', 'ActiveInfo']), self.fsync)
+        except Exception as e:
+            # Put the rows back so the next flush retries them
+            logger.error("BufferedActivityWriter: Error writing activity data: %s", e)
+            with self._lock:
+                self._pending = rows + self._pending
+                self._oldest_pending = self._monotonic()
+            return 0
+        metrics.count('data.activity_rows_written', len(rows))
+        if self.file_path is None: # Only writes to the shared activity file are announced
+            _notify_write('activity', [{'Timestamp': t, 'ActiveInfo': info} for t, info in rows])
+        return len(rows)
+
 # Modified to accept 'sentiment_score'
+@metrics.timed('data.save_subjective')
 def save_subjective_data(timestamp, color_choice, emotion, sentiment_score, optional_text=""):
     """Appends subjective data (color, emotion, sentiment_score, text) to the subjective CSV file."""
     # Ensure timestamp is in a consistent format, e.g., ISO
@@ -28,64 +201,716 @@ def save_subjective_data(timestamp, color_choice, emotion, sentiment_score, opti
         timestamp = timestamp.isoformat()
 
     data = {'Timestamp': [timestamp], 'ColorChoice': [color_choice], 'Emotion': [emotion], 'SentimentScore': [sentiment_score], 'OptionalText': [optional_text]} # Added SentimentScore
-    df = pd.DataFrame(data)
-    if not os.path.isfile(SUBJECTIVE_FILE):
-        df.to_csv(SUBJECTIVE_FILE, index=False)
+    if STORAGE_BACKEND == 'sqlite':
+        sqlite_store.insert_subjective(SQLITE_FILE, [(timestamp, color_choice, emotion, sentiment_score, optional_text)])
+    elif STORAGE_BACKEND == 'columnar':
+        columnar_store.append(_columnar_dir('subjective'), pd.DataFrame(data), 'subjective')
+    elif PARTITION_BY:
+        _append_partitioned('subjective', pd.DataFrame(data))
     else:
-        df.to_csv(SUBJECTIVE_FILE, mode='a', header=False, index=False)
+        df = pd.DataFrame(data)
+        if not os.path.isfile(SUBJECTIVE_FILE):
+            df.to_csv(SUBJECTIVE_FILE, index=False)
+        else:
+            df.to_csv(SUBJECTIVE_FILE, mode='a', header=False, index=False)
+    _notify_write('subjective', [{col: values[0] for col, values in data.items()}])
     # print(f"Logged subjective choice: {color_choice}, Emotion: {emotion}, Sentiment: {sentiment_score}, Text: '{optional_text}' at {timestamp}") # Keep or remove print for debugging
 
-def load_subjective_data():
-    """Loads all subjective data from the CSV file, ensuring correct columns and types."""
-    if os.path.isfile(SUBJECTIVE_FILE):
+def _append_csv(file_path, df, fsync=False):
+    """Appends df to a CSV file in one write, adding the header if the file is new or empty."""
+    write_header = not os.path.isfile(file_path) or os.path.getsize(file_path) == 0
+    with open(file_path, 'a', newline='') as f:
+        df.to_csv(f, header=write_header, index=False)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+# --- Time Partitions ---
+
+def _partition_key(timestamp):
+    """Partition name for an ISO timestamp string: 'YYYY-MM' or 'YYYY-MM-DD'."""
+    return timestamp[:10] if PARTITION_BY == 'day' else timestamp[:7]
+
+
+def _partition_dir(kind, data_dir=None):
+    return os.path.join(_path(PARTITION_ROOT, data_dir), kind)
+
+
+def _append_partitioned(kind, df, fsync=False):
+    """Appends rows (with ISO string Timestamps) to the partition file of each row's period."""
+    os.makedirs(_partition_dir(kind), exist_ok=True)
+    keys = df['Timestamp'].astype(str).map(_partition_key)
+    for key, rows in df.groupby(keys, sort=True):
+        _append_csv(os.path.join(_partition_dir(kind), f"{key}.csv"), rows, fsync)
+
+
+def _partition_bounds(key):
+    """[start, end) covered by a partition file name, or None if the name is not a partition."""
+    try:
+        if len(key) == 10:
+            start = pd.Timestamp(key)
+            return start, start + pd.Timedelta(days=1)
+        if len(key) == 7:
+            start = pd.Timestamp(key + '-01')
+            return start, start + pd.offsets.MonthBegin(1)
+    except ValueError:
+        pass
+    return None
+
+
+def list_partitions(kind, start=None, end=None, data_dir=None):
+    """
+    Returns the partition files of a data set overlapping [start, end), oldest first.
+    This is the pruning step: partitions outside the window are never opened.
+    """
+    directory = _partition_dir(kind, data_dir)
+    if not os.path.isdir(directory):
+        return []
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    selected = []
+    for name in os.listdir(directory):
+        key, ext = os.path.splitext(name)
+        bounds = _partition_bounds(key) if ext == '.csv' else None
+        if bounds is None:
+            continue
+        if (end is not None and bounds[0] >= end) or (start is not None and bounds[1] <= start):
+            continue
+        selected.append((bounds[0], os.path.join(directory, name)))
+    return [path for _, path in sorted(selected)]
+
+
+# Partition path -> IncrementalCsvReader, so the recent partitions are parsed incrementally too.
+# Bounded: every reader holds its partition's rows, and a full-history load touches all partitions.
+_partition_readers = OrderedDict()
+_partition_readers_lock = threading.Lock()
+
+
+def _load_partitioned_file(path, kind, cache=True):
+    """Returns the cached, normalized contents of one partition (shared; do not modify), or None."""
+    reader = None
+    if cache:
+        with _partition_readers_lock:
+            reader = _partition_readers.get(path)
+            if reader is not None:
+                _partition_readers.move_to_end(path)
+    if reader is None:
+        normalize = _normalize_subjective if kind == 'subjective' else _normalize_activity
+        reader = IncrementalCsvReader(normalize)
+        if cache:
+            with _partition_readers_lock:
+                _partition_readers[path] = reader
+                while len(_partition_readers) > PARTITION_READER_CACHE_SIZE:
+                    _partition_readers.popitem(last=False)
+    try:
+        return reader.read(path)
+    except pd.errors.EmptyDataError:
+        return None
+
+
+def _load_partitioned(kind, start=None, end=None, data_dir=None):
+    """Loads and concatenates only the partitions overlapping [start, end), then trims to the window."""
+    frames = []
+    for path in list_partitions(kind, start, end, data_dir):
+        df = _load_partitioned_file(path, kind, cache=data_dir is None)
+        if df is not None and not df.empty:
+            frames.append(df)
+    if not frames:
+        if kind == 'subjective':
+            return pd.DataFrame(columns=['Timestamp', 'ColorChoice', 'Emotion', 'SentimentScore', 'OptionalText'])
+        return pd.DataFrame(columns=['Timestamp', 'ActiveInfo'])
+    # concat always copies, so the cached partition frames are never handed out
+    return _filter_range(pd.concat(frames, ignore_index=True), start, end)
+
+
+def partition_csv_files(chunksize=500_000):
+    """
+    One-shot split of ACTIVITY_FILE and SUBJECTIVE_FILE into PARTITION_BY partitions.
+    The original files are left in place. Returns the number of rows written per data set.
+    """
+    if not PARTITION_BY:
+        raise ValueError("Set data_manager.PARTITION_BY to 'day' or 'month' before partitioning.")
+    written = {'activity': 0, 'subjective': 0}
+    for kind, csv_path in (('activity', ACTIVITY_FILE), ('subjective', SUBJECTIVE_FILE)):
+        if list_partitions(kind):
+            logger.info("%s already has partitions, skipping %s.", _partition_dir(kind), csv_path)
+            continue
         try:
-            df = pd.read_csv(SUBJECTIVE_FILE)
-            # Ensure required columns exist
-            required_cols = ['Timestamp', 'ColorChoice', 'Emotion', 'SentimentScore', 'OptionalText']
-            for col in required_cols:
-                if col not in df.columns:
-                    # Add missing columns with None, but specifically 0 for SentimentScore
-                    if col == 'SentimentScore':
-                        df[col] = 0 # Default sentiment to 0 if column is missing
-                    else:
-                        df[col] = None # Default other missing columns to None
-
-            # Ensure Timestamp is datetime and handle potential errors
-            df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
-            df.dropna(subset=['Timestamp'], inplace=True) # Drop rows with invalid timestamps
-
-            # Ensure SentimentScore is numeric after loading/adding
-            # Use errors='coerce' to turn any non-numeric values into NaN
-            df['SentimentScore'] = pd.to_numeric(df['SentimentScore'], errors='coerce')
-            # Optional: Drop rows where sentiment score couldn't be converted to numeric
-            # df.dropna(subset=['SentimentScore'], inplace=True)
-
-
-            return df
+            for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+                # Normalize ISO timestamps so the partition key (a string prefix) is reliable
+                timestamps = pd.to_datetime(chunk['Timestamp'], errors='coerce', format='ISO8601')
+                chunk = chunk[timestamps.notna()].copy()
+                chunk['Timestamp'] = timestamps[timestamps.notna()].map(pd.Timestamp.isoformat)
+                _append_partitioned(kind, chunk)
+                written[kind] += len(chunk)
+        except FileNotFoundError:
+            pass
         except pd.errors.EmptyDataError:
-             # Return a DataFrame with all required columns if the file is empty
-             return pd.DataFrame(columns=['Timestamp', 'ColorChoice', 'Emotion', 'SentimentScore', 'OptionalText'])
-    # Return a DataFrame with all required columns if the file doesn't exist
-    return pd.DataFrame(columns=['Timestamp', 'ColorChoice', 'Emotion', 'SentimentScore', 'OptionalText'])
+            pass
+    logger.info("Partitioned %d activity rows and %d subjective rows by %s.", written['activity'], written['subjective'], PARTITION_BY)
+    return written
+
+
+def storage_signature(kind, data_dir=None):
+    """
+    Cheap fingerprint of the stored data for 'activity' or 'subjective' (file sizes/mtimes, or the
+    SQLite row id and newest Timestamp). It changes whenever rows are added or files are rewritten,
+    so derived data (e.g. persisted aggregates) can tell whether it is still current without reading the data.
+    """
+    if STORAGE_BACKEND == 'sqlite':
+        return ['sqlite'] + list(sqlite_store.table_signature(_path(SQLITE_FILE, data_dir), kind))
+    if STORAGE_BACKEND == 'columnar':
+        paths = columnar_store.data_files(_columnar_dir(kind, data_dir))
+    elif PARTITION_BY and not (kind == 'activity' and ACTIVITY_FORMAT == 'sessions'):
+        paths = list_partitions(kind, data_dir=data_dir)
+    elif kind == 'activity':
+        paths = [_path(ACTIVITY_SESSIONS_FILE if ACTIVITY_FORMAT == 'sessions' else ACTIVITY_FILE, data_dir)]
+    else:
+        paths = [_path(SUBJECTIVE_FILE, data_dir)]
+    signature = [STORAGE_BACKEND]
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        signature.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def _filter_range(df, start=None, end=None):
+    """Keeps rows with start <= Timestamp < end (either bound may be None)."""
+    if start is not None:
+        df = df[df['Timestamp'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['Timestamp'] < pd.Timestamp(end)]
+    return df
+
+
+def _select_columns(df, columns):
+    """Restricts df to the requested columns (Timestamp is always kept)."""
+    if columns is None:
+        return df
+    return df[['Timestamp'] + [col for col in dict.fromkeys(columns) if col != 'Timestamp']]
+
+
+@metrics.timed('data.load_subjective')
+def load_subjective_data(start=None, end=None, columns=None, data_dir=None):
+    """
+    Loads subjective data, ensuring correct columns and types.
+    start/end optionally restrict the result to start <= Timestamp < end.
+    columns optionally limits the result to those columns (plus Timestamp); the columnar
+    backend then only reads those columns from disk.
+    data_dir optionally reads another directory's data files (see _path).
+    """
+    if STORAGE_BACKEND == 'sqlite':
+        return _select_columns(sqlite_store.query_subjective(_path(SQLITE_FILE, data_dir), start, end), columns)
+    if STORAGE_BACKEND == 'columnar':
+        df = columnar_store.read(_columnar_dir('subjective', data_dir), columns, start, end)
+        if df is None:
+            df = pd.DataFrame(columns=['Timestamp', 'ColorChoice', 'Emotion', 'SentimentScore', 'OptionalText'])
+        return _select_columns(df, columns)
+    if PARTITION_BY:
+        return _select_columns(_load_partitioned('subjective', start, end, data_dir), columns)
+    return _select_columns(_filter_range(_load_subjective_csv(data_dir), start, end), columns)
+
+
+def load_recent_subjective_data(n, columns=None, data_dir=None):
+    """
+    Loads the newest n subjective entries that have a numeric SentimentScore, oldest first.
+    Reads as little history as the storage allows: a LIMIT query for SQLite and only the
+    newest partitions when PARTITION_BY is set.
+    """
+    if STORAGE_BACKEND == 'sqlite':
+        return _select_columns(sqlite_store.query_recent_subjective(_path(SQLITE_FILE, data_dir), n), columns)
+    if STORAGE_BACKEND == 'csv' and PARTITION_BY:
+        frames = []
+        found = 0
+        for path in reversed(list_partitions('subjective', data_dir=data_dir)):
+            df = _load_partitioned_file(path, 'subjective', cache=data_dir is None)
+            if df is None or df.empty:
+                continue
+            df = df.dropna(subset=['SentimentScore'])
+            frames.insert(0, df)
+            found += len(df)
+            if found >= n:
+                break # Older partitions cannot contribute to the newest n entries
+        if not frames:
+            return _select_columns(pd.DataFrame(columns=['Timestamp', 'ColorChoice', 'Emotion', 'SentimentScore', 'OptionalText']), columns)
+        return _select_columns(pd.concat(frames, ignore_index=True).tail(n), columns)
+    # Single file (or Parquet data set, which at least reads only the requested columns)
+    needed = None if columns is None else list(columns) + ['SentimentScore']
+    df = load_subjective_data(columns=needed, data_dir=data_dir)
+    return _select_columns(df.dropna(subset=['SentimentScore']).tail(n), columns)
+
+
+def _normalize_subjective(df):
+    """Ensures the subjective columns exist and have the expected types."""
+    # Ensure required columns exist
+    required_cols = ['Timestamp', 'ColorChoice', 'Emotion', 'SentimentScore', 'OptionalText']
+    for col in required_cols:
+        if col not in df.columns:
+            # Add missing columns with None, but specifically 0 for SentimentScore
+            if col == 'SentimentScore':
+                df[col] = 0 # Default sentiment to 0 if column is missing
+            else:
+                df[col] = None # Default other missing columns to None
+
+    # Ensure Timestamp is datetime and handle potential errors
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
+    df.dropna(subset=['Timestamp'], inplace=True) # Drop rows with invalid timestamps
+
+    # Ensure SentimentScore is numeric after loading/adding
+    # Use errors='coerce' to turn any non-numeric values into NaN
+    df['SentimentScore'] = pd.to_numeric(df['SentimentScore'], errors='coerce')
+    # Optional: Drop rows where sentiment score couldn't be converted to numeric
+    # df.dropna(subset=['SentimentScore'], inplace=True)
+    return df
 
 
-def load_activity_data():
+def _normalize_activity(df):
+    """Ensures the activity columns exist and have the expected types."""
+    # Ensure Timestamp is datetime and handle potential errors
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
+    df.dropna(subset=['Timestamp'], inplace=True) # Drop rows with invalid timestamps
+    # Ensure 'ActiveInfo' column exists for older files
+    if 'ActiveInfo' not in df.columns and 'ActiveApp' in df.columns:
+         df['ActiveInfo'] = df['ActiveApp'] # Rename if old column name exists
+    elif 'ActiveInfo' not in df.columns:
+         df['ActiveInfo'] = None # Add if completely missing
+
+    return df[['Timestamp', 'ActiveInfo']] # Return only expected columns
+
+
+class IncrementalCsvReader:
+    """
+    Caches the parsed contents of an append-only CSV file.
+    Remembers the byte offset and row count it last parsed; on the next read only the rows
+    appended since then are parsed and concatenated onto the cached DataFrame.
+    If the file shrank or the bytes before the old offset changed (the file was rewritten),
+    it falls back to a full reload.
+    """
+    _FINGERPRINT_BYTES = 256 # Bytes just before the parsed offset, compared to detect rewrites
+
+    def __init__(self, normalize):
+        """normalize: function applied to every freshly parsed chunk (full file or appended rows)."""
+        self.normalize = normalize
+        self._lock = threading.Lock()
+        self._path = None
+        self.reset()
+
+    def reset(self):
+        """Forgets the cached data so the next read parses the whole file."""
+        self._df = None
+        self._columns = None
+        self._offset = 0 # Bytes parsed so far (always ends on a line boundary)
+        self._rows = 0 # Raw CSV rows parsed so far
+        self._size = None
+        self._mtime = None
+        self._fingerprint = b''
+
+    @property
+    def row_count(self):
+        return self._rows
+
+    def read(self, path):
+        """
+        Returns the cached DataFrame for path, parsing only what changed since the last call.
+        Returns None if the file does not exist. Raises pd.errors.EmptyDataError for an empty file.
+        The returned DataFrame is shared; callers must copy it before modifying it.
+        """
+        with self._lock:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self.reset()
+                return None
+
+            if path != self._path:
+                self.reset()
+                self._path = path
+
+            if self._df is not None and stat.st_size == self._size and stat.st_mtime_ns == self._mtime:
+                return self._df # Unchanged since last read
+
+            with open(path, 'rb') as f:
+                if self._df is not None and self._is_append_of_cached(f, stat.st_size):
+                    self._read_appended(f, stat)
+                else:
+                    self._read_full(f, stat)
+            return self._df
+
+    def _is_append_of_cached(self, f, size):
+        """True if the file still starts with the bytes already parsed (i.e. it was only appended to)."""
+        if size < self._offset:
+            return False # Truncated
+        fingerprint_start = max(0, self._offset - self._FINGERPRINT_BYTES)
+        f.seek(fingerprint_start)
+        return f.read(self._offset - fingerprint_start) == self._fingerprint
+
+    def _complete_lines(self, f, start, size):
+        """
+        Reads bytes [start, size) and cuts them at the last row boundary, so half-written rows wait for the next read.
+        start is always a row boundary, so a newline ends a row only if an even number of quotes precede it
+        (newlines inside a quoted field, e.g. multi-line OptionalText, do not).
+        """
+        f.seek(start)
+        data = f.read(size - start)
+        cut = data.rfind(b'\n') + 1
+        quotes = data.count(b'"', 0, cut)
+        while cut and quotes % 2:
+            previous = data.rfind(b'\n', 0, cut - 1) + 1
+            quotes -= data.count(b'"', previous, cut)
+            cut = previous
+        return data[:cut]
+
+    def _remember(self, f, new_offset, stat):
+        self._offset = new_offset
+        self._size = stat.st_size
+        self._mtime = stat.st_mtime_ns
+        fingerprint_start = max(0, new_offset - self._FINGERPRINT_BYTES)
+        f.seek(fingerprint_start)
+        self._fingerprint = f.read(new_offset - fingerprint_start)
+
+    def _read_full(self, f, stat):
+        self.reset()
+        data = self._complete_lines(f, 0, stat.st_size)
+        df = pd.read_csv(io.BytesIO(data)) # Raises EmptyDataError for an empty file
+        self._columns = list(df.columns)
+        self._rows = len(df)
+        self._df = self.normalize(df)
+        self._remember(f, len(data), stat)
+
+    def _read_appended(self, f, stat):
+        data = self._complete_lines(f, self._offset, stat.st_size)
+        if data:
+            new_rows = pd.read_csv(io.BytesIO(data), header=None, names=self._columns)
+            self._rows += len(new_rows)
+            new_rows = self.normalize(new_rows)
+            if not new_rows.empty:
+                self._df = pd.concat([self._df, new_rows], ignore_index=True)
+        self._remember(f, self._offset + len(data), stat)
+
+
+_subjective_reader = IncrementalCsvReader(_normalize_subjective)
+_activity_reader = IncrementalCsvReader(_normalize_activity)
+
+
+def _load_subjective_csv(data_dir=None):
+    """Loads all subjective data from the CSV file, ensuring correct columns and types."""
+    # Other directories are parsed with a throwaway reader instead of the module cache
+    reader = _subjective_reader if data_dir is None else IncrementalCsvReader(_normalize_subjective)
+    try:
+        df = reader.read(_path(SUBJECTIVE_FILE, data_dir))
+    except pd.errors.EmptyDataError:
+        df = None
+    if df is None:
+        # Return a DataFrame with all required columns if the file is empty or doesn't exist
+        return pd.DataFrame(columns=['Timestamp', 'ColorChoice', 'Emotion', 'SentimentScore', 'OptionalText'])
+    return df.copy() if reader is _subjective_reader else df # Callers modify the result in place, so never hand out the cached frame
+
+
+@metrics.timed('data.load_activity')
+def load_activity_data(start=None, end=None, data_dir=None):
+    """
+    Loads activity data.
+    start/end optionally restrict the result to start <= Timestamp < end.
+    data_dir optionally reads another directory's data files (see _path).
+    """
+    if STORAGE_BACKEND == 'sqlite':
+        return sqlite_store.query_activity(_path(SQLITE_FILE, data_dir), start, end)
+    if STORAGE_BACKEND == 'columnar':
+        df = columnar_store.read(_columnar_dir('activity', data_dir), None, start, end)
+        return df if df is not None else pd.DataFrame(columns=['Timestamp', 'ActiveInfo'])
+    if PARTITION_BY and ACTIVITY_FORMAT != 'sessions':
+        return _load_partitioned('activity', start, end, data_dir)
+    if ACTIVITY_FORMAT == 'sessions':
+        # Only expand the runs overlapping the requested window
+        return _filter_range(expand_activity_sessions(load_activity_sessions(start, end, data_dir)), start, end)
+    return _filter_range(_load_activity_csv(data_dir), start, end)
+
+
+def _load_activity_csv(data_dir=None):
     """Loads all activity data from the CSV file."""
-    if os.path.isfile(ACTIVITY_FILE):
+    reader = _activity_reader if data_dir is None else IncrementalCsvReader(_normalize_activity)
+    try:
+        df = reader.read(_path(ACTIVITY_FILE, data_dir))
+    except pd.errors.EmptyDataError:
+        df = None
+    if df is None:
+        return pd.DataFrame(columns=['Timestamp', 'ActiveInfo']) # Return empty if file is empty or missing
+    return df.copy() if reader is _activity_reader else df
+
+
+# --- Activity Sessions (run-length encoded activity) ---
+
+def create_activity_writer(interval=None, **kwargs):
+    """
+    Returns the activity writer matching ACTIVITY_FORMAT (sessions are only supported for CSV storage).
+    interval: The tracker's seconds between samples (only runs of samples need it; samples carry their timestamps).
+    """
+    if ACTIVITY_FORMAT == 'sessions' and STORAGE_BACKEND == 'csv':
+        return SessionActivityWriter(interval=interval, **kwargs)
+    return BufferedActivityWriter(**kwargs)
+
+
+class SessionActivityWriter:
+    """
+    Run-length activity writer with the same add()/flush()/pending_count() interface as BufferedActivityWriter.
+    Consecutive samples with the same ActiveInfo extend the current run in place; a row is only emitted when
+    the info changes, when there is a gap longer than max_gap seconds (e.g. the machine slept), or when the
+    open run has not been written for max_age seconds. Closed runs are written as soon as the oldest of them
+    was opened max_age ago (a checkpointed run right away), so a crash loses at most about max_age of activity.
+    flush() writes everything, including the open run, and should be called before shutting down.
+    """
+    def __init__(self, file_path=None, max_sessions=10, max_age=300, max_gap=None, fsync=False, monotonic=time.monotonic,
+                 interval=None):
+        """
+        file_path: Sessions CSV to append to. Defaults to ACTIVITY_SESSIONS_FILE (resolved at flush time).
+        max_sessions: Flush once this many closed runs are pending.
+        max_age: Seconds after which the open run is checkpointed (closed and continued in a new row).
+        max_gap: Seconds between samples that still count as the same run. Defaults to 3 sample intervals.
+        fsync: If True, os.fsync() the file after every flush.
+        monotonic: Clock for max_age (a simulated clock in soak tests).
+        interval: Seconds between the samples passed to add(), stored with every run so it expands back
+                  into the right number of samples. Defaults to ACTIVITY_SAMPLE_INTERVAL; see set_interval().
+        """
+        self.file_path = file_path
+        self.max_sessions = max_sessions
+        self.max_age = max_age
+        self.interval = interval or ACTIVITY_SAMPLE_INTERVAL
+        self.max_gap = max_gap if max_gap is not None else 3 * self.interval
+        self.fsync = fsync
+        self._monotonic = monotonic
+        self._closed = [] # Finished runs as (start, end, active_info) waiting to be written
+        self._oldest_pending = None # monotonic() when the oldest waiting run was opened (its data is that old)
+        self._run = None # Open run as [start, end, active_info, interval]
+        self._run_opened = None # monotonic() when the open run was started
+        self._unannounced = [] # Raw samples not yet passed to the write listeners
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def add(self, timestamp, active_info):
+        """Extends the open run with one sample, or closes it and starts a new one."""
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+
+        with self._lock:
+            run = self._run
+            if run is not None and run[2] == active_info and \
+               (timestamp - run[1]).total_seconds() <= self.max_gap and \
+               self._monotonic() - self._run_opened < self.max_age:
+                run[1] = timestamp # Same activity: extend in place, nothing to write
+            else:
+                if run is not None:
+                    self._close_run_locked()
+                self._run = [timestamp, timestamp, active_info, self.interval]
+                self._run_opened = self._monotonic()
+            self._unannounced.append({'Timestamp': timestamp.isoformat(), 'ActiveInfo': active_info})
+            should_flush = len(self._closed) >= self.max_sessions or \
+                           (self._closed and self._monotonic() - self._oldest_pending >= self.max_age)
+        if should_flush:
+            with self._write_lock, metrics.timer('data.session_flush'):
+                self._write(include_open_run=False)
+
+    def _close_run_locked(self):
+        if not self._closed:
+            self._oldest_pending = self._run_opened
+        self._closed.append(tuple(self._run))
+        self._run = None
+
+    def set_interval(self, seconds):
+        """
+        Sets the seconds between the samples passed from now on. The open run is closed, so every run
+        has one interval; max_gap grows so that runs are not split just because samples are further apart.
+        """
+        with self._lock:
+            if seconds == self.interval:
+                return
+            if self._run is not None:
+                self._close_run_locked()
+            self.interval = seconds
+            self.max_gap = max(self.max_gap, 3 * seconds)
+
+    def pending_count(self):
+        """Returns the number of runs (closed and open) not yet written to disk."""
+        with self._lock:
+            return len(self._closed) + (1 if self._run is not None else 0)
+
+    def flush(self):
+        """Writes all pending runs, closing the open one. Returns the number of rows written."""
+        with self._write_lock, metrics.timer('data.session_flush'):
+            return self._write(include_open_run=True)
+
+    def _write(self, include_open_run):
+        with self._lock:
+            rows = self._closed
+            self._closed = []
+            self._oldest_pending = None
+            if include_open_run and self._run is not None:
+                rows.append(tuple(self._run))
+                self._run = None
+            announced = self._unannounced
+            self._unannounced = []
+        if not rows:
+            return 0
+
+        file_path = self.file_path or ACTIVITY_SESSIONS_FILE
+        df = pd.DataFrame([(start.isoformat(), end.isoformat(), info, interval) for start, end, info, interval in rows],
+                          columns=SESSION_COLUMNS)
+        write_header = not os.path.isfile(file_path) or os.path.getsize(file_path) == 0
         try:
-            df = pd.read_csv(ACTIVITY_FILE)
-            # Ensure Timestamp is datetime and handle potential errors
-            df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
-            df.dropna(subset=['Timestamp'], inplace=True) # Drop rows with invalid timestamps
-            # Ensure 'ActiveInfo' column exists for older files
-            if 'ActiveInfo' not in df.columns and 'ActiveApp' in df.columns:
-                 df['ActiveInfo'] = df['ActiveApp'] # Rename if old column name exists
-            elif 'ActiveInfo' not in df.columns:
-                 df['ActiveInfo'] = None # Add if completely missing
-
-            return df[['Timestamp', 'ActiveInfo']] # Return only expected columns
-        except pd.errors.EmptyDataError:
-            return pd.DataFrame(columns=['Timestamp', 'ActiveInfo']) # Return empty if file is empty
-    return pd.DataFrame(columns=['Timestamp', 'ActiveInfo'])
+            if not write_header:
+                _upgrade_sessions_file(file_path)
+            with open(file_path, 'a', newline='') as f:
+                df.to_csv(f, header=write_header, index=False)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+        except OSError as e:
+            # Put the runs back so the next flush retries them
+            logger.error("SessionActivityWriter: Error writing activity sessions: %s", e)
+            with self._lock:
+                self._closed = rows + self._closed
+                self._oldest_pending = self._monotonic()
+                self._unannounced = announced + self._unannounced
+            return 0
+        if self.file_path is None:
+            _notify_write('activity', announced)
+        return len(rows)
+
+
+def _upgrade_sessions_file(file_path):
+    """Adds the Interval column (ACTIVITY_SAMPLE_INTERVAL) to a sessions file written before it existed."""
+    with open(file_path, 'r', newline='') as f:
+        header = f.readline().strip().split(',')
+    if 'Interval' in header:
+        return
+    df = pd.read_csv(file_path, dtype=str, keep_default_na=False)
+    df['Interval'] = ACTIVITY_SAMPLE_INTERVAL
+    tmp_path = file_path + '.tmp'
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, file_path) # The sessions file is small (one row per run), so this one-time rewrite is cheap
+    logger.info("Added the Interval column to %s.", file_path)
+
+
+def _normalize_sessions(df):
+    """Ensures the session columns exist and have the expected types."""
+    for col in ('Start', 'End', 'ActiveInfo'):
+        if col not in df.columns:
+            df[col] = None
+    if 'Interval' not in df.columns:
+        df['Interval'] = ACTIVITY_SAMPLE_INTERVAL
+    df['Start'] = pd.to_datetime(df['Start'], errors='coerce')
+    df['End'] = pd.to_datetime(df['End'], errors='coerce')
+    df['Interval'] = pd.to_numeric(df['Interval'], errors='coerce').fillna(ACTIVITY_SAMPLE_INTERVAL)
+    df.dropna(subset=['Start', 'End'], inplace=True)
+    return df[SESSION_COLUMNS]
+
+
+_sessions_reader = IncrementalCsvReader(_normalize_sessions)
+
+
+@metrics.timed('data.load_activity_sessions')
+def load_activity_sessions(start=None, end=None, data_dir=None):
+    """
+    Loads activity runs (Start, End, ActiveInfo, Interval) from ACTIVITY_SESSIONS_FILE.
+    start/end optionally restrict the result to runs overlapping [start, end).
+    """
+    reader = _sessions_reader if data_dir is None else IncrementalCsvReader(_normalize_sessions)
+    try:
+        df = reader.read(_path(ACTIVITY_SESSIONS_FILE, data_dir))
+    except pd.errors.EmptyDataError:
+        df = None
+    if df is None:
+        return pd.DataFrame(columns=SESSION_COLUMNS)
+    if start is not None:
+        df = df[df['End'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['Start'] < pd.Timestamp(end)]
+    return df.copy()
+
+
+def expand_activity_sessions(sessions, interval=None):
+    """
+    Expands activity runs back into one sample every `interval` seconds, returning a DataFrame shaped
+    like load_activity_data(). interval defaults to each run's Interval column (or ACTIVITY_SAMPLE_INTERVAL
+    if there is none). Vectorized: no per-run Python loop.
+    """
+    if sessions.empty:
+        return pd.DataFrame(columns=['Timestamp', 'ActiveInfo'])
+    if interval is None and 'Interval' in sessions.columns:
+        seconds = pd.to_numeric(sessions['Interval'], errors='coerce').fillna(ACTIVITY_SAMPLE_INTERVAL).to_numpy(dtype=float)
+    else:
+        seconds = np.full(len(sessions), float(interval or ACTIVITY_SAMPLE_INTERVAL))
+    step_ns = np.maximum(np.round(seconds * 1e9).astype('int64'), 1) # Per run
+    starts = sessions['Start'].to_numpy(dtype='datetime64[ns]')
+    durations_ns = (sessions['End'].to_numpy(dtype='datetime64[ns]') - starts).astype('int64')
+    # Samples per run: the start sample plus one per full interval up to End
+    counts = durations_ns // step_ns + 1
+    counts[counts < 1] = 1
+    run_index = np.repeat(np.arange(len(sessions)), counts)
+    # Position of each sample within its run: 0, 1, 2, ... restarting at every run
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    timestamps = starts[run_index] + (offsets * step_ns[run_index]).astype('timedelta64[ns]')
+    return pd.DataFrame({'Timestamp': timestamps,
+                         'ActiveInfo': sessions['ActiveInfo'].to_numpy()[run_index]})
+
+
+def compact_activity_samples(samples, max_gap=None):
+    """
+    Collapses activity samples (Timestamp, ActiveInfo) into runs (Start, End, ActiveInfo, Interval).
+    A new run starts whenever ActiveInfo changes or consecutive samples are more than max_gap seconds apart.
+    Interval is the run's mean spacing in whole seconds (ACTIVITY_SAMPLE_INTERVAL for single-sample runs).
+    """
+    if samples.empty:
+        return pd.DataFrame(columns=SESSION_COLUMNS)
+    max_gap = pd.Timedelta(seconds=max_gap if max_gap is not None else 3 * ACTIVITY_SAMPLE_INTERVAL)
+    samples = samples.sort_values('Timestamp', kind='stable')
+    info = samples['ActiveInfo'].fillna('')
+    new_run = (info != info.shift()) | (samples['Timestamp'].diff() > max_gap)
+    run_id = new_run.cumsum()
+    runs = samples.groupby(run_id, sort=False).agg(Start=('Timestamp', 'first'),
+                                                  End=('Timestamp', 'last'),
+                                                  ActiveInfo=('ActiveInfo', 'first'),
+                                                  Samples=('Timestamp', 'size'))
+    spacing = (runs['End'] - runs['Start']).dt.total_seconds() / (runs['Samples'] - 1).where(runs['Samples'] > 1)
+    runs['Interval'] = spacing.round().clip(lower=1).fillna(ACTIVITY_SAMPLE_INTERVAL).astype('int64')
+    return runs[SESSION_COLUMNS].reset_index(drop=True)
+
+
+def convert_activity_to_sessions(max_gap=None):
+    """
+    One-shot conversion of the sample file ACTIVITY_FILE into ACTIVITY_SESSIONS_FILE (overwritten).
+    Returns (samples read, sessions written).
+    """
+    samples = _load_activity_csv()
+    sessions = compact_activity_samples(samples, max_gap)
+    out = sessions.copy()
+    out['Start'] = out['Start'].map(pd.Timestamp.isoformat)
+    out['End'] = out['End'].map(pd.Timestamp.isoformat)
+    # Write to a temporary file first so an interrupted conversion never leaves a half-written file
+    tmp_path = ACTIVITY_SESSIONS_FILE + '.tmp'
+    out.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, ACTIVITY_SESSIONS_FILE)
+    logger.info("Converted %d activity samples into %d sessions.", len(samples), len(sessions))
+    return len(samples), len(sessions)
+
+
+def import_csv_to_sqlite():
+    """One-shot migration of ACTIVITY_FILE and SUBJECTIVE_FILE into SQLITE_FILE."""
+    return sqlite_store.import_csv(SQLITE_FILE, ACTIVITY_FILE, SUBJECTIVE_FILE)
+
+
+def migrate_csv_to_columnar():
+    """One-shot migration of ACTIVITY_FILE and SUBJECTIVE_FILE into the Parquet data sets under COLUMNAR_DIR."""
+    imported = {
+        'activity': columnar_store.import_csv(_columnar_dir('activity'), ACTIVITY_FILE,
+                                              _normalize_activity, 'activity'),
+        'subjective': columnar_store.import_csv(_columnar_dir('subjective'), SUBJECTIVE_FILE,
+                                                _normalize_subjective, 'subjective'),
+    }
+    logger.info("Migrated %d activity rows and %d subjective rows to %s.", imported['activity'], imported['subjective'], COLUMNAR_DIR)
+    return imported
 
 # You can add more complex loading/filtering later if needed
@@ -0,0 +1,144 @@
+import logging
+import threading
+import pandas as pd
+import data_manager
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('subjective', 'activity')
+
+
+class DataRepository:
+    """
+    Single in-process owner of the parsed subjective and activity DataFrames.
+    Each data set is loaded from disk at most once (lazily, on first use) and is then kept
+    up to date from data_manager's write notifications, so consumers never reload the files
+    after a save. Every change bumps a version counter and notifies subscribers.
+    The DataFrames handed out are shared: treat them as read-only and copy before modifying.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._frames = {kind: None for kind in KINDS} # None means "not loaded yet"
+        self._pending_records = {kind: [] for kind in KINDS} # Rows written since the frame was last consolidated
+        self._loaded_until = {kind: None for kind in KINDS} # Newest Timestamp that came from disk
+        self._loaded_columns = {kind: None for kind in KINDS} # None means all columns were loaded
+        self._versions = {kind: 0 for kind in KINDS}
+        self._subscribers = [] # (callback, kinds) pairs
+        # Notified last, so subscribers see the write only after e.g. the rolling conclusion has it too
+        data_manager.add_write_listener(self._on_write, last=True)
+
+    # --- Data Access ---
+
+    def get_subjective_data(self, columns=None):
+        """
+        Returns the shared, normalized subjective DataFrame (see data_manager.load_subjective_data).
+        If only some columns are requested and nothing wider has been loaded yet, only those columns
+        are read from disk (a later request for more columns reloads the wider set once).
+        """
+        return self._get('subjective', columns)
+
+    def get_activity_data(self):
+        """Returns the shared, normalized activity DataFrame (see data_manager.load_activity_data)."""
+        return self._get('activity')
+
+    def _get(self, kind, columns=None):
+        with self._lock:
+            loaded_columns = self._loaded_columns[kind]
+            if self._frames[kind] is not None and loaded_columns is not None and \
+               (columns is None or not set(columns) <= set(loaded_columns)):
+                # The cached frame is narrower than what is asked for now
+                columns = None if columns is None else sorted(set(columns) | set(loaded_columns))
+                self._frames[kind] = None
+
+            if self._frames[kind] is None:
+                if kind == 'subjective':
+                    frame = data_manager.load_subjective_data(columns=columns)
+                    self._loaded_columns[kind] = None if columns is None else list(frame.columns)
+                else:
+                    frame = data_manager.load_activity_data()
+                self._frames[kind] = frame
+                self._pending_records[kind] = []
+                self._loaded_until[kind] = frame['Timestamp'].max() if not frame.empty else None
+            elif self._pending_records[kind]:
+                # Fold all rows written since the last access into the frame with a single concat
+                new_rows = pd.DataFrame(self._pending_records[kind])
+                self._pending_records[kind] = []
+                if kind == 'subjective':
+                    new_rows = data_manager._normalize_subjective(new_rows)
+                    new_rows = data_manager._select_columns(new_rows, self._loaded_columns[kind])
+                else:
+                    new_rows = data_manager._normalize_activity(new_rows)
+                # A write that landed on disk just before the load is also announced afterwards; skip it
+                if self._loaded_until[kind] is not None:
+                    new_rows = new_rows[new_rows['Timestamp'] > self._loaded_until[kind]]
+                frame = self._frames[kind]
+                if not new_rows.empty:
+                    self._frames[kind] = new_rows if frame.empty else pd.concat([frame, new_rows], ignore_index=True)
+            return data_manager._select_columns(self._frames[kind], columns)
+
+    def version(self, kind=None):
+        """Returns the change counter for one data set, or the sum over both if kind is None."""
+        with self._lock:
+            if kind is None:
+                return sum(self._versions.values())
+            return self._versions[kind]
+
+    def invalidate(self, kind=None):
+        """Drops the cached data (one data set or both) so the next access reloads it from disk."""
+        kinds = KINDS if kind is None else (kind,)
+        with self._lock:
+            for k in kinds:
+                self._frames[k] = None
+                self._pending_records[k] = []
+                self._loaded_until[k] = None
+                self._loaded_columns[k] = None
+                self._versions[k] += 1
+        for k in kinds:
+            self._publish(k)
+
+    # --- Change Notifications ---
+
+    def subscribe(self, callback, kinds=KINDS):
+        """
+        Calls callback(kind, version) whenever one of the given data sets changes.
+        Callbacks run on the thread that performed the write; UI code should hop back
+        to the Tk main loop (e.g. with after()) before touching widgets.
+        """
+        with self._lock:
+            self._subscribers.append((callback, tuple(kinds)))
+
+    def unsubscribe(self, callback):
+        """Removes every subscription of callback."""
+        with self._lock:
+            self._subscribers = [(cb, kinds) for cb, kinds in self._subscribers if cb != callback]
+
+    def _on_write(self, kind, records):
+        """data_manager write listener: queues the new rows for the cached frame instead of reloading."""
+        with self._lock:
+            if self._frames[kind] is not None: # Nothing to extend until someone has loaded this data set
+                self._pending_records[kind].extend(records)
+            self._versions[kind] += 1
+        self._publish(kind)
+
+    def _publish(self, kind):
+        with self._lock:
+            version = self._versions[kind]
+            subscribers = [cb for cb, kinds in self._subscribers if kind in kinds]
+        for callback in subscribers:
+            try:
+                callback(kind, version)
+            except Exception as e:
+                logger.error("Subscriber %s failed: %s", callback, e)
+
+
+_default_repository = None
+_default_lock = threading.Lock()
+
+
+def get_repository():
+    """Returns the process-wide DataRepository, creating it on first use."""
+    global _default_repository
+    with _default_lock:
+        if _default_repository is None:
+            _default_repository = DataRepository()
+        return _default_repository
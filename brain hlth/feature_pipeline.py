@@ -0,0 +1,124 @@
+"""
+Time-bucketed numeric features from both data sets, for AnomalyDetector (which only uses the
+numeric columns of what it is given):
+    ActivitySamples       activity samples in the bucket
+    ActivitySwitches      changes of ActiveInfo between consecutive samples within the bucket
+    DistinctActivities    distinct ActiveInfo values in the bucket
+    Sentiment             latest mood score before the bucket's end (merge_asof)
+    SentimentRollingMean  mean of the last sentiment_window mood scores before the bucket's end
+    SentimentRollingVar   variance of the same scores
+    HoursSinceMood        hours between that latest mood entry and the bucket's end
+Buckets only exist for periods with activity. Sentiment columns are NaN before the first mood entry.
+
+    pipeline = FeaturePipeline()
+    detector = AnomalyDetector()
+    detector.train(pipeline.features())
+"""
+import threading
+import pandas as pd
+import data_manager
+
+FEATURE_COLUMNS = ['ActivitySamples', 'ActivitySwitches', 'DistinctActivities',
+                   'Sentiment', 'SentimentRollingMean', 'SentimentRollingVar', 'HoursSinceMood']
+
+
+def _empty_features():
+    return pd.DataFrame(columns=FEATURE_COLUMNS, index=pd.DatetimeIndex([], name='Bucket'), dtype=float)
+
+
+def compute_features(activity, subjective, bucket='h', sentiment_window=5, previous_info=None):
+    """
+    Features per bucket for the given activity samples (vectorized; no per-row Python code).
+    previous_info: ActiveInfo of the sample just before `activity`, so a switch at the start of
+    an incremental slice is still counted.
+    """
+    if activity.empty:
+        return _empty_features()
+    activity = activity.sort_values('Timestamp', kind='stable')
+    timestamps = pd.to_datetime(activity['Timestamp']).astype('datetime64[ns]')
+    info = activity['ActiveInfo'].astype(object).fillna('')
+    previous = info.shift()
+    if previous_info is not None:
+        previous.iloc[0] = previous_info
+    samples = pd.DataFrame({'Bucket': timestamps.dt.floor(bucket), 'Info': info,
+                            'Switch': (info != previous) & previous.notna()})
+    grouped = samples.groupby('Bucket')
+    features = pd.DataFrame({
+        'ActivitySamples': grouped.size(),
+        'ActivitySwitches': grouped['Switch'].sum(),
+        'DistinctActivities': grouped['Info'].nunique(),
+    }).astype(float)
+
+    # Latest mood (and its rolling statistics) strictly before each bucket's end
+    scores = subjective[['Timestamp', 'SentimentScore']].copy()
+    scores['SentimentScore'] = pd.to_numeric(scores['SentimentScore'], errors='coerce')
+    scores = scores.dropna().sort_values('Timestamp', kind='stable')
+    scores['MoodTime'] = pd.to_datetime(scores['Timestamp']).astype('datetime64[ns]')
+    rolling = scores['SentimentScore'].rolling(sentiment_window, min_periods=1)
+    scores['SentimentRollingMean'] = rolling.mean()
+    scores['SentimentRollingVar'] = scores['SentimentScore'].rolling(sentiment_window, min_periods=2).var()
+    bucket_ends = pd.DataFrame({'BucketEnd': features.index + pd.tseries.frequencies.to_offset(bucket)})
+    joined = pd.merge_asof(bucket_ends, scores[['MoodTime', 'SentimentScore', 'SentimentRollingMean', 'SentimentRollingVar']],
+                           left_on='BucketEnd', right_on='MoodTime', direction='backward', allow_exact_matches=False)
+    features['Sentiment'] = joined['SentimentScore'].to_numpy(dtype=float)
+    features['SentimentRollingMean'] = joined['SentimentRollingMean'].to_numpy(dtype=float)
+    features['SentimentRollingVar'] = joined['SentimentRollingVar'].to_numpy(dtype=float)
+    features['HoursSinceMood'] = ((joined['BucketEnd'] - joined['MoodTime']) / pd.Timedelta(hours=1)).to_numpy(dtype=float)
+    return features[FEATURE_COLUMNS]
+
+
+class FeaturePipeline:
+    """
+    Keeps compute_features() results for the stored data and only recomputes what appends can change.
+    Every bucket except the newest is complete once later samples exist, so it is computed once and
+    cached; on the next call only activity from the newest (still open) bucket onward is loaded
+    (a range load, which partitioned and SQLite storage serve without reading the history).
+    Call reset() after rewriting or deleting data.
+    """
+    def __init__(self, bucket='h', sentiment_window=5, data_dir=None):
+        """
+        bucket: Pandas frequency of the buckets ('h' = hourly).
+        sentiment_window: Number of mood entries in the rolling sentiment statistics.
+        data_dir: Data folder to read (see data_manager._path); None is the working directory.
+        """
+        self.bucket = bucket
+        self.sentiment_window = sentiment_window
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forgets all cached buckets; the next features() call recomputes everything."""
+        self._complete = None # Features of buckets that can no longer change
+        self._open = None # Features of the newest bucket, recomputed on every update
+        self._open_bucket = None # Start of the newest bucket; loading resumes here
+        self._boundary_info = None # ActiveInfo of the last sample before _open_bucket
+        self._signature = None
+
+    def features(self):
+        """Returns the features of all buckets, computing only new or still-open buckets."""
+        with self._lock:
+            signature = [data_manager.storage_signature(kind, self.data_dir) for kind in ('activity', 'subjective')]
+            if signature != self._signature:
+                self._update_locked()
+                self._signature = signature
+            frames = [df for df in (self._complete, self._open) if df is not None and not df.empty]
+            if not frames:
+                return _empty_features()
+            return pd.concat(frames) if len(frames) > 1 else frames[0].copy()
+
+    def _update_locked(self):
+        activity = data_manager.load_activity_data(start=self._open_bucket, data_dir=self.data_dir)
+        subjective = data_manager.load_subjective_data(columns=['Timestamp', 'SentimentScore'], data_dir=self.data_dir)
+        new = compute_features(activity, subjective, self.bucket, self.sentiment_window, self._boundary_info)
+        if new.empty:
+            return
+        newest = new.index.max()
+        complete = new[new.index < newest]
+        if not complete.empty:
+            self._complete = complete if self._complete is None else pd.concat([self._complete, complete])
+            # The next slice starts at the open bucket; remember the sample just before it for switch counting
+            before = activity[pd.to_datetime(activity['Timestamp']) < newest]
+            self._boundary_info = before.sort_values('Timestamp', kind='stable')['ActiveInfo'].astype(object).fillna('').iloc[-1]
+        self._open = new.loc[[newest]]
+        self._open_bucket = newest
@@ -0,0 +1,300 @@
+"""
+The colour -> (SentimentScore, Emotion) mapping used by MoodInputWindow, as a reusable module.
+assign_sentiment_and_emotion() is the reference (one colour at a time, per click). map_hsb() and
+map_colors() apply the same rules to whole arrays with NumPy, and rescore_subjective_data()
+recomputes the stored history with them whenever the rules change:
+
+    python -m report_cli rescore [--data-dir DIR]
+
+Bump MAPPING_VERSION whenever the rules change; rescoring records it per row (MappingVersion column).
+Entries saved after a rescore leave that column empty: the app scored them with the current rules.
+The scalar rules only use the standard library; NumPy and pandas are imported by the vectorized
+functions that need them, so the mood window (imported before the app's first paint) stays cheap.
+"""
+import colorsys # Module to convert RGB to HSB (HSV in Python)
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+MAPPING_VERSION = 1
+
+# The colours offered by MoodInputWindow, a diverse set to cover the HSB mapping
+PALETTE = [
+    "#FF0000", "#FF4500", "#FFA500", "#FFD700", "#FFFF00", # Reds, Oranges, Yellows
+    "#90EE90", "#32CD32", "#008000", "#006400", "#008080", # Greens, Teals
+    "#ADD8E6", "#87CEFA", "#4682B4", "#1E90FF", "#0000CD", # Light Blues, Blues, Dark Blues
+    "#9370DB", "#8A2BE2", "#9400D3", "#800080", "#4B0082", # Purples, Indigos
+    "#FFFFFF", "#C0C0C0", "#808080", "#404040", "#000000"  # White, Grays, Black
+]
+
+
+def hex_to_hsb(hex_color):
+    """Converts a hex color string to HSB (HSV in Python's colorsys)."""
+    # Remove '#' if present
+    hex_color = hex_color.lstrip('#')
+    # Convert hex to RGB (0-255 range)
+    rgb_255 = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+    # Convert RGB (0-1 range) to HSV (HSB)
+    # colorsys.rgb_to_hsv expects RGB values in the range [0, 1]
+    rgb_01 = (rgb_255[0] / 255.0, rgb_255[1] / 255.0, rgb_255[2] / 255.0)
+    h, s, v = colorsys.rgb_to_hsv(*rgb_01) # H, S, V are in the range [0, 1]
+    # H is Hue (0-1, maps to 0-360 degrees), S is Saturation (0-1), V is Value (Brightness) (0-1)
+    return h, s, v # Returning H, S, V (Brightness)
+
+
+def _assign_raw(h, s, v):
+    """The region rules: (sentiment, emotion label) before the label refinement."""
+    sentiment = 0 # Default to neutral (0)
+    emotion_label = "Neutral" # Default emotion label
+
+    # Convert Hue from 0-1 range to 0-360 degrees for easier mapping
+    h_degrees = h * 360
+
+    # --- Simplified Logic based on HSB and Emotion Grid Areas ---
+
+    # Low Saturation (Grayscale/Muted) - Tend towards Neutral or Low Energy
+    if s < 0.2: # Lowering saturation threshold slightly
+        if v < 0.3: # Very dark grays/black
+            sentiment = -1
+            emotion_label = "Low Energy" # From grid concept
+        elif v > 0.7: # Very light grays/white
+             sentiment = 0
+             emotion_label = "Calm" # From grid concept
+        else: # Medium grays
+            sentiment = 0
+            emotion_label = "Apathetic" # From grid concept
+    # Saturated Colors
+    else:
+        # High Brightness/Value - Tend towards Higher Energy/Pleasantness (top of grid)
+        if v > 0.6:
+            if (h_degrees >= 0 and h_degrees < 20) or (h_degrees >= 340 and h_degrees <= 360): # Reds
+                 sentiment = 0 # Can be intense positive or negative
+                 emotion_label = "Intense" # General high arousal
+            elif h_degrees >= 20 and h_degrees < 75: # Orange to Yellow
+                 sentiment = +1
+                 emotion_label = "Excited" # Top right of grid
+            elif h_degrees >= 75 and h_degrees < 155: # Green
+                 sentiment = +1
+                 emotion_label = "Lively" # Top right of grid
+            elif h_degrees >= 155 and h_degrees < 240: # Blue
+                 sentiment = +1
+                 emotion_label = "Upbeat" # Top right of grid
+            elif h_degrees >= 240 and h_degrees < 300: # Purple
+                 sentiment = 0
+                 emotion_label = "Surprised" # Top middle of grid
+            elif h_degrees >= 300 and h_degrees < 340: # Pink
+                 sentiment = +1
+                 emotion_label = "Joyful" # High Pleasantness area
+            else:
+                 sentiment = 0
+                 emotion_label = "Energetic" # Default for high value saturated
+        # Medium Brightness/Value
+        elif v > 0.3: # Above dark threshold but not very bright
+            if (h_degrees >= 0 and h_degrees < 20) or (h_degrees >= 340 and h_degrees <= 360): # Reds
+                 sentiment = -1
+                 emotion_label = "Angry" # Top left of grid
+            elif h_degrees >= 20 and h_degrees < 75: # Orange to Yellow
+                 sentiment = +1
+                 emotion_label = "Happy" # Middle right of grid
+            elif h_degrees >= 75 and h_degrees < 155: # Green
+                 sentiment = +1
+                 emotion_label = "Content" # Middle right of grid
+            elif h_degrees >= 155 and h_degrees < 240: # Blue
+                 sentiment = 0 # Can be calm or sad
+                 emotion_label = "Pleasant" # Middle of grid
+            elif h_degrees >= 240 and h_degrees < 300: # Purple
+                 sentiment = 0
+                 emotion_label = "Introspective" # General association
+            elif h_degrees >= 300 and h_degrees < 340: # Pink
+                 sentiment = +1
+                 emotion_label = "Hopeful" # Middle right area
+            else:
+                 sentiment = 0
+                 emotion_label = "Neutral" # Fallback
+        # Low Brightness/Value - Tend towards Lower Energy/Pleasantness (bottom of grid)
+        else: # v <= 0.3 (but s > 0.2)
+             if (h_degrees >= 0 and h_degrees < 20) or (h_degrees >= 340 and h_degrees <= 360): # Dark Reds
+                  sentiment = -1
+                  emotion_label = "Enraged" # Top left corner (intense negative)
+             elif h_degrees >= 155 and h_degrees < 240: # Dark Blues
+                  sentiment = -1
+                  emotion_label = "Depressed" # Bottom left of grid
+             elif h_degrees >= 75 and h_degrees < 155: # Dark Greens
+                  sentiment = 0 # Can be muted calm
+                  emotion_label = "Restful" # Bottom right area
+             else:
+                  sentiment = -1 # Default for dark saturated colors
+                  emotion_label = "Low Mood" # General low pleasantness
+    return sentiment, emotion_label
+
+
+def _refine(sentiment, emotion_label):
+    """Makes the label broadly match the sentiment score."""
+    # Ensure sentiment is one of the allowed values (-1, 0, 1)
+    # This is a safeguard, the logic above should primarily produce these
+    if sentiment not in [-1, 0, 1]:
+         sentiment = 0 # Default to neutral if logic somehow fails
+
+    # Refine emotion label based on final sentiment if needed (optional)
+    # This ensures the label broadly matches the sentiment score
+    if sentiment == 1 and emotion_label in ["Angry", "Frustrated", "Depressed", "Sad", "Low Energy", "Low Mood", "Apathetic", "Intense", "Surprised"]:
+         # If a positive sentiment was assigned but the label is typically negative/neutral, adjust label
+         emotion_label = "Positive"
+    elif sentiment == -1 and emotion_label in ["Excited", "Happy", "Content", "Peaceful", "Calm", "Lively", "Upbeat", "Joyful", "Hopeful", "Pleasant", "Restful"]:
+         # If a negative sentiment was assigned but the label is typically positive/neutral, adjust label
+         emotion_label = "Negative"
+    elif sentiment == 0 and emotion_label in ["Excited", "Happy", "Content", "Peaceful", "Calm", "Lively", "Upbeat", "Joyful", "Hopeful", "Positive", "Negative", "Depressed", "Sad", "Angry", "Frustrated", "Enraged", "Low Mood"]:
+         # If a neutral sentiment was assigned but the label is typically positive/negative, adjust label
+         emotion_label = "Neutral"
+    return sentiment, emotion_label
+
+
+def assign_sentiment_and_emotion(h, s, v):
+    """
+    Assigns a simplified sentiment score (+1, 0, -1) and a more specific
+    emotion label based on HSB values and inspiration from the emotion grid.
+    This is a simplified mapping for the prototype.
+    """
+    return _refine(*_assign_raw(h, s, v))
+
+
+# --- Vectorized Mapping ---
+
+# Outcomes of the rules above, in the order of the conditions in _region_conditions()
+_REGION_OUTCOMES = [_refine(*outcome) for outcome in [
+    (-1, "Low Energy"), (0, "Calm"), (0, "Apathetic"), # Low saturation: dark, light, medium
+    (0, "Intense"), (+1, "Excited"), (+1, "Lively"), (+1, "Upbeat"), (0, "Surprised"), (+1, "Joyful"), # Bright
+    (-1, "Angry"), (+1, "Happy"), (+1, "Content"), (0, "Pleasant"), (0, "Introspective"), (+1, "Hopeful"), # Medium
+    (-1, "Enraged"), (-1, "Depressed"), (0, "Restful"), (-1, "Low Mood"), # Dark
+]]
+_FALLBACK_OUTCOME = _refine(0, "Neutral") # Only reachable for NaN input
+
+
+def _region_conditions(h, s, v):
+    """Boolean masks (one per _REGION_OUTCOMES entry) for arrays of HSB values, first match wins."""
+    h_degrees = h * 360
+    gray = s < 0.2
+    bright = ~gray & (v > 0.6)
+    medium = ~gray & ~bright & (v > 0.3)
+    dark = ~gray & (v <= 0.3)
+    red = ((h_degrees >= 0) & (h_degrees < 20)) | ((h_degrees >= 340) & (h_degrees <= 360))
+    yellow = (h_degrees >= 20) & (h_degrees < 75)
+    green = (h_degrees >= 75) & (h_degrees < 155)
+    blue = (h_degrees >= 155) & (h_degrees < 240)
+    purple = (h_degrees >= 240) & (h_degrees < 300)
+    pink = (h_degrees >= 300) & (h_degrees < 340)
+    return [
+        gray & (v < 0.3), gray & (v > 0.7), gray,
+        bright & red, bright & yellow, bright & green, bright & blue, bright & purple, bright & pink,
+        medium & red, medium & yellow, medium & green, medium & blue, medium & purple, medium & pink,
+        dark & red, dark & blue, dark & green, dark,
+    ]
+
+
+def map_hsb(h, s, v):
+    """Vectorized assign_sentiment_and_emotion(): arrays of H, S, V in [0, 1] -> (sentiment int8 array, emotion array)."""
+    import numpy as np
+    h, s, v = (np.asarray(x, dtype=float) for x in (h, s, v))
+    region = np.select(_region_conditions(h, s, v), np.arange(len(_REGION_OUTCOMES)), default=len(_REGION_OUTCOMES))
+    sentiments = np.array([outcome[0] for outcome in _REGION_OUTCOMES] + [_FALLBACK_OUTCOME[0]], dtype=np.int8)
+    emotions = np.array([outcome[1] for outcome in _REGION_OUTCOMES] + [_FALLBACK_OUTCOME[1]], dtype=object)
+    return sentiments[region], emotions[region]
+
+
+def hex_to_hsb_array(hex_colors):
+    """Vectorized hex_to_hsb() for an array of '#RRGGBB' strings (all must be valid)."""
+    import numpy as np
+    rgb = np.array([int(c.lstrip('#'), 16) for c in hex_colors], dtype=np.int64)
+    r, g, b = (((rgb >> shift) & 0xFF) / 255.0 for shift in (16, 8, 0))
+    maxc = np.maximum(np.maximum(r, g), b)
+    minc = np.minimum(np.minimum(r, g), b)
+    delta = maxc - minc
+    v = maxc
+    s = np.divide(delta, maxc, out=np.zeros_like(maxc), where=maxc > 0)
+    # Same hue formula as colorsys.rgb_to_hsv
+    safe = np.where(delta > 0, delta, 1.0)
+    rc, gc, bc = (maxc - r) / safe, (maxc - g) / safe, (maxc - b) / safe
+    h = np.where(r == maxc, bc - gc, np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = np.where(delta > 0, (h / 6.0) % 1.0, 0.0)
+    return h, s, v
+
+
+def map_colors(colors):
+    """
+    (SentimentScore, Emotion) for a Series of hex colours. Each distinct colour is mapped once
+    (a history only ever contains a handful of palette colours), invalid colours give NaN/None.
+    """
+    import numpy as np
+    import pandas as pd
+    codes, uniques = pd.factorize(pd.Series(colors, dtype=object).astype(object))
+    uniques = np.asarray(uniques, dtype=object)
+    valid = np.array([isinstance(c, str) and len(c.lstrip('#')) == 6 and all(ch in '0123456789abcdefABCDEF' for ch in c.lstrip('#'))
+                      for c in uniques], dtype=bool)
+    sentiment_table = np.full(len(uniques) + 1, np.nan) # Last slot: missing colour (code -1)
+    emotion_table = np.full(len(uniques) + 1, None, dtype=object)
+    if valid.any():
+        sentiments, emotions = map_hsb(*hex_to_hsb_array(uniques[valid]))
+        sentiment_table[:-1][valid] = sentiments
+        emotion_table[:-1][valid] = emotions
+    return sentiment_table[codes], emotion_table[codes]
+
+
+# --- Bulk Rescoring ---
+
+def rescore_csv(path, chunksize=100_000):
+    """
+    Recomputes SentimentScore and Emotion of every row of a subjective CSV from its ColorChoice,
+    streaming the file in chunks into a temporary file that atomically replaces the original.
+    Rows whose colour cannot be mapped keep their values. Adds/updates the MappingVersion column.
+    Returns the number of rows rescored.
+    """
+    import numpy as np
+    import pandas as pd
+    tmp_path = path + '.rescore.tmp'
+    rescored = 0
+    try:
+        with open(tmp_path, 'w', newline='') as out:
+            for i, chunk in enumerate(pd.read_csv(path, chunksize=chunksize)):
+                sentiments, emotions = map_colors(chunk['ColorChoice'] if 'ColorChoice' in chunk.columns else [None] * len(chunk))
+                mapped = ~np.isnan(sentiments)
+                if 'MappingVersion' not in chunk.columns:
+                    chunk['MappingVersion'] = pd.NA
+                chunk['SentimentScore'] = pd.to_numeric(chunk['SentimentScore'], errors='coerce').astype('Int8')
+                chunk.loc[mapped, 'SentimentScore'] = sentiments[mapped].astype(np.int8)
+                chunk['Emotion'] = chunk['Emotion'].astype(object)
+                chunk.loc[mapped, 'Emotion'] = emotions[mapped]
+                chunk['MappingVersion'] = chunk['MappingVersion'].astype('Int64')
+                chunk.loc[mapped, 'MappingVersion'] = MAPPING_VERSION
+                chunk.to_csv(out, header=(i == 0), index=False)
+                rescored += int(mapped.sum())
+            out.flush()
+            os.fsync(out.fileno())
+    except pd.errors.EmptyDataError:
+        os.remove(tmp_path)
+        return 0
+    except BaseException:
+        os.remove(tmp_path) # Leave the original untouched
+        raise
+    os.replace(tmp_path, path)
+    return rescored
+
+
+def rescore_subjective_data(data_dir=None, chunksize=100_000):
+    """
+    Rescores the stored subjective history (the CSV file, or every partition when
+    data_manager.PARTITION_BY is set). Returns the number of rows rescored.
+    """
+    import data_manager
+    if data_manager.STORAGE_BACKEND != 'csv':
+        raise ValueError(f"Rescoring is only supported for CSV storage, not '{data_manager.STORAGE_BACKEND}'.")
+    if data_manager.PARTITION_BY:
+        paths = data_manager.list_partitions('subjective', data_dir=data_dir)
+    else:
+        paths = [data_manager._path(data_manager.SUBJECTIVE_FILE, data_dir)]
+    rescored = 0
+    for path in paths:
+        if os.path.isfile(path):
+            rescored += rescore_csv(path, chunksize)
+    logger.info("Rescored %d subjective entries with mapping version %d.", rescored, MAPPING_VERSION)
+    return rescored
@@ -1,156 +1,341 @@
+import logging
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg # To embed plots in Tkinter/CustomTkinter
-import data_manager # Import data manager
-from datetime import datetime
+import matplotlib.dates as mdates
+from matplotlib.artist import setp
+from matplotlib.figure import Figure
+import data_repository # Shared, cached view of the data files
+from conclusion_engine import RollingConclusion # O(1) state behind get_simple_conclusion
+import weekly_aggregates # Incrementally maintained weekly sentiment table
+import rollups # Multi-resolution rollup pyramid
+import metrics # Timers around the conclusion and plot paths
+from statistics import NormalDist
 import numpy as np
 # from anomaly_detector import AnomalyDetector # AnomalyDetector is not needed for the minimalist AI
 
+logger = logging.getLogger(__name__)
+
+# No backend switch here: importing this module must stay cheap and must work headless.
+# The app embeds figures with FigureCanvasTkAgg (see VisualizationWindow), which needs no pyplot backend.
+
+def simple_conclusion(count, average_sentiment, min_submissions=3, threshold_happy=0.5, threshold_bad=-0.5):
+    """
+    The rule-based conclusion for the average of the `count` most recent scores (at most min_submissions).
+    Needs no data access or generator, so batch jobs can apply the same rules to other users' scores.
+    The defaults match InsightsGenerator's parameters.
+    """
+    if count == 0:
+         return "No subjective data yet."
+
+    if count < min_submissions:
+        return f"Need at least {min_submissions} mood entries for a conclusion."
+
+    # ... rest of the conclusion logic
+    if average_sentiment >= threshold_happy:
+        return "Great achievement! Your recent mood is positive."
+    elif average_sentiment <= threshold_bad:
+        return "You may need some time to relax. Your recent mood is low."
+    else:
+        return "Well balanced. Your recent mood is neutral."
+
+
+CORRELATION_COLUMNS = ['Entries', 'Samples', 'ExposureMinutes', 'MeanSentiment', 'WeightedSentiment',
+                       'StdSentiment', 'CILow', 'CIHigh']
+
+
+def draw_weekly_sentiment(ax, total_count, weekly_sentiment):
+    """
+    Draws the weekly sentiment plot (or the "no data" message) on an empty Axes.
+    Returns the plotted Line2D, or None if there was nothing to plot.
+    """
+    if total_count == 0 or weekly_sentiment.empty:
+        message = "No subjective data available for weekly plot" if total_count == 0 else \
+                  "Not enough subjective data across weeks for plotting"
+        ax.text(0.5, 0.5, message, horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
+        ax.set_title("Weekly Mood Sentiment Trend")
+        return None
+    line, = ax.plot(weekly_sentiment.index, weekly_sentiment.values, marker='o', linestyle='-')
+    ax.set_title("Weekly Mood Sentiment Trend (Average)")
+    ax.set_xlabel("Week")
+    ax.set_ylabel("Average Sentiment Score (+1 Happy, -1 Bad)")
+    ax.grid(True)
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    ax.xaxis.set_major_locator(mdates.WeekdayLocator(byweekday=mdates.MO)) # Locate at Mondays
+    setp(ax.get_xticklabels(), rotation=45, ha='right')
+    return line
+
+
+def activity_mood_correlation(activity, subjective, window_minutes=30, confidence=0.95, max_sample_gap=60):
+    """
+    Relates the applications in use to the mood reported shortly afterwards. Every activity sample
+    is attached (merge_asof) to the first mood entry at or after it, if that entry is at most
+    window_minutes later, so each entry sees the samples of the preceding window (a sample belongs
+    to one entry only, the next one). Per ActiveInfo, over the entries it appeared before:
+        Entries            mood entries with the application in their window
+        Samples            activity samples attached to those entries
+        ExposureMinutes    time covered by those samples (each lasts until the next sample, at most
+                           max_sample_gap seconds and never past the mood entry)
+        MeanSentiment      mean score of the entries; StdSentiment its standard deviation
+        WeightedSentiment  mean score weighted by exposure
+        CILow, CIHigh      normal-approximation confidence interval of MeanSentiment (NaN below 2 entries)
+    activity: ActiveInfo indexed by Timestamp; subjective: SentimentScore indexed by Timestamp
+    (InsightsGenerator.activity_data / subjective_data). Sorted by exposure, longest first.
+    All grouping is done with np.unique/np.bincount, so years of samples take seconds.
+    """
+    result = pd.DataFrame(columns=CORRELATION_COLUMNS, index=pd.Index([], name='ActiveInfo'), dtype=float)
+    if activity.empty or subjective.empty:
+        return result
+
+    activity = activity[activity['ActiveInfo'].notna()]
+    sample_times = activity.index.to_numpy(dtype='datetime64[ns]')
+    sample_order = np.argsort(sample_times, kind='stable')
+    sample_times = sample_times[sample_order]
+    app_codes, apps = pd.factorize(activity['ActiveInfo'].to_numpy(dtype=object)[sample_order])
+    mood_times = subjective.index.to_numpy(dtype='datetime64[ns]')
+    mood_order = np.argsort(mood_times, kind='stable')
+    mood_times = mood_times[mood_order]
+    scores = subjective['SentimentScore'].to_numpy(dtype=float)[mood_order]
+    if len(sample_times) == 0:
+        return result
+
+    joined = pd.merge_asof(pd.DataFrame({'SampleTime': sample_times}),
+                           pd.DataFrame({'MoodTime': mood_times, 'Entry': np.arange(len(mood_times))}),
+                           left_on='SampleTime', right_on='MoodTime', direction='forward',
+                           tolerance=pd.Timedelta(minutes=window_minutes))
+    entries = joined['Entry'].to_numpy(dtype=float)
+    matched = ~np.isnan(entries)
+    if not matched.any():
+        return result
+
+    one_second = np.timedelta64(1, 's')
+    gaps = np.append(np.diff(sample_times) / one_second, max_sample_gap)
+    until_mood = (joined['MoodTime'].to_numpy(dtype='datetime64[ns]') - sample_times) / one_second
+    exposure = np.minimum(np.minimum(gaps, max_sample_gap), until_mood)[matched]
+    entries = entries[matched].astype(np.int64)
+    app_codes = app_codes[matched]
+
+    # One group per (entry, application) pair, then per application
+    n_apps = len(apps)
+    pairs, pair_index = np.unique(entries * n_apps + app_codes, return_inverse=True)
+    pair_exposure = np.bincount(pair_index, weights=exposure, minlength=len(pairs))
+    pair_app = pairs % n_apps
+    pair_score = scores[pairs // n_apps]
+
+    count = np.bincount(pair_app, minlength=n_apps).astype(float)
+    total = np.bincount(pair_app, weights=pair_score, minlength=n_apps)
+    total_sq = np.bincount(pair_app, weights=pair_score ** 2, minlength=n_apps)
+    app_exposure = np.bincount(pair_app, weights=pair_exposure, minlength=n_apps)
+    weighted = np.bincount(pair_app, weights=pair_score * pair_exposure, minlength=n_apps)
+    samples = np.bincount(app_codes, minlength=n_apps)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        variance = np.where(count > 1, np.maximum(total_sq - count * mean ** 2, 0) / (count - 1), np.nan)
+        std = np.sqrt(variance)
+        margin = NormalDist().inv_cdf(0.5 + confidence / 2) * std / np.sqrt(count)
+        weighted_mean = np.where(app_exposure > 0, weighted / app_exposure, mean)
+
+    result = pd.DataFrame({
+        'Entries': count, 'Samples': samples.astype(float), 'ExposureMinutes': app_exposure / 60,
+        'MeanSentiment': mean, 'WeightedSentiment': weighted_mean, 'StdSentiment': std,
+        'CILow': mean - margin, 'CIHigh': mean + margin,
+    }, index=pd.Index(apps, name='ActiveInfo'))
+    result = result[result['Entries'] > 0]
+    return result.sort_values('ExposureMinutes', ascending=False, kind='stable')
 
-# Ensure Matplotlib uses the TkAgg backend for compatibility with Tkinter/CustomTkinter
-plt.switch_backend('TkAgg')
 
 class InsightsGenerator:
     """
     Handles data loading, weekly visualization, and the simple rule-based conclusion.
     """
-    def __init__(self):
-        print("InsightsGenerator: Initializing...")
-        self.activity_data = data_manager.load_activity_data()
-        self.subjective_data = data_manager.load_subjective_data()
-
-        print(f"InsightsGenerator: Loaded activity_data (empty={self.activity_data.empty}):\n{self.activity_data.head()}")
-        print(f"InsightsGenerator: Loaded subjective_data (empty={self.subjective_data.empty}):\n{self.subjective_data.head()}")
-
-        # Convert Timestamp columns to datetime objects
-        # These steps are generally fine, the issue was specifically with SentimentScore in older files
-        if not self.activity_data.empty and 'Timestamp' in self.activity_data.columns:
-            self.activity_data['Timestamp'] = pd.to_datetime(self.activity_data['Timestamp'], errors='coerce')
-            self.activity_data.dropna(subset=['Timestamp'], inplace=True)
-            # It's better to set index after potentially dropping NaNs
-            if not self.activity_data.empty:
-                self.activity_data.set_index('Timestamp', inplace=True)
-
-
-        if not self.subjective_data.empty and 'Timestamp' in self.subjective_data.columns:
-            self.subjective_data['Timestamp'] = pd.to_datetime(self.subjective_data['Timestamp'], errors='coerce')
-            self.subjective_data.dropna(subset=['Timestamp'], inplace=True)
-            # Ensure SentimentScore is numeric after loading/adding, before setting index
-            if 'SentimentScore' in self.subjective_data.columns:
-                 self.subjective_data['SentimentScore'] = pd.to_numeric(self.subjective_data['SentimentScore'], errors='coerce')
-                 self.subjective_data.dropna(subset=['SentimentScore'], inplace=True) # Drop rows with NaN sentiment
-            if not self.subjective_data.empty:
-                self.subjective_data.set_index('Timestamp', inplace=True)
+    # The conclusion and the weekly plot only need these columns, so only these are loaded
+    SENTIMENT_COLUMNS = ['Timestamp', 'SentimentScore']
 
+    def __init__(self, repository=None):
+        logger.debug("Initializing...")
+        # Data comes from the shared repository, which loads each file at most once and keeps
+        # itself current as entries are saved, so constructing a generator no longer reads any CSV.
+        self.repository = repository or data_repository.get_repository()
+        self._prepared = {} # kind -> (repository version, prepared DataFrame)
+        self._conclusion_engine = None # Created on the first conclusion, see _get_conclusion_engine()
+        self.weekly_aggregates = weekly_aggregates.get_weekly_aggregates() # Persisted (week, sum, count) table
+        self.rollups = rollups.get_rollups() # Hour/day/week/month rollups of both data sets
+        self._weekly_figure = None # Cached figure state, see get_weekly_sentiment_figure()
+        self._correlations = {} # parameters -> ((activity version, subjective version), result)
 
         # --- Simple AI Parameters ---
         self.min_submissions = 3
         self.threshold_happy = 0.5 # Example threshold for average sentiment
         self.threshold_bad = -0.5 # Example threshold for average sentiment
 
-        print("InsightsGenerator: Initialization complete.")
+        logger.debug("Initialization complete.")
+
+
+    def _get_conclusion_engine(self):
+        """Returns the rolling conclusion engine, (re)creating and seeding it if min_submissions changed."""
+        if self._conclusion_engine is None or self._conclusion_engine.window != self.min_submissions:
+            if self._conclusion_engine is not None:
+                self._conclusion_engine.close()
+            self._conclusion_engine = RollingConclusion(window=self.min_submissions)
+        self._conclusion_engine.seed()
+        return self._conclusion_engine
+
+    @property
+    def activity_data(self):
+        """Activity samples indexed by Timestamp."""
+        return self._get_prepared('activity')
 
+    @property
+    def subjective_data(self):
+        """SentimentScore of subjective entries indexed by Timestamp, with rows lacking a numeric score dropped."""
+        return self._get_prepared('subjective')
 
+    def _get_prepared(self, kind):
+        """Returns the indexed frame for kind, re-preparing it only when the repository version changed."""
+        version = self.repository.version(kind)
+        cached = self._prepared.get(kind)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        if kind == 'subjective':
+            df = self.repository.get_subjective_data(columns=self.SENTIMENT_COLUMNS).copy() # Never modify the shared frame
+            if not df.empty:
+                # Ensure SentimentScore is numeric, before setting index
+                df['SentimentScore'] = pd.to_numeric(df['SentimentScore'], errors='coerce')
+                df.dropna(subset=['SentimentScore'], inplace=True) # Drop rows with NaN sentiment
+        else:
+            df = self.repository.get_activity_data().copy()
+        # The repository has already converted Timestamp and dropped invalid ones
+        if not df.empty:
+            df.set_index('Timestamp', inplace=True)
+
+        self._prepared[kind] = (version, df)
+        return df
+
+
+    @metrics.timed('insights.conclusion')
     def get_simple_conclusion(self):
         """
         Applies the simple rule-based logic to generate a conclusion
         based on the average sentiment of recent subjective inputs.
         """
-        print("InsightsGenerator: Generating simple conclusion.")
-        # Ensure data is loaded and processed with sentiment score
-        self.subjective_data = data_manager.load_subjective_data()
-        if not self.subjective_data.empty and 'Timestamp' in self.subjective_data.columns:
-            self.subjective_data['Timestamp'] = pd.to_datetime(self.subjective_data['Timestamp'], errors='coerce')
-            self.subjective_data.dropna(subset=['Timestamp'], inplace=True)
-            if 'SentimentScore' in self.subjective_data.columns:
-                 self.subjective_data['SentimentScore'] = pd.to_numeric(self.subjective_data['SentimentScore'], errors='coerce')
-                 self.subjective_data.dropna(subset=['SentimentScore'], inplace=True) # Drop rows with NaN sentiment
-            if not self.subjective_data.empty:
-                self.subjective_data.set_index('Timestamp', inplace=True)
-        else:
-             return "No subjective data yet."
+        logger.debug("Generating simple conclusion.")
+        # The rolling engine keeps the last N scores and their sum up to date as entries are
+        # saved, so this is constant-time and reads nothing from disk after the first call.
+        engine = self._get_conclusion_engine()
+        average_sentiment = engine.average()
+        if average_sentiment is not None and engine.count >= self.min_submissions:
+            logger.debug("Average sentiment of last %d submissions: %.2f", engine.count, average_sentiment)
+        return simple_conclusion(engine.count, average_sentiment,
+                                 self.min_submissions, self.threshold_happy, self.threshold_bad)
 
 
-        # For simplicity, let's consider the last N submissions
-        # Use .copy() to avoid SettingWithCopyWarning
-        recent_submissions = self.subjective_data.tail(self.min_submissions).copy()
+    def get_sentiment_rollup(self, resolution='auto', start=None, end=None, max_points=800):
+        """
+        Pre-aggregated sentiment for [start, end) at one of rollups.RESOLUTIONS ('hour', 'day', 'week', 'month').
+        With resolution='auto' the finest resolution with at most max_points buckets is used, so a chart
+        can pass its pixel width. Returns a DataFrame indexed by bucket with sum, count, min, max, mean.
+        """
+        resolution = self._resolve_resolution(resolution, start, end, max_points)
+        return self.rollups.sentiment(resolution, start, end)
 
-        if len(recent_submissions) < self.min_submissions:
-            return f"Need at least {self.min_submissions} mood entries for a conclusion."
+    def get_activity_rollup(self, resolution='auto', start=None, end=None, max_points=800):
+        """
+        Pre-aggregated activity for [start, end): sample counts per ActiveInfo (one column each) per bucket.
+        resolution and max_points work like in get_sentiment_rollup().
+        """
+        resolution = self._resolve_resolution(resolution, start, end, max_points)
+        return self.rollups.activity(resolution, start, end)
 
-        # --- Defensive check and conversion ---
-        # This check might help diagnose if the column is truly missing at this point,
-        # although the primary fix is ensuring the CSV file has the column correctly.
-        if 'SentimentScore' not in recent_submissions.columns:
-            print("Debug: 'SentimentScore' column not found in recent_submissions DataFrame!")
-            # If this happens, it means the data loading didn't add the column correctly.
-            # The most likely cause is a persistent old CSV file.
-            return "Error: Sentiment data column missing."
+    def _resolve_resolution(self, resolution, start, end, max_points):
+        if resolution != 'auto':
+            return resolution
+        if start is None:
+            # Span of all data: the monthly buckets are few and tell us where the history starts
+            months = self.rollups.sentiment('month')
+            start = months.index.min() if not months.empty else pd.Timestamp.now().normalize()
+        if end is None:
+            end = pd.Timestamp.now()
+        return rollups.choose_resolution(start, end, max_points)
 
 
-        # SentimentScore is already ensured to be numeric and NaNs dropped in the loading section above
-        # So the following lines should be safer now:
-        average_sentiment = recent_submissions['SentimentScore'].mean()
+    @metrics.timed('insights.correlation')
+    def get_activity_mood_correlation(self, window_minutes=30, confidence=0.95, max_sample_gap=60):
+        """
+        Per-application mood statistics (see activity_mood_correlation()). Cached per data version,
+        so repeated calls are free until new activity or mood data is saved.
+        """
+        key = (window_minutes, confidence, max_sample_gap)
+        versions = (self.repository.version('activity'), self.repository.version('subjective'))
+        cached = self._correlations.get(key)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+        logger.debug("Computing activity/mood correlation.")
+        result = activity_mood_correlation(self.activity_data, self.subjective_data,
+                                           window_minutes, confidence, max_sample_gap)
+        self._correlations[key] = (versions, result)
+        return result
 
-        print(f"InsightsGenerator: Average sentiment of last {len(recent_submissions)} submissions: {average_sentiment:.2f}")
 
-        # ... rest of the conclusion logic
-        if average_sentiment >= self.threshold_happy:
-            return "Great achievement! Your recent mood is positive."
-        elif average_sentiment <= self.threshold_bad:
-            return "You may need some time to relax. Your recent mood is low."
-        else:
-            return "Well balanced. Your recent mood is neutral."
-
-
-    def generate_weekly_sentiment_plot(self):
-        """Generates a Matplotlib plot for weekly sentiment trends."""
-        print("InsightsGenerator: Generating weekly sentiment plot.")
-
-        # Ensure data is loaded and processed with sentiment score
-        self.subjective_data = data_manager.load_subjective_data()
-        if not self.subjective_data.empty and 'Timestamp' in self.subjective_data.columns:
-            self.subjective_data['Timestamp'] = pd.to_datetime(self.subjective_data['Timestamp'], errors='coerce')
-            self.subjective_data.dropna(subset=['Timestamp'], inplace=True)
-            if 'SentimentScore' in self.subjective_data.columns:
-                 self.subjective_data['SentimentScore'] = pd.to_numeric(self.subjective_data['SentimentScore'], errors='coerce')
-                 self.subjective_data.dropna(subset=['SentimentScore'], inplace=True) # Drop rows with NaN sentiment
-            if not self.subjective_data.empty:
-                self.subjective_data.set_index('Timestamp', inplace=True)
-        else:
-             fig, ax = plt.subplots()
-             ax.text(0.5, 0.5, "No subjective data available for weekly plot", horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
-             ax.set_title("Weekly Mood Sentiment Trend")
-             print("InsightsGenerator: Generated empty weekly sentiment plot.")
-             return fig
-
-
-        # Aggregate sentiment by week
-        # SentimentScore is already ensured to be numeric by this point
-        weekly_sentiment = self.subjective_data.resample('W')['SentimentScore'].mean().dropna() # Drop weeks with no data/NaNs
-
-        if weekly_sentiment.empty:
-             fig, ax = plt.subplots()
-             ax.text(0.5, 0.5, "Not enough subjective data across weeks for plotting", horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
-             ax.set_title("Weekly Mood Sentiment Trend")
-             print("InsightsGenerator: Generated empty weekly sentiment plot due to insufficient data across weeks.")
-             return fig
-
-
-        fig, ax = plt.subplots(figsize=(10, 4))
-        # Use weekly_sentiment.index for the x-axis, which will be Timestamps at week end
-        ax.plot(weekly_sentiment.index, weekly_sentiment.values, marker='o', linestyle='-')
-
-        # --- CORRECTED TITLE HERE ---
-        ax.set_title("Weekly Mood Sentiment Trend (Average)") # Corrected title
-        ax.set_xlabel("Week") # Updated label
-        ax.set_ylabel("Average Sentiment Score (+1 Happy, -1 Bad)")
-        ax.grid(True)
-        # Format x-axis to show week start dates nicely
-        ax.xaxis.set_major_formatter(plt.matplotlib.dates.DateFormatter('%Y-%m-%d'))
-        ax.xaxis.set_major_locator(plt.matplotlib.dates.WeekdayLocator(byweekday=plt.matplotlib.dates.MO)) # Locate at Mondays
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-
-        print("InsightsGenerator: Generated weekly sentiment plot with data.")
+    @metrics.timed('insights.weekly_data')
+    def get_weekly_sentiment_data(self):
+        """
+        Returns (data version, total scored entries, weekly average sentiment Series): everything the
+        weekly plot needs. This part may touch the disk and can run on a worker thread; building the
+        figure cannot.
+        """
+        # The weekly table is maintained incrementally as entries are saved, so this reads
+        # one row per week instead of resampling the whole history
+        return self.weekly_aggregates.snapshot()
+
+    @metrics.timed('insights.weekly_plot')
+    def generate_weekly_sentiment_plot(self, weekly_data=None):
+        """
+        Generates a new Matplotlib Figure for weekly sentiment trends (drawn by draw_weekly_sentiment,
+        like the cached app figure and the headless report). The Figure is not registered with pyplot.
+        weekly_data: Result of get_weekly_sentiment_data() if already computed (e.g. in the background).
+        """
+        logger.debug("Generating weekly sentiment plot.")
+        _, total_count, weekly_sentiment = weekly_data if weekly_data is not None else self.get_weekly_sentiment_data()
+        fig = Figure(figsize=(10, 4))
+        draw_weekly_sentiment(fig.add_subplot(), total_count, weekly_sentiment)
+        fig.tight_layout()
         return fig
+
+    @metrics.timed('insights.weekly_figure')
+    def get_weekly_sentiment_figure(self, weekly_data=None):
+        """
+        Returns (figure, changed) for the weekly plot, reusing one Figure across calls (for embedding
+        in a Tk canvas; do not plt.close() it). The figure is keyed on the weekly data version:
+        if nothing changed it is returned untouched (changed=False) so the caller can skip redrawing,
+        and new data only moves the existing line via set_data(). The full layout (tight_layout, date
+        locators) is computed only when the figure is first built or switches between the
+        "no data" message and the line plot.
+        weekly_data: Result of get_weekly_sentiment_data() if already computed.
+        """
+        version, total_count, weekly_sentiment = weekly_data if weekly_data is not None else self.get_weekly_sentiment_data()
+        cache = self._weekly_figure
+        if cache is not None and cache['version'] == version:
+            return cache['figure'], False
+
+        if cache is None:
+            # A bare Figure (not pyplot.subplots) is not registered with pyplot, so it can live as long as we cache it
+            figure = Figure(figsize=(10, 4))
+            cache = {'figure': figure, 'axes': figure.add_subplot(), 'line': None}
+            self._weekly_figure = cache
+        cache['version'] = version
+        ax = cache['axes']
+
+        has_data = total_count > 0 and not weekly_sentiment.empty
+        if has_data and cache['line'] is not None:
+            # Same layout as before, only the points moved
+            cache['line'].set_data(weekly_sentiment.index, weekly_sentiment.values)
+            ax.relim()
+            ax.autoscale_view()
+            logger.debug("Updated cached weekly sentiment plot.")
+            return cache['figure'], True
+
+        ax.clear()
+        cache['line'] = draw_weekly_sentiment(ax, total_count, weekly_sentiment)
+        cache['figure'].tight_layout()
+        logger.debug("Built cached weekly sentiment plot.")
+        return cache['figure'], True
@@ -0,0 +1,209 @@
+"""
+Lightweight in-process metrics for the hot paths: latency histograms (timers) and counters.
+
+    with metrics.timer('data.load_subjective'):
+        ...
+    @metrics.timed('insights.conclusion')
+    def get_simple_conclusion(self): ...
+    metrics.count('tracker.samples')
+
+Recording costs two perf_counter() calls, a bisect and a lock (about a microsecond), so it is
+always on. Timers keep a fixed 1-2-5 bucket histogram from 1 us to 100 s, plus count, total, min
+and max. The app writes a snapshot to METRICS_FILE when it closes; print it with
+
+    python -m report_cli metrics [--file metrics.json]
+
+With the 'metrics' logger at DEBUG every timed call is also logged (a simple trace).
+Logging: modules log through logging.getLogger(__name__). Nothing below WARNING is formatted
+unless configure_logging() enables it (MOOD_TRACKER_LOG_LEVEL=INFO or DEBUG).
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+METRICS_FILE = 'metrics.json'
+LOG_LEVEL_ENV = 'MOOD_TRACKER_LOG_LEVEL'
+# Upper bounds of the histogram buckets in microseconds (1, 2, 5, 10, ... 100 s); slower calls go in a last bucket
+BUCKET_BOUNDS_US = [mantissa * 10 ** exponent for exponent in range(9) for mantissa in (1, 2, 5)][:-2]
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_timers = {} # name -> _Histogram
+_counters = {} # name -> int
+_since = datetime.now()
+
+
+class _Histogram:
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_US) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(BUCKET_BOUNDS_US, seconds * 1e6)] += 1
+
+
+def record(name, seconds):
+    """Adds one duration (in seconds) to the timer `name`."""
+    with _lock:
+        histogram = _timers.get(name)
+        if histogram is None:
+            histogram = _timers[name] = _Histogram()
+        histogram.add(seconds)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s took %.3f ms", name, seconds * 1000)
+
+
+def count(name, n=1):
+    """Adds n to the counter `name`."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+class timer:
+    """Context manager timing its block into the timer `name` (also when the block raises)."""
+    __slots__ = ('name', '_started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self._started)
+        return False
+
+
+def timed(name):
+    """Decorator timing every call of the function into the timer `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def reset():
+    """Forgets all timers and counters."""
+    global _since
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _since = datetime.now()
+
+
+def snapshot():
+    """All metrics as a JSON-serializable dict."""
+    with _lock:
+        timers = {name: {'count': h.count, 'total_s': h.total, 'min_s': h.min if h.count else 0.0, 'max_s': h.max,
+                         'buckets': list(h.buckets)}
+                  for name, h in _timers.items()}
+        counters = dict(_counters)
+        since = _since
+    return {'since': since.isoformat(), 'taken': datetime.now().isoformat(),
+            'bucket_bounds_us': BUCKET_BOUNDS_US, 'timers': timers, 'counters': counters}
+
+
+def percentile(timer_snapshot, p, bounds_us=BUCKET_BOUNDS_US):
+    """Upper bucket bound (in seconds) containing the p-th percentile of a snapshot timer; max_s for the last bucket."""
+    total = timer_snapshot['count']
+    if total == 0:
+        return 0.0
+    rank = p / 100 * total
+    seen = 0
+    for i, bucket_count in enumerate(timer_snapshot['buckets']):
+        seen += bucket_count
+        if seen >= rank and bucket_count:
+            return min(bounds_us[i] / 1e6, timer_snapshot['max_s']) if i < len(bounds_us) else timer_snapshot['max_s']
+    return timer_snapshot['max_s']
+
+
+def _format_us(us):
+    if us >= 1e6:
+        return f"{us / 1e6:g}s"
+    if us >= 1e3:
+        return f"{us / 1e3:g}ms"
+    return f"{us:g}us"
+
+
+def format_report(snap, histograms=True, width=40):
+    """Human-readable table (and optionally one histogram per timer) of a snapshot()."""
+    bounds = snap.get('bucket_bounds_us', BUCKET_BOUNDS_US)
+    lines = [f"Metrics from {snap['since']} to {snap['taken']}"]
+    if snap['timers']:
+        lines.append(f"{'timer':<32} {'count':>8} {'mean ms':>10} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for name in sorted(snap['timers']):
+            t = snap['timers'][name]
+            mean = t['total_s'] / t['count'] if t['count'] else 0.0
+            lines.append(f"{name:<32} {t['count']:>8} {mean * 1000:>10.3f} {percentile(t, 50, bounds) * 1000:>9.3f} "
+                         f"{percentile(t, 90, bounds) * 1000:>9.3f} {percentile(t, 99, bounds) * 1000:>9.3f} "
+                         f"{t['max_s'] * 1000:>9.3f}")
+    if snap['counters']:
+        lines.append(f"{'counter':<32} {'value':>8}")
+        for name in sorted(snap['counters']):
+            lines.append(f"{name:<32} {snap['counters'][name]:>8}")
+    if histograms:
+        for name in sorted(snap['timers']):
+            buckets = snap['timers'][name]['buckets']
+            used = [i for i, c in enumerate(buckets) if c]
+            if not used:
+                continue
+            lines.append(f"\n{name}")
+            peak = max(buckets)
+            for i in range(used[0], used[-1] + 1):
+                label = f"<= {_format_us(bounds[i])}" if i < len(bounds) else f" > {_format_us(bounds[-1])}"
+                bar = '#' * max(1 if buckets[i] else 0, round(buckets[i] / peak * width))
+                lines.append(f"  {label:>10} {buckets[i]:>8} {bar}")
+    return '\n'.join(lines)
+
+
+def dump(path=METRICS_FILE):
+    """Writes snapshot() to path atomically. Returns the snapshot."""
+    snap = snapshot()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(snap, f, indent=1)
+    os.replace(tmp_path, path)
+    return snap
+
+
+def load(path=METRICS_FILE):
+    """Reads a snapshot written by dump()."""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def configure_logging(level=None):
+    """
+    Sets up logging for an entry point: level (a name like 'INFO' or a number) defaults to the
+    MOOD_TRACKER_LOG_LEVEL environment variable, or WARNING.
+    """
+    level = level or os.environ.get(LOG_LEVEL_ENV, 'WARNING')
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+        if not isinstance(level, int):
+            level = logging.WARNING # Unknown name
+    logging.basicConfig(level=level, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
@@ -1,8 +1,11 @@
 import customtkinter as ctk
 import tkinter as tk
-import colorsys # Module to convert RGB to HSB (HSV in Python)
+import hsb_mapping # Colour -> sentiment/emotion mapping
+import logging
 import tkinter.messagebox # Import messagebox for error popups
 
+logger = logging.getLogger(__name__)
+
 class MoodInputWindow(ctk.CTkToplevel):
     """
     A top-level window for users to input their subjective mood
@@ -23,15 +26,8 @@ class MoodInputWindow(ctk.CTkToplevel):
         self.sentiment_score = None
         self.optional_text = ""
 
-        # --- Color Palette (You can customize these colors) ---
-        # Using a diverse set of colors to test the HSB mapping
-        self.color_palette = [
-            "#FF0000", "#FF4500", "#FFA500", "#FFD700", "#FFFF00", # Reds, Oranges, Yellows
-            "#90EE90", "#32CD32", "#008000", "#006400", "#008080", # Greens, Teals
-            "#ADD8E6", "#87CEFA", "#4682B4", "#1E90FF", "#0000CD", # Light Blues, Blues, Dark Blues
-            "#9370DB", "#8A2BE2", "#9400D3", "#800080", "#4B0082", # Purples, Indigos
-            "#FFFFFF", "#C0C0C0", "#808080", "#404040", "#000000"  # White, Grays, Black
-        ]
+        # --- Color Palette (customize in hsb_mapping.PALETTE) ---
+        self.color_palette = list(hsb_mapping.PALETTE)
 
         self.placeholder_text = "Optional explanation..." # Define placeholder text
 
@@ -96,128 +92,15 @@ class MoodInputWindow(ctk.CTkToplevel):
 
 
     def hex_to_hsb(self, hex_color):
-        """Converts a hex color string to HSB (HSV in Python's colorsys)."""
-        # Remove '#' if present
-        hex_color = hex_color.lstrip('#')
-        # Convert hex to RGB (0-255 range)
-        rgb_255 = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-        # Convert RGB (0-1 range) to HSV (HSB)
-        # colorsys.rgb_to_hsv expects RGB values in the range [0, 1]
-        rgb_01 = (rgb_255[0] / 255.0, rgb_255[1] / 255.0, rgb_255[2] / 255.0)
-        h, s, v = colorsys.rgb_to_hsv(*rgb_01) # H, S, V are in the range [0, 1]
-        # H is Hue (0-1, maps to 0-360 degrees), S is Saturation (0-1), V is Value (Brightness) (0-1)
-        return h, s, v # Returning H, S, V (Brightness)
-
+        """Converts a hex color string to HSB (see hsb_mapping.hex_to_hsb)."""
+        return hsb_mapping.hex_to_hsb(hex_color)
 
     def assign_sentiment_and_emotion_from_hsb(self, h, s, v):
         """
-        Assigns a simplified sentiment score (+1, 0, -1) and a more specific
-        emotion label based on HSB values and inspiration from the emotion grid.
-        This is a simplified mapping for the prototype.
+        Assigns a sentiment score (+1, 0, -1) and an emotion label from HSB values.
+        The rules live in hsb_mapping so the stored history can be rescored with them.
         """
-        sentiment = 0 # Default to neutral (0)
-        emotion_label = "Neutral" # Default emotion label
-
-        # Convert Hue from 0-1 range to 0-360 degrees for easier mapping
-        h_degrees = h * 360
-
-        # --- Simplified Logic based on HSB and Emotion Grid Areas ---
-
-        # Low Saturation (Grayscale/Muted) - Tend towards Neutral or Low Energy
-        if s < 0.2: # Lowering saturation threshold slightly
-            if v < 0.3: # Very dark grays/black
-                sentiment = -1
-                emotion_label = "Low Energy" # From grid concept
-            elif v > 0.7: # Very light grays/white
-                 sentiment = 0
-                 emotion_label = "Calm" # From grid concept
-            else: # Medium grays
-                sentiment = 0
-                emotion_label = "Apathetic" # From grid concept
-        # Saturated Colors
-        else:
-            # High Brightness/Value - Tend towards Higher Energy/Pleasantness (top of grid)
-            if v > 0.6:
-                if (h_degrees >= 0 and h_degrees < 20) or (h_degrees >= 340 and h_degrees <= 360): # Reds
-                     sentiment = 0 # Can be intense positive or negative
-                     emotion_label = "Intense" # General high arousal
-                elif h_degrees >= 20 and h_degrees < 75: # Orange to Yellow
-                     sentiment = +1
-                     emotion_label = "Excited" # Top right of grid
-                elif h_degrees >= 75 and h_degrees < 155: # Green
-                     sentiment = +1
-                     emotion_label = "Lively" # Top right of grid
-                elif h_degrees >= 155 and h_degrees < 240: # Blue
-                     sentiment = +1
-                     emotion_label = "Upbeat" # Top right of grid
-                elif h_degrees >= 240 and h_degrees < 300: # Purple
-                     sentiment = 0
-                     emotion_label = "Surprised" # Top middle of grid
-                elif h_degrees >= 300 and h_degrees < 340: # Pink
-                     sentiment = +1
-                     emotion_label = "Joyful" # High Pleasantness area
-                else:
-                     sentiment = 0
-                     emotion_label = "Energetic" # Default for high value saturated
-            # Medium Brightness/Value
-            elif v > 0.3: # Above dark threshold but not very bright
-                if (h_degrees >= 0 and h_degrees < 20) or (h_degrees >= 340 and h_degrees <= 360): # Reds
-                     sentiment = -1
-                     emotion_label = "Angry" # Top left of grid
-                elif h_degrees >= 20 and h_degrees < 75: # Orange to Yellow
-                     sentiment = +1
-                     emotion_label = "Happy" # Middle right of grid
-                elif h_degrees >= 75 and h_degrees < 155: # Green
-                     sentiment = +1
-                     emotion_label = "Content" # Middle right of grid
-                elif h_degrees >= 155 and h_degrees < 240: # Blue
-                     sentiment = 0 # Can be calm or sad
-                     emotion_label = "Pleasant" # Middle of grid
-                elif h_degrees >= 240 and h_degrees < 300: # Purple
-                     sentiment = 0
-                     emotion_label = "Introspective" # General association
-                elif h_degrees >= 300 and h_degrees < 340: # Pink
-                     sentiment = +1
-                     emotion_label = "Hopeful" # Middle right area
-                else:
-                     sentiment = 0
-                     emotion_label = "Neutral" # Fallback
-            # Low Brightness/Value - Tend towards Lower Energy/Pleasantness (bottom of grid)
-            else: # v <= 0.3 (but s > 0.2)
-                 if (h_degrees >= 0 and h_degrees < 20) or (h_degrees >= 340 and h_degrees <= 360): # Dark Reds
-                      sentiment = -1
-                      emotion_label = "Enraged" # Top left corner (intense negative)
-                 elif h_degrees >= 155 and h_degrees < 240: # Dark Blues
-                      sentiment = -1
-                      emotion_label = "Depressed" # Bottom left of grid
-                 elif h_degrees >= 75 and h_degrees < 155: # Dark Greens
-                      sentiment = 0 # Can be muted calm
-                      emotion_label = "Restful" # Bottom right area
-                 else:
-                      sentiment = -1 # Default for dark saturated colors
-                      emotion_label = "Low Mood" # General low pleasantness
-
-
-        # Ensure sentiment is one of the allowed values (-1, 0, 1)
-        # This is a safeguard, the logic above should primarily produce these
-        if sentiment not in [-1, 0, 1]:
-             sentiment = 0 # Default to neutral if logic somehow fails
-
-        # Refine emotion label based on final sentiment if needed (optional)
-        # This ensures the label broadly matches the sentiment score
-        if sentiment == 1 and emotion_label in ["Angry", "Frustrated", "Depressed", "Sad", "Low Energy", "Low Mood", "Apathetic", "Intense", "Surprised"]:
-             # If a positive sentiment was assigned but the label is typically negative/neutral, adjust label
-             emotion_label = "Positive"
-        elif sentiment == -1 and emotion_label in ["Excited", "Happy", "Content", "Peaceful", "Calm", "Lively", "Upbeat", "Joyful", "Hopeful", "Pleasant", "Restful"]:
-             # If a negative sentiment was assigned but the label is typically positive/neutral, adjust label
-             emotion_label = "Negative"
-        elif sentiment == 0 and emotion_label in ["Excited", "Happy", "Content", "Peaceful", "Calm", "Lively", "Upbeat", "Joyful", "Hopeful", "Positive", "Negative", "Depressed", "Sad", "Angry", "Frustrated", "Enraged", "Low Mood"]:
-             # If a neutral sentiment was assigned but the label is typically positive/negative, adjust label
-             emotion_label = "Neutral"
-
-
-        return sentiment, emotion_label
-
+        return hsb_mapping.assign_sentiment_and_emotion(h, s, v)
 
     def on_color_select(self, color):
         """Handles a color button click - stores color, calculates HSB and sentiment/emotion, updates labels."""
@@ -226,14 +109,14 @@ class MoodInputWindow(ctk.CTkToplevel):
 
         # Calculate HSB
         h, s, v = self.hex_to_hsb(color)
-        print(f"Selected Color: {color}, HSB: ({h:.2f}, {s:.2f}, {v:.2f})") # Debug print HSB
+        logger.debug("Selected Color: %s, HSB: (%.2f, %.2f, %.2f)", color, h, s, v)
 
         # Assign sentiment and emotion based on HSB
         self.sentiment_score, self.selected_emotion = self.assign_sentiment_and_emotion_from_hsb(h, s, v)
 
         # Update the label to show both emotion and sentiment
         self.emotion_sentiment_label.configure(text=f"Emotion: {self.selected_emotion} (Sentiment: {self.sentiment_score})")
-        print(f"Derived Sentiment: {self.sentiment_score}, Emotion: {self.selected_emotion}") # Debug print sentiment
+        logger.debug("Derived Sentiment: %s, Emotion: %s", self.sentiment_score, self.selected_emotion)
 
 
     def on_done(self):
@@ -250,10 +133,10 @@ class MoodInputWindow(ctk.CTkToplevel):
              # Now self.selected_color, self.selected_emotion, self.sentiment_score, and self.optional_text
              # hold the user's input. The calling code in app.py will access these after wait_window.
 
-             print(f"Optional text entered: '{self.optional_text}'") # For debugging
+             logger.debug("Optional text entered: '%s'", self.optional_text)
              self.destroy() # Close the window
         else:
-             print("Please select a color before clicking DONE.") # Inform user if no color selected
+             logger.info("DONE clicked without a color selection.")
              # Optional: Show a message box to the user
              tk.messagebox.showwarning("Selection Required", "Please select a color before clicking DONE.")
 
@@ -0,0 +1,130 @@
+"""
+Headless analytics: computes the conclusion and renders the weekly plot without a display.
+
+    python -m report_cli report --data-dir DIR --out OUT_DIR [--format png svg]
+    python -m report_cli batch --root USERS_DIR --out results.csv [--workers N] [--max-memory-mb MB] [--contamination 0.05]
+    python -m report_cli rescore [--data-dir DIR] [--chunksize ROWS]
+    python -m report_cli metrics [--file metrics.json] [--no-histograms]
+
+report writes OUT_DIR/report.json (conclusion, entry counts, weekly averages) and
+OUT_DIR/weekly_sentiment.<format> for every requested format. It only reads the data directory:
+the app's persisted caches (rollups, weekly table) are neither used nor written. batch analyses every user folder
+under USERS_DIR in parallel (see batch_analytics.py). rescore recomputes the sentiment and emotion
+of every stored mood entry with the current colour mapping (see hsb_mapping.py). metrics prints
+the latency histograms and counters the app saved when it last closed (see metrics.py). Uses matplotlib's Agg backend and never
+imports tkinter, so it runs on servers and in cron jobs.
+"""
+import argparse
+import json
+import os
+import sys
+
+import matplotlib
+matplotlib.use('Agg') # Before anything imports pyplot
+import metrics
+
+REPORT_FILE = 'report.json'
+PLOT_BASENAME = 'weekly_sentiment'
+PLOT_FORMATS = ['png', 'svg', 'pdf']
+
+
+def build_report(data_dir, min_submissions=3):
+    """Returns (report dict, weekly figure) for the data files in data_dir, computed in memory."""
+    from matplotlib.figure import Figure
+    from batch_analytics import sentiment_summary
+    from insights_generator import draw_weekly_sentiment # Imported after the backend is set
+
+    subjective, _, conclusion, weekly_means = sentiment_summary(data_dir, min_submissions)
+    report = {
+        'conclusion': conclusion,
+        'scored_entries': len(subjective),
+        'weekly_average_sentiment': [[week.date().isoformat(), round(float(mean), 4)]
+                                     for week, mean in weekly_means.items()],
+    }
+    figure = Figure(figsize=(10, 4))
+    draw_weekly_sentiment(figure.add_subplot(), len(subjective), weekly_means)
+    figure.tight_layout()
+    return report, figure
+
+
+def run_report(data_dir, out_dir, formats):
+    """Generates the report for the data files in data_dir. Returns the paths written."""
+    report, figure = build_report(os.path.abspath(data_dir))
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    report_path = os.path.join(out_dir, REPORT_FILE)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    written.append(report_path)
+    for fmt in formats:
+        plot_path = os.path.join(out_dir, f"{PLOT_BASENAME}.{fmt}")
+        figure.savefig(plot_path, format=fmt)
+        written.append(plot_path)
+    return report, written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="report_cli", description="Headless mood tracking analytics.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    report_parser = subparsers.add_parser('report', help="Write the conclusion and weekly plot to a directory")
+    report_parser.add_argument('--data-dir', default='.', help="Directory holding the data files (default: current directory)")
+    report_parser.add_argument('--out', required=True, help="Output directory for report.json and the plots")
+    report_parser.add_argument('--format', nargs='+', choices=PLOT_FORMATS, default=['png'], dest='formats',
+                               help="Plot file formats (default: png)")
+
+    batch_parser = subparsers.add_parser('batch', help="Analyse many users' data folders into one CSV")
+    batch_parser.add_argument('--root', required=True, help="Directory with one data folder per user")
+    batch_parser.add_argument('--out', required=True, help="Consolidated output CSV")
+    batch_parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    batch_parser.add_argument('--max-memory-mb', type=int, default=None,
+                              help="Memory cap per worker in MB (Unix only; 0 disables the cap)")
+    batch_parser.add_argument('--contamination', type=float, default=None,
+                              help="Expected share of anomalous days per user (default: 0.05)")
+
+    rescore_parser = subparsers.add_parser('rescore', help="Recompute stored sentiment/emotion with the current colour mapping")
+    rescore_parser.add_argument('--data-dir', default='.', help="Directory holding the data files (default: current directory)")
+    rescore_parser.add_argument('--chunksize', type=int, default=100_000, help="Rows read and rewritten at a time")
+
+    metrics_parser = subparsers.add_parser('metrics', help="Show the timers and counters saved by the app")
+    metrics_parser.add_argument('--file', default=metrics.METRICS_FILE, help="Metrics snapshot (default: metrics.json)")
+    metrics_parser.add_argument('--no-histograms', action='store_true', help="Only show the summary table")
+
+    args = parser.parse_args(argv)
+    metrics.configure_logging(os.environ.get(metrics.LOG_LEVEL_ENV, 'INFO')) # Show the commands' progress messages
+    if args.command == 'report':
+        report, written = run_report(args.data_dir, args.out, args.formats)
+        print(f"Conclusion: {report['conclusion']}")
+        for path in written:
+            print(f"Wrote {path}")
+    elif args.command == 'batch':
+        import batch_analytics
+        max_memory_mb = batch_analytics.DEFAULT_MAX_MEMORY_MB if args.max_memory_mb is None else args.max_memory_mb
+        contamination = batch_analytics.DEFAULT_CONTAMINATION if args.contamination is None else args.contamination
+        failed = 0
+        for row in batch_analytics.run_batch(args.root, args.out, args.workers, max_memory_mb,
+                                              contamination=contamination):
+            status = f"error: {row['Error']}" if row['Error'] else row['Conclusion']
+            failed += bool(row['Error'])
+            print(f"{row['User']}: {status}")
+        print(f"Wrote {args.out}")
+        return 1 if failed else 0
+    elif args.command == 'rescore':
+        import hsb_mapping
+        try:
+            hsb_mapping.rescore_subjective_data(os.path.abspath(args.data_dir), args.chunksize)
+        except ValueError as e:
+            print(f"Cannot rescore: {e}")
+            return 1
+    elif args.command == 'metrics':
+        try:
+            snap = metrics.load(args.file)
+        except FileNotFoundError:
+            print(f"No metrics at {args.file}; the app writes them when it closes.")
+            return 1
+        print(metrics.format_report(snap, histograms=not args.no_histograms))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
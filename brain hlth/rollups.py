@@ -0,0 +1,283 @@
+"""
+Multi-resolution rollup pyramid for both data sets, persisted in ROLLUPS_FILE (SQLite):
+    sentiment_rollup(resolution, bucket, sum, count, min, max)
+    activity_rollup(resolution, bucket, active_info, samples)
+for the hour, day, week and month resolutions. Buckets are labelled like pandas' resample()
+('h', 'D', 'W' = week ending Sunday, 'MS' = month start). The tables are updated from
+data_manager's write notifications, so charts can read pre-aggregated buckets instead of
+resampling raw 10-second samples at render time.
+"""
+import json
+import logging
+import math
+import threading
+from collections import defaultdict
+from datetime import datetime
+import pandas as pd
+import data_manager
+import sqlite_store
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_FILE = 'rollups.db'
+
+RESOLUTIONS = ['hour', 'day', 'week', 'month'] # Finest to coarsest
+RESAMPLE_RULES = {'hour': 'h', 'day': 'D', 'week': 'W', 'month': 'MS'}
+# Approximate bucket widths, used to pick a resolution for a time span
+BUCKET_WIDTHS = {'hour': pd.Timedelta(hours=1), 'day': pd.Timedelta(days=1),
+                 'week': pd.Timedelta(weeks=1), 'month': pd.Timedelta(days=30.44)}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentiment_rollup (
+    resolution TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    sum REAL NOT NULL,
+    count INTEGER NOT NULL,
+    min REAL,
+    max REAL,
+    PRIMARY KEY (resolution, bucket)
+);
+CREATE TABLE IF NOT EXISTS activity_rollup (
+    resolution TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    active_info TEXT NOT NULL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (resolution, bucket, active_info)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_SENTIMENT_UPSERT = """
+INSERT INTO sentiment_rollup (resolution, bucket, sum, count, min, max) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (resolution, bucket) DO UPDATE SET
+    sum = sum + excluded.sum,
+    count = count + excluded.count,
+    min = MIN(min, excluded.min),
+    max = MAX(max, excluded.max)
+"""
+
+_ACTIVITY_UPSERT = """
+INSERT INTO activity_rollup (resolution, bucket, active_info, samples) VALUES (?, ?, ?, ?)
+ON CONFLICT (resolution, bucket, active_info) DO UPDATE SET samples = samples + excluded.samples
+"""
+
+
+def bucket_start(timestamp, resolution):
+    """Label of the bucket containing one timestamp (scalar version of bucket_labels)."""
+    ts = pd.Timestamp(timestamp)
+    if resolution == 'hour':
+        return ts.floor('h')
+    if resolution == 'day':
+        return ts.normalize()
+    if resolution == 'week':
+        return pd.offsets.Week(weekday=6).rollforward(ts.normalize())
+    return ts.normalize().replace(day=1)
+
+
+def bucket_labels(timestamps, resolution):
+    """Vectorized bucket labels for a datetime Series."""
+    if resolution == 'hour':
+        return timestamps.dt.floor('h')
+    if resolution == 'day':
+        return timestamps.dt.floor('D')
+    if resolution == 'week':
+        days_to_sunday = (6 - timestamps.dt.dayofweek) % 7
+        return timestamps.dt.floor('D') + pd.to_timedelta(days_to_sunday, unit='D')
+    return timestamps.dt.to_period('M').dt.start_time
+
+
+def choose_resolution(start, end, max_points):
+    """Finest resolution whose bucket count over [start, end) fits in max_points (e.g. the chart's pixel width)."""
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    for resolution in RESOLUTIONS:
+        if span / BUCKET_WIDTHS[resolution] <= max_points:
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+class RollupPyramid:
+    """
+    Owner of the persisted rollup tables. Like WeeklySentimentAggregates, it stores the
+    data_manager.storage_signature() each table reflects and rebuilds a table (lazily, on
+    the next query) when the underlying data changed while nobody was listening.
+    """
+    def __init__(self, db_path=None):
+        """db_path: SQLite file holding the rollups. Defaults to ROLLUPS_FILE."""
+        self.db_path = db_path or ROLLUPS_FILE
+        self._lock = threading.RLock()
+        # kind -> True (tables current, apply writes), False (rebuild before next query)
+        self._current = {'subjective': None, 'activity': None}
+        data_manager.add_write_listener(self._on_write)
+        # Decide now, before any further write lands, whether the stored tables are still current
+        for kind in self._current:
+            stored = self._get_meta(f'{kind}_signature')
+            with self._lock:
+                if self._current[kind] is None:
+                    self._current[kind] = stored is not None and json.loads(stored) == data_manager.storage_signature(kind)
+
+    def close(self):
+        """Stops following new writes."""
+        data_manager.remove_write_listener(self._on_write)
+
+    def _conn(self):
+        return sqlite_store.get_connection(self.db_path, schema=_SCHEMA)
+
+    def _get_meta(self, key):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _store_signature(self, conn, kind):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                     (f'{kind}_signature', json.dumps(data_manager.storage_signature(kind))))
+
+    # --- Write Path ---
+
+    def _on_write(self, kind, records):
+        """data_manager write listener: folds the new rows into every resolution."""
+        with self._lock:
+            if not self._current.get(kind):
+                return # Not verified yet, or a rebuild is pending that will include these rows
+            conn = self._conn()
+            with conn:
+                if kind == 'subjective':
+                    conn.executemany(_SENTIMENT_UPSERT, self._sentiment_deltas(records))
+                else:
+                    conn.executemany(_ACTIVITY_UPSERT, self._activity_deltas(records))
+                self._store_signature(conn, kind)
+
+    def _sentiment_deltas(self, records):
+        deltas = {} # (resolution, bucket) -> [sum, count, min, max]
+        for record in records:
+            try:
+                score = float(record.get('SentimentScore'))
+            except (TypeError, ValueError):
+                continue
+            if math.isnan(score):
+                continue
+            timestamp = datetime.fromisoformat(record['Timestamp']) if isinstance(record['Timestamp'], str) else record['Timestamp']
+            for resolution in RESOLUTIONS:
+                key = (resolution, bucket_start(timestamp, resolution).isoformat())
+                if key in deltas:
+                    d = deltas[key]
+                    d[0] += score
+                    d[1] += 1
+                    d[2] = min(d[2], score)
+                    d[3] = max(d[3], score)
+                else:
+                    deltas[key] = [score, 1, score, score]
+        return [key + tuple(values) for key, values in deltas.items()]
+
+    def _activity_deltas(self, records):
+        # Samples in a flushed batch are consecutive, so hour/day/week/month labels rarely change
+        # between them; count per distinct (hour, info) first and derive the coarser levels from that.
+        per_hour = defaultdict(int)
+        for record in records:
+            timestamp = record['Timestamp']
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp)
+            hour = timestamp.replace(minute=0, second=0, microsecond=0)
+            per_hour[(hour, record.get('ActiveInfo') or '')] += 1
+        deltas = defaultdict(int)
+        for (hour, info), samples in per_hour.items():
+            for resolution in RESOLUTIONS:
+                deltas[(resolution, bucket_start(hour, resolution).isoformat(), info)] += samples
+        return [key + (samples,) for key, samples in deltas.items()]
+
+    # --- Rebuild ---
+
+    def rebuild(self, kind=None):
+        """Recomputes the rollups of one data set (or both) from the stored data."""
+        for k in (('subjective', 'activity') if kind is None else (kind,)):
+            with self._lock:
+                self._rebuild_locked(k)
+
+    def _rebuild_locked(self, kind):
+        logger.info("Rebuilding %s rollups.", kind)
+        conn = self._conn()
+        if kind == 'subjective':
+            df = data_manager.load_subjective_data(columns=['Timestamp', 'SentimentScore'])
+            df = df.assign(SentimentScore=pd.to_numeric(df['SentimentScore'], errors='coerce')).dropna(subset=['SentimentScore'])
+            rows = []
+            for resolution in RESOLUTIONS:
+                if df.empty:
+                    break
+                grouped = df.groupby(bucket_labels(df['Timestamp'], resolution))['SentimentScore'].agg(['sum', 'count', 'min', 'max'])
+                rows.extend((resolution, bucket.isoformat(), float(r['sum']), int(r['count']), float(r['min']), float(r['max']))
+                            for bucket, r in grouped.iterrows())
+            with conn:
+                conn.execute("DELETE FROM sentiment_rollup")
+                conn.executemany(_SENTIMENT_UPSERT, rows)
+                self._store_signature(conn, kind)
+        else:
+            df = data_manager.load_activity_data()
+            rows = []
+            if not df.empty:
+                info = df['ActiveInfo'].astype(object).fillna('')
+                hourly = df.groupby([bucket_labels(df['Timestamp'], 'hour'), info]).size()
+                hourly.index.names = ['bucket', 'info']
+                hourly = hourly.reset_index(name='samples')
+                for resolution in RESOLUTIONS:
+                    # Coarser levels are sums of the hourly counts, so the raw samples are grouped only once
+                    grouped = hourly.groupby([bucket_labels(hourly['bucket'], resolution), 'info'])['samples'].sum()
+                    rows.extend((resolution, bucket.isoformat(), info_value, int(samples))
+                                for (bucket, info_value), samples in grouped.items())
+            with conn:
+                conn.execute("DELETE FROM activity_rollup")
+                conn.executemany(_ACTIVITY_UPSERT, rows)
+                self._store_signature(conn, kind)
+        self._current[kind] = True
+
+    def _ensure_current(self, kind):
+        with self._lock:
+            if not self._current[kind]:
+                self._rebuild_locked(kind)
+
+    # --- Queries ---
+
+    def sentiment(self, resolution, start=None, end=None):
+        """Sentiment buckets in [start, end): DataFrame indexed by bucket with sum, count, min, max, mean."""
+        self._ensure_current('subjective')
+        df = self._query("SELECT bucket, sum, count, min, max FROM sentiment_rollup", resolution, start, end)
+        df['mean'] = df['sum'] / df['count']
+        return df.set_index('bucket')
+
+    def activity(self, resolution, start=None, end=None):
+        """Activity buckets in [start, end): DataFrame indexed by bucket, one column of sample counts per ActiveInfo."""
+        self._ensure_current('activity')
+        df = self._query("SELECT bucket, active_info, samples FROM activity_rollup", resolution, start, end)
+        if df.empty:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='bucket'))
+        return df.pivot_table(index='bucket', columns='active_info', values='samples', aggfunc='sum', fill_value=0)
+
+    def _query(self, select, resolution, start, end):
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution '{resolution}', expected one of {RESOLUTIONS}")
+        sql = select + " WHERE resolution = ?"
+        params = [resolution]
+        if start is not None:
+            sql += " AND bucket >= ?"
+            params.append(bucket_start(start, resolution).isoformat())
+        if end is not None:
+            sql += " AND bucket < ?"
+            params.append(pd.Timestamp(end).isoformat())
+        sql += " ORDER BY bucket"
+        with self._lock:
+            df = pd.read_sql_query(sql, self._conn(), params=params)
+        df['bucket'] = pd.to_datetime(df['bucket'], format='ISO8601')
+        return df
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_rollups():
+    """Returns the process-wide rollup pyramid, creating it on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = RollupPyramid()
+        return _shared
@@ -0,0 +1,217 @@
+"""
+Optional SQLite storage engine used by data_manager when STORAGE_BACKEND = 'sqlite'.
+Timestamps are stored as ISO-8601 text (the same format the CSV files use), which sorts
+chronologically, so the Timestamp indexes serve range queries directly.
+"""
+import logging
+import sqlite3
+import threading
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_COLUMNS = ['Timestamp', 'ActiveInfo']
+SUBJECTIVE_COLUMNS = ['Timestamp', 'ColorChoice', 'Emotion', 'SentimentScore', 'OptionalText']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS activity (
+    Timestamp TEXT NOT NULL,
+    ActiveInfo TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_activity_timestamp ON activity (Timestamp);
+CREATE TABLE IF NOT EXISTS subjective (
+    Timestamp TEXT NOT NULL,
+    ColorChoice TEXT,
+    Emotion TEXT,
+    SentimentScore REAL,
+    OptionalText TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_subjective_timestamp ON subjective (Timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# sqlite3 connections may not be shared between threads (the tracker writes from its own thread),
+# so each thread keeps one open connection per database file.
+_local = threading.local()
+BUSY_TIMEOUT_SECONDS = 30 # How long a write waits for another connection's transaction (sqlite's default is 5)
+
+
+def get_connection(db_path, schema=None):
+    """
+    Returns this thread's connection to db_path, creating the schema and enabling WAL on first use.
+    schema defaults to the activity/subjective tables; other databases (e.g. rollups.py) pass their own.
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SECONDS)
+        # WAL lets the UI read while the tracker thread is appending
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA if schema is None else schema)
+        connections[db_path] = conn
+    return conn
+
+
+def close_connections():
+    """Closes the calling thread's open connections."""
+    connections = getattr(_local, 'connections', None) or {}
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
+
+def _to_iso(value):
+    """Converts a datetime/str range bound to the ISO text stored in the database."""
+    if value is None:
+        return None
+    return pd.Timestamp(value).isoformat()
+
+
+def insert_activity(db_path, rows):
+    """Inserts (timestamp, active_info) rows in one transaction."""
+    conn = get_connection(db_path)
+    with conn:
+        conn.executemany("INSERT INTO activity (Timestamp, ActiveInfo) VALUES (?, ?)", rows)
+
+
+def insert_subjective(db_path, rows):
+    """Inserts (timestamp, color, emotion, sentiment, text) rows in one transaction."""
+    conn = get_connection(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO subjective (Timestamp, ColorChoice, Emotion, SentimentScore, OptionalText) VALUES (?, ?, ?, ?, ?)",
+            rows)
+
+
+def _query(db_path, table, columns, start=None, end=None):
+    """Reads rows with start <= Timestamp < end from a table, using the Timestamp index."""
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append("Timestamp >= ?")
+        params.append(_to_iso(start))
+    if end is not None:
+        conditions.append("Timestamp < ?")
+        params.append(_to_iso(end))
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY Timestamp"
+
+    df = pd.read_sql_query(sql, get_connection(db_path), params=params)
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce', format='ISO8601')
+    df.dropna(subset=['Timestamp'], inplace=True)
+    return df
+
+
+def query_activity(db_path, start=None, end=None):
+    """Returns activity rows in [start, end) as a DataFrame shaped like data_manager.load_activity_data()."""
+    return _query(db_path, 'activity', ACTIVITY_COLUMNS, start, end)
+
+
+def query_subjective(db_path, start=None, end=None):
+    """Returns subjective rows in [start, end) as a DataFrame shaped like data_manager.load_subjective_data()."""
+    df = _query(db_path, 'subjective', SUBJECTIVE_COLUMNS, start, end)
+    df['SentimentScore'] = pd.to_numeric(df['SentimentScore'], errors='coerce')
+    return df
+
+
+def query_recent_subjective(db_path, n):
+    """Returns the newest n subjective rows with a SentimentScore, oldest first (index walk, no full scan)."""
+    sql = (f"SELECT {', '.join(SUBJECTIVE_COLUMNS)} FROM subjective WHERE SentimentScore IS NOT NULL "
+           "ORDER BY Timestamp DESC LIMIT ?")
+    df = pd.read_sql_query(sql, get_connection(db_path), params=[n])
+    df = df.iloc[::-1].reset_index(drop=True)
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce', format='ISO8601')
+    df.dropna(subset=['Timestamp'], inplace=True)
+    df['SentimentScore'] = pd.to_numeric(df['SentimentScore'], errors='coerce')
+    return df
+
+
+def table_signature(db_path, table):
+    """(highest rowid, newest Timestamp) of a table; both come straight from indexes, no table scan."""
+    if table not in ('activity', 'subjective'):
+        raise ValueError(f"Unknown table: {table}")
+    row = get_connection(db_path).execute(f"SELECT MAX(rowid), MAX(Timestamp) FROM {table}").fetchone()
+    return row[0], row[1]
+
+
+def _import_progress(conn, table):
+    """CSV data rows of a table already consumed by import_csv() (committed with the rows they produced)."""
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (f'csv_import_{table}_rows',)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def import_csv(db_path, activity_csv, subjective_csv, chunksize=100_000):
+    """
+    One-shot import of the existing CSV files into the database.
+    Every chunk is committed together with the number of CSV rows consumed so far, so each write
+    lock is held for one chunk only (the app's own inserts keep working during a long import), and
+    an import that fails or is interrupted resumes after the last committed chunk when run again.
+    The finished import is recorded in the meta table, so calling it again is a no-op.
+    Returns a dict with the number of rows imported per table by this call.
+    """
+    conn = get_connection(db_path)
+    if conn.execute("SELECT value FROM meta WHERE key = 'csv_imported'").fetchone():
+        logger.info("CSV files were already imported, skipping.")
+        return {'activity': 0, 'subjective': 0}
+
+    imported = {'activity': 0, 'subjective': 0}
+    for table, csv_path, columns in (('activity', activity_csv, ACTIVITY_COLUMNS),
+                                     ('subjective', subjective_csv, SUBJECTIVE_COLUMNS)):
+        consumed = _import_progress(conn, table)
+        if consumed:
+            logger.info("Resuming the import of %s after %d rows.", csv_path, consumed)
+        try:
+            # Skip the data rows a previous, interrupted import already committed (the header stays)
+            chunks = pd.read_csv(csv_path, chunksize=chunksize, skiprows=range(1, consumed + 1))
+            for chunk in chunks:
+                chunk_rows = len(chunk)
+                # Older activity files used 'ActiveApp' instead of 'ActiveInfo'
+                if table == 'activity' and 'ActiveInfo' not in chunk.columns and 'ActiveApp' in chunk.columns:
+                    chunk['ActiveInfo'] = chunk['ActiveApp']
+                for col in columns:
+                    if col not in chunk.columns:
+                        chunk[col] = 0 if col == 'SentimentScore' else None
+                chunk = chunk[columns].dropna(subset=['Timestamp'])
+                # Normalize timestamps so text comparisons in range queries stay chronological
+                timestamps = pd.to_datetime(chunk['Timestamp'], errors='coerce', format='ISO8601')
+                chunk = chunk[timestamps.notna()].copy()
+                chunk['Timestamp'] = timestamps[timestamps.notna()].map(pd.Timestamp.isoformat)
+                if table == 'subjective':
+                    chunk['SentimentScore'] = pd.to_numeric(chunk['SentimentScore'], errors='coerce')
+                chunk = chunk.astype(object).where(chunk.notna(), None)
+                with conn: # The rows and the progress marker commit (or roll back) together
+                    conn.execute("BEGIN IMMEDIATE")
+                    if _import_progress(conn, table) != consumed:
+                        raise RuntimeError(f"Another import of {csv_path} is running.")
+                    conn.executemany(
+                        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                        chunk.itertuples(index=False, name=None))
+                    consumed += chunk_rows
+                    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                 (f'csv_import_{table}_rows', str(consumed)))
+                imported[table] += len(chunk)
+        except FileNotFoundError:
+            logger.info("%s not found, nothing to import for '%s'.", csv_path, table)
+        except pd.errors.EmptyDataError:
+            pass
+
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_imported', ?)",
+                     (pd.Timestamp.now().isoformat(),))
+    logger.info("Imported %d activity rows and %d subjective rows.", imported['activity'], imported['subjective'])
+    return imported
+
+
+# One-shot migration of the CSV files in the current directory:
+#   python sqlite_store.py
+if __name__ == "__main__":
+    import data_manager
+    data_manager.import_csv_to_sqlite()
@@ -0,0 +1,117 @@
+"""
+Cold-start benchmark for app.py. Each run starts a fresh Python process (so no module is
+already imported), creates the App and measures:
+    import_ms  importing app.py
+    paint_ms   until the main window has painted (first update())
+    ready_ms   until the data is loaded and the initial conclusion is shown
+for the fast startup path and the eager one (App(fast_startup=False)).
+
+    python startup_benchmark.py [--runs 5] [--data-dir DIR] [--save-baseline] [--tolerance 0.25]
+
+With a saved baseline (STARTUP_BASELINE_FILE) the script exits with status 1 if the median
+fast-startup paint or ready time regressed by more than the tolerance, so it can run in CI.
+It also fails if importing app.py already loaded one of HEAVY_MODULES (they belong after the first paint).
+Needs a display, like the app itself.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+STARTUP_BASELINE_FILE = 'startup_baseline.json'
+READY_TIMEOUT = 60 # Seconds to wait for the background load before giving up
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib', 'sklearn'] # Must not be imported by `import app`
+
+# Runs in the child process; prints one JSON line with the timings
+_CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+heavy = [name for name in {heavy!r} if name in sys.modules]
+window = app.App(fast_startup={fast})
+window.update()
+painted = time.perf_counter()
+while window.insights_generator is None and time.perf_counter() - painted < {timeout}:
+    window.update()
+    time.sleep(0.005)
+ready = time.perf_counter()
+loaded = window.insights_generator is not None
+window.on_closing()
+print(json.dumps({{'import_ms': (imported - started) * 1000, 'paint_ms': (painted - started) * 1000,
+                  'ready_ms': (ready - started) * 1000, 'loaded': loaded, 'heavy_modules': heavy}}))
+"""
+
+
+def run_once(fast, data_dir):
+    """Starts the app in a fresh interpreter and returns its timings dict."""
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [app_dir, os.environ.get('PYTHONPATH')])))
+    result = subprocess.run([sys.executable, '-c', _CHILD.format(fast=fast, timeout=READY_TIMEOUT, heavy=HEAVY_MODULES)],
+                            cwd=data_dir, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"App startup failed:\n{result.stderr}")
+    # The app prints its own progress; the timings are the last line
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    if not timings['loaded']:
+        raise RuntimeError(f"App did not finish loading within {READY_TIMEOUT}s.")
+    if timings['heavy_modules']:
+        raise RuntimeError(f"Importing app loaded {', '.join(timings['heavy_modules'])} before the first paint.")
+    return timings
+
+
+def measure(runs, data_dir):
+    """Median timings per mode: {'fast': {...}, 'eager': {...}}."""
+    results = {}
+    for mode, fast in (('fast', True), ('eager', False)):
+        samples = [run_once(fast, data_dir) for _ in range(runs)]
+        results[mode] = {key: statistics.median(s[key] for s in samples)
+                         for key in ('import_ms', 'paint_ms', 'ready_ms')}
+    return results
+
+
+def check_regressions(results, baseline, tolerance):
+    """Returns messages for every fast-startup timing more than `tolerance` above the baseline."""
+    problems = []
+    for key in ('paint_ms', 'ready_ms'):
+        limit = baseline['fast'][key] * (1 + tolerance)
+        if results['fast'][key] > limit:
+            problems.append(f"fast {key}: {results['fast'][key]:.0f} ms > {limit:.0f} ms (baseline {baseline['fast'][key]:.0f} ms)")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure app.py cold-start time.")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh processes per mode (the median is reported)")
+    parser.add_argument('--data-dir', default='.', help="Directory holding the data files the app loads")
+    parser.add_argument('--baseline', default=STARTUP_BASELINE_FILE, help="Baseline timings file")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these timings as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown vs. the baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = measure(args.runs, os.path.abspath(args.data_dir))
+    for mode, timings in results.items():
+        print(f"{mode:>5}: import {timings['import_ms']:.0f} ms, window painted {timings['paint_ms']:.0f} ms, "
+              f"ready {timings['ready_ms']:.0f} ms")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}.")
+        return 0
+    try:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    problems = check_regressions(results, baseline, args.tolerance)
+    for problem in problems:
+        print(f"Startup regression: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Seeded synthetic histories in the app's own file formats, for benchmarks and load tests:
+    activity_data.csv   one ActiveInfo sample every `interval` seconds while the user is at the
+                        computer (a varying stretch of each day, shorter at weekends), with
+                        applications used in runs of a few minutes
+    subjective_data.csv a few mood entries per day; the colour follows a slowly drifting mood and
+                        SentimentScore/Emotion come from hsb_mapping, exactly as the mood window scores them
+The same seed and arguments always produce the same files. Data is generated and written a
+month at a time, so even 5 years of 10-second samples never has to fit in memory at once.
+
+    python synthetic_data.py --out DIR --days 365 [--seed 0] [--interval 10] [--start 2020-01-01]
+"""
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+import data_manager
+import hsb_mapping
+
+# (ActiveInfo, relative share of the time it is in the foreground)
+APPLICATIONS = [
+    ("Visual Studio Code", 20), ("Google Chrome", 18), ("Microsoft Outlook", 10), ("Slack", 9),
+    ("Microsoft Teams", 8), ("Microsoft Word", 7), ("Microsoft Excel", 6), ("Windows Terminal", 5),
+    ("Spotify", 4), ("File Explorer", 4), ("YouTube - Google Chrome", 5), ("Computer Activity", 4),
+]
+MEAN_RUN_SAMPLES = 30 # Average number of consecutive samples of one application (5 minutes at 10 s)
+MOOD_ENTRIES_PER_DAY = 3 # Poisson mean
+CHUNK_DAYS = 31 # Days generated and written per step
+
+
+def _active_periods(days, rng):
+    """(start offset, end offset) in seconds from each day's midnight when the user is at the computer."""
+    weekend = np.asarray(days.dayofweek >= 5)
+    start = rng.normal(8.5, 0.75, len(days)) + weekend * 1.5
+    end = rng.normal(22.0, 0.75, len(days)) - weekend * 2.0
+    start = np.clip(start, 5, 12) * 3600
+    end = np.clip(end, 14, 23.9) * 3600
+    return start, end
+
+
+def generate_activity(days, starts, ends, interval, rng):
+    """
+    Activity samples for the given days (midnight Timestamps) with active periods from
+    _active_periods(), as a DataFrame of ISO timestamp strings and ActiveInfo.
+    """
+    counts = ((ends - starts) // interval).astype(np.int64)
+    total = int(counts.sum())
+    if total == 0:
+        return pd.DataFrame({'Timestamp': [], 'ActiveInfo': []})
+    # Sample k of a day is k * interval after its active start, plus the tracker's scheduling jitter
+    day_index = np.repeat(np.arange(len(days)), counts)
+    k = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    offsets = starts[day_index] + k * interval + rng.uniform(0, 0.5, total)
+    timestamps = days.to_numpy(dtype='datetime64[ns]')[day_index] + (offsets * 1e6).astype('timedelta64[us]')
+
+    # Applications change in runs; a new run starts with probability 1 / MEAN_RUN_SAMPLES
+    names = np.array([name for name, _ in APPLICATIONS], dtype=object)
+    weights = np.array([share for _, share in APPLICATIONS], dtype=float)
+    run_ids = np.cumsum(rng.random(total) < 1.0 / MEAN_RUN_SAMPLES)
+    run_apps = rng.choice(len(names), size=int(run_ids[-1]) + 1, p=weights / weights.sum())
+    return pd.DataFrame({'Timestamp': np.datetime_as_string(timestamps, unit='us'),
+                         'ActiveInfo': names[run_apps[run_ids]]})
+
+
+def generate_subjective(days, starts, ends, mood, rng):
+    """
+    Mood entries within the given days' active periods. mood: latent mood per day in [-1, 1],
+    which decides how likely positive, neutral and negative colours are picked.
+    """
+    counts = rng.poisson(MOOD_ENTRIES_PER_DAY, len(days))
+    day_index = np.repeat(np.arange(len(days)), counts)
+    if len(day_index) == 0:
+        return pd.DataFrame(columns=['Timestamp', 'ColorChoice', 'Emotion', 'SentimentScore', 'OptionalText'])
+    offsets = rng.uniform(starts[day_index], ends[day_index])
+    timestamps = days.to_numpy(dtype='datetime64[ns]')[day_index] + (offsets * 1e6).astype('timedelta64[us]')
+    timestamps.sort()
+
+    palette = np.array(hsb_mapping.PALETTE, dtype=object)
+    palette_scores, _ = hsb_mapping.map_colors(palette)
+    groups = {score: palette[palette_scores == score] for score in (-1, 0, 1)}
+    # Probabilities of a negative/neutral/positive pick shift with the latent mood
+    m = mood[day_index]
+    p_positive = 0.3 + 0.4 * np.clip(m, 0, 1)
+    p_negative = 0.3 + 0.4 * np.clip(-m, 0, 1)
+    u = rng.random(len(day_index))
+    scores = np.where(u < p_negative, -1, np.where(u > 1 - p_positive, 1, 0))
+    colors = np.empty(len(day_index), dtype=object)
+    for score, group in groups.items():
+        picked = scores == score
+        colors[picked] = group[rng.integers(0, len(group), int(picked.sum()))]
+    sentiments, emotions = hsb_mapping.map_colors(colors)
+    return pd.DataFrame({'Timestamp': np.datetime_as_string(timestamps, unit='us'), 'ColorChoice': colors,
+                         'Emotion': emotions, 'SentimentScore': sentiments.astype(np.int64), 'OptionalText': ''})
+
+
+def write_dataset(out_dir, days, seed=0, interval=10, start='2020-01-01'):
+    """
+    Writes activity_data.csv and subjective_data.csv for `days` days from `start` into out_dir
+    (replacing existing files). Returns (activity rows, subjective rows).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    all_days = pd.date_range(pd.Timestamp(start).normalize(), periods=days, freq='D')
+    # Latent mood: a slow AR(1) walk plus a weekend lift, clipped to [-1, 1]
+    noise = rng.normal(0, 0.15, days)
+    mood = np.empty(days)
+    level = 0.0
+    for i in range(days): # One step per day, cheap even for decades
+        level = 0.97 * level + noise[i]
+        mood[i] = level
+    mood = np.clip(mood + 0.2 * (all_days.dayofweek >= 5), -1, 1)
+
+    paths = [os.path.join(out_dir, data_manager.ACTIVITY_FILE), os.path.join(out_dir, data_manager.SUBJECTIVE_FILE)]
+    rows = [0, 0]
+    with open(paths[0], 'w', newline='') as activity_file, open(paths[1], 'w', newline='') as subjective_file:
+        for first in range(0, days, CHUNK_DAYS):
+            chunk_days = all_days[first:first + CHUNK_DAYS]
+            starts, ends = _active_periods(chunk_days, rng)
+            activity = generate_activity(chunk_days, starts, ends, interval, rng)
+            subjective = generate_subjective(chunk_days, starts, ends, mood[first:first + CHUNK_DAYS], rng)
+            activity.to_csv(activity_file, header=(first == 0), index=False)
+            subjective.to_csv(subjective_file, header=(first == 0), index=False)
+            rows[0] += len(activity)
+            rows[1] += len(subjective)
+    return tuple(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write seeded synthetic activity and mood histories.")
+    parser.add_argument('--out', required=True, help="Directory for activity_data.csv and subjective_data.csv")
+    parser.add_argument('--days', type=int, required=True, help="Days of history")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (same seed, same files)")
+    parser.add_argument('--interval', type=int, default=10, help="Seconds between activity samples")
+    parser.add_argument('--start', default='2020-01-01', help="First day of the history")
+    args = parser.parse_args(argv)
+
+    activity_rows, subjective_rows = write_dataset(args.out, args.days, args.seed, args.interval, args.start)
+    print(f"Wrote {activity_rows} activity samples and {subjective_rows} mood entries to {args.out}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import logging
+import queue
+import threading
+import tkinter as tk
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class LatestTaskRunner:
+    """
+    Runs slow computations (insights, plot data) on one background thread and hands the results
+    back to the Tk main loop with after(). Requests are keyed: submitting a new request for a key
+    supersedes the older one, which is skipped if it has not started yet and has its result
+    discarded if it has, so a burst of saves only ever shows the newest result.
+    """
+    def __init__(self, widget, name="LatestTaskRunner"):
+        """widget: Any Tk widget whose main loop receives the results (via widget.after)."""
+        self.widget = widget
+        self._lock = threading.Lock()
+        self._generations = {} # key -> generation of the newest request
+        self._pending = set() # Keys whose newest request has not delivered its result yet
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, key, func, on_done, on_error=None):
+        """
+        Queues func() to run on the worker thread. on_done(result) (or on_error(exception)) is
+        called on the main loop, unless a newer request for the same key was submitted meanwhile.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+            self._pending.add(key)
+        self._queue.put((key, generation, func, on_done, on_error))
+
+    def cancel(self, key):
+        """Drops the pending request for key (its callbacks will not be called)."""
+        with self._lock:
+            if key in self._generations:
+                self._generations[key] += 1
+            self._pending.discard(key)
+
+    def is_pending(self, key):
+        """True while the newest request for key has not delivered its result yet."""
+        with self._lock:
+            return key in self._pending
+
+    def shutdown(self):
+        """Stops the worker thread after the current task; pending results are dropped."""
+        with self._lock:
+            self._closed = True
+            self._pending.clear()
+        self._queue.put(None)
+
+    def _is_current(self, key, generation):
+        with self._lock:
+            return not self._closed and self._generations.get(key) == generation
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            key, generation, func, on_done, on_error = item
+            if not self._is_current(key, generation):
+                continue # Superseded before it started
+            try:
+                with metrics.timer(f"task.{key}"):
+                    result, callback = func(), on_done
+            except Exception as e:
+                logger.error("Task '%s' failed: %s", key, e)
+                result, callback = e, on_error
+            if not self._is_current(key, generation):
+                continue # Superseded while running
+            try:
+                self.widget.after(0, self._deliver, key, generation, callback, result)
+            except (RuntimeError, tk.TclError):
+                pass # The widget was destroyed while we were computing
+
+    def _deliver(self, key, generation, callback, result):
+        """Runs on the main loop: last staleness check, then the callback."""
+        with self._lock:
+            if self._closed or self._generations.get(key) != generation:
+                return
+            self._pending.discard(key)
+        if callback is not None:
+            callback(result)
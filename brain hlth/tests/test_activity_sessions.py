@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import data_manager
+
+
+@pytest.fixture
+def sessions_file(tmp_path):
+    return str(tmp_path / data_manager.ACTIVITY_SESSIONS_FILE)
+
+
+def _add_samples(writer, start, count, interval, info):
+    timestamps = [start + timedelta(seconds=i * interval) for i in range(count)]
+    for timestamp in timestamps:
+        writer.add(timestamp, info)
+    return timestamps
+
+
+def _expanded(path):
+    sessions = data_manager._normalize_sessions(pd.read_csv(path))
+    return data_manager.expand_activity_sessions(sessions)
+
+
+def test_non_default_interval_expands_to_the_recorded_samples(sessions_file):
+    writer = data_manager.SessionActivityWriter(file_path=sessions_file, interval=60)
+    timestamps = _add_samples(writer, datetime(2024, 1, 1, 9), 30, 60, "Editor")
+    writer.flush()
+
+    expanded = _expanded(sessions_file)
+    assert list(expanded['Timestamp']) == [pd.Timestamp(t) for t in timestamps]
+
+
+def test_interval_change_mid_run(sessions_file):
+    writer = data_manager.SessionActivityWriter(file_path=sessions_file)
+    start = datetime(2024, 1, 1, 9)
+    first = _add_samples(writer, start, 12, 10, "Editor")
+    writer.set_interval(60)
+    second = _add_samples(writer, first[-1] + timedelta(seconds=60), 10, 60, "Editor")
+    writer.flush()
+
+    assert list(pd.read_csv(sessions_file)['Interval']) == [10, 60]
+    assert len(_expanded(sessions_file)) == len(first) + len(second)
+
+
+def test_files_without_interval_column_are_upgraded(sessions_file):
+    with open(sessions_file, 'w', newline='') as f:
+        f.write("Start,End,ActiveInfo\n2024-01-01T08:00:00,2024-01-01T08:01:00,Mail\n")
+    writer = data_manager.SessionActivityWriter(file_path=sessions_file, interval=30)
+    _add_samples(writer, datetime(2024, 1, 1, 9), 3, 30, "Editor")
+    writer.flush()
+
+    stored = pd.read_csv(sessions_file)
+    assert list(stored['Interval']) == [data_manager.ACTIVITY_SAMPLE_INTERVAL, 30]
+    assert len(_expanded(sessions_file)) == 7 + 3
+
+
+def test_compacting_samples_keeps_their_spacing():
+    samples = pd.DataFrame({'Timestamp': pd.date_range('2024-01-01 09:00', periods=20, freq='60s'),
+                            'ActiveInfo': ['Editor'] * 20})
+    sessions = data_manager.compact_activity_samples(samples, max_gap=180)
+    assert list(sessions['Interval']) == [60]
+    assert len(data_manager.expand_activity_sessions(sessions)) == 20
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from anomaly_detector import StreamingAnomalyDetector
+
+
+def test_constant_warmup_learns_spread():
+    # SentimentScore only takes -1/0/1, so a run of neutral moods during warmup is the normal case
+    detector = StreamingAnomalyDetector()
+    detector.train(pd.DataFrame({'s': [0] * 20}))
+    scores = [detector.observe({'s': value}) for value in [1, -1] * 45]
+
+    assert detector._var[0] > 0.1
+    assert np.isclose(detector._mean[0], 0, atol=0.2)
+    # Once the spread is learned, the usual moods are no longer anomalies
+    assert all(score > 0 for score in scores[-20:])
+
+
+def test_outlier_burst_is_clipped_after_warmup():
+    rng = np.random.default_rng(0)
+    detector = StreamingAnomalyDetector()
+    detector.train(pd.DataFrame({'s': rng.normal(0, 1, 200)}))
+    for _ in range(5):
+        assert detector.observe({'s': 1000.0}) < 0
+    assert abs(detector._mean[0]) < 2
@@ -0,0 +1,90 @@
+import os
+
+import pandas as pd
+import pytest
+
+import columnar_store
+
+pytestmark = pytest.mark.skipif(not columnar_store.is_available(), reason="pyarrow is not installed")
+
+
+class Crash(Exception):
+    pass
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    dataset_dir = str(tmp_path / 'activity')
+    start = pd.Timestamp('2024-01-01 09:00')
+    for part in range(6):
+        timestamps = pd.date_range(start + pd.Timedelta(minutes=part), periods=5, freq='10s')
+        columnar_store.append(dataset_dir, pd.DataFrame({'Timestamp': timestamps, 'ActiveInfo': f"App {part}"}), 'activity')
+    return dataset_dir
+
+
+def _rows(dataset_dir):
+    df = columnar_store.read(dataset_dir)
+    return list(zip(df['Timestamp'], df['ActiveInfo'].astype(str)))
+
+
+def _crash_on(monkeypatch, name, after=0):
+    """Makes columnar_store's os.<name> raise Crash from its (after + 1)-th call on a Parquet file."""
+    real = getattr(os, name)
+    calls = []
+
+    def crashing(*args):
+        if str(args[-1]).endswith('.parquet'):
+            calls.append(args)
+            if len(calls) > after:
+                raise Crash()
+        return real(*args)
+    monkeypatch.setattr(columnar_store.os, name, crashing)
+
+
+def _assert_recovers(dataset_dir, before, monkeypatch):
+    assert _rows(dataset_dir) == before # Readers see every row exactly once while the compaction is pending
+    monkeypatch.undo()
+    columnar_store.compact(dataset_dir)
+    assert _rows(dataset_dir) == before
+    assert not os.path.exists(os.path.join(dataset_dir, columnar_store.COMPACTION_MANIFEST))
+    assert not [name for name in os.listdir(dataset_dir) if name.endswith('.tmp')]
+    assert len(columnar_store.data_files(dataset_dir)) == 1
+
+
+def test_compaction_merges_parts_into_one_chunk(dataset):
+    before = _rows(dataset)
+    columnar_store.compact(dataset)
+
+    assert _rows(dataset) == before
+    assert [os.path.basename(f)[:6] for f in columnar_store.data_files(dataset)] == ['chunk-']
+
+
+def test_crash_before_the_chunk_is_published(dataset, monkeypatch):
+    before = _rows(dataset)
+    _crash_on(monkeypatch, 'replace')
+    with pytest.raises(Crash):
+        columnar_store.compact(dataset)
+
+    assert os.path.exists(os.path.join(dataset, columnar_store.COMPACTION_MANIFEST))
+    _assert_recovers(dataset, before, monkeypatch)
+
+
+def test_crash_after_the_chunk_is_published(dataset, monkeypatch):
+    before = _rows(dataset)
+    _crash_on(monkeypatch, 'remove')
+    with pytest.raises(Crash):
+        columnar_store.compact(dataset)
+
+    assert len(columnar_store._chunk_files(dataset)) == 1
+    assert len(columnar_store._part_files(dataset)) == 6 # Sources not removed yet
+    _assert_recovers(dataset, before, monkeypatch)
+
+
+def test_crash_while_removing_the_replaced_parts(dataset, monkeypatch):
+    before = _rows(dataset)
+    _crash_on(monkeypatch, 'remove', after=3)
+    with pytest.raises(Crash):
+        columnar_store.compact(dataset)
+
+    assert len(columnar_store._part_files(dataset)) == 3
+    _assert_recovers(dataset, before, monkeypatch)
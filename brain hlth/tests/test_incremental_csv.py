@@ -0,0 +1,85 @@
+import os
+
+import pandas as pd
+import pytest
+
+import data_manager
+
+HEADER = "Timestamp,ColorChoice,Emotion,SentimentScore,OptionalText\n"
+
+
+@pytest.fixture
+def subjective_file(tmp_path):
+    return str(tmp_path / data_manager.SUBJECTIVE_FILE)
+
+
+@pytest.fixture
+def reader():
+    return data_manager.IncrementalCsvReader(data_manager._normalize_subjective)
+
+
+def _write(path, text, mode='a'):
+    with open(path, mode, newline='') as f:
+        f.write(text)
+
+
+def _row(hour, text=''):
+    return f"2024-01-01T{hour:02d}:00:00,Blue,Calm,0.5,{text}\n"
+
+
+def _assert_parsed(df, path):
+    # Concatenated chunks may infer a different (but equivalent) column dtype than one full parse
+    expected = data_manager._normalize_subjective(pd.read_csv(path))
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+
+
+def test_appended_rows_match_a_full_parse(subjective_file, reader):
+    _write(subjective_file, HEADER + _row(8), mode='w')
+    reader.read(subjective_file)
+    _write(subjective_file, _row(9) + _row(10))
+
+    _assert_parsed(reader.read(subjective_file), subjective_file)
+    assert reader.row_count == 3
+
+
+def test_half_written_row_waits_for_its_newline(subjective_file, reader):
+    _write(subjective_file, HEADER + _row(8), mode='w')
+    reader.read(subjective_file)
+    half = _row(9)
+    _write(subjective_file, half[:15])
+
+    assert len(reader.read(subjective_file)) == 1
+    _write(subjective_file, half[15:])
+    _assert_parsed(reader.read(subjective_file), subjective_file)
+
+
+def test_multiline_quoted_field(subjective_file, reader):
+    _write(subjective_file, HEADER + _row(8), mode='w')
+    reader.read(subjective_file)
+    _write(subjective_file, _row(9, '"first line'))
+
+    assert len(reader.read(subjective_file)) == 1 # The quoted field is still open
+    _write(subjective_file, 'second line"\n' + _row(10))
+    df = reader.read(subjective_file)
+    _assert_parsed(df, subjective_file)
+    assert df['OptionalText'].iloc[1] == "first line\nsecond line"
+
+
+def test_rewritten_file_is_reloaded(subjective_file, reader):
+    _write(subjective_file, HEADER + _row(8) + _row(9), mode='w')
+    reader.read(subjective_file)
+    _write(subjective_file, HEADER + _row(8, 'x') + _row(9) + _row(10), mode='w')
+    _assert_parsed(reader.read(subjective_file), subjective_file)
+
+    _write(subjective_file, HEADER + _row(11), mode='w') # Truncated
+    _assert_parsed(reader.read(subjective_file), subjective_file)
+    assert reader.row_count == 1
+
+
+def test_missing_and_empty_files(subjective_file, reader):
+    assert reader.read(subjective_file) is None
+    _write(subjective_file, '', mode='w')
+    with pytest.raises(pd.errors.EmptyDataError):
+        reader.read(subjective_file)
+    os.remove(subjective_file)
+    assert reader.read(subjective_file) is None
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import data_manager
+
+
+@pytest.fixture
+def partitioned(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(data_manager, 'STORAGE_BACKEND', 'csv')
+    monkeypatch.setattr(data_manager, 'PARTITION_BY', 'month')
+    monkeypatch.setattr(data_manager, 'PARTITION_ROOT', 'partitions')
+    monkeypatch.setattr(data_manager, '_partition_readers', OrderedDict())
+    for month in range(1, 7):
+        for day in (1, 15):
+            data_manager.save_subjective_data(datetime(2024, month, day, 9), 'Blue', 'Calm', month / 10)
+    return tmp_path
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """Paths parsed by any IncrementalCsvReader."""
+    paths = []
+    read = data_manager.IncrementalCsvReader.read
+
+    def spy(self, path):
+        paths.append(path)
+        return read(self, path)
+    monkeypatch.setattr(data_manager.IncrementalCsvReader, 'read', spy)
+    return paths
+
+
+def _names(paths):
+    return [path.replace('\\', '/').rsplit('/', 1)[-1] for path in paths]
+
+
+def test_rows_are_rotated_into_month_files(partitioned):
+    assert _names(data_manager.list_partitions('subjective')) == [f"2024-{m:02d}.csv" for m in range(1, 7)]
+    assert len(pd.read_csv(partitioned / 'partitions' / 'subjective' / '2024-03.csv')) == 2
+
+
+def test_range_load_only_opens_overlapping_partitions(partitioned, opened):
+    df = data_manager.load_subjective_data(start='2024-02-10', end='2024-04-01')
+
+    assert _names(opened) == ['2024-02.csv', '2024-03.csv']
+    assert list(df['Timestamp']) == [pd.Timestamp(2024, 2, 15, 9), pd.Timestamp(2024, 3, 1, 9), pd.Timestamp(2024, 3, 15, 9)]
+
+
+def test_range_load_matches_filtering_everything(partitioned):
+    everything = data_manager.load_subjective_data()
+    window = data_manager.load_subjective_data(start='2024-01-15', end='2024-05-15 09:00')
+    expected = everything[(everything['Timestamp'] >= '2024-01-15') & (everything['Timestamp'] < '2024-05-15 09:00')]
+
+    assert len(everything) == 12
+    pd.testing.assert_frame_equal(window.reset_index(drop=True), expected.reset_index(drop=True))
+
+
+def test_recent_entries_stop_at_the_newest_partitions(partitioned, opened):
+    df = data_manager.load_recent_subjective_data(3)
+
+    assert _names(opened) == ['2024-06.csv', '2024-05.csv']
+    assert list(df['SentimentScore']) == [0.5, 0.6, 0.6]
+
+
+def test_reader_cache_keeps_the_most_recently_used_partitions(partitioned, monkeypatch):
+    monkeypatch.setattr(data_manager, 'PARTITION_READER_CACHE_SIZE', 2)
+    data_manager.load_subjective_data(start='2024-01-01', end='2024-03-01') # 01, 02
+    data_manager.load_subjective_data(start='2024-01-01', end='2024-02-01') # 01 becomes most recent
+    data_manager.load_subjective_data(start='2024-04-01', end='2024-05-01') # 04 evicts 02
+
+    assert _names(data_manager._partition_readers) == ['2024-01.csv', '2024-04.csv']
+
+    data_manager.load_subjective_data()
+    assert len(data_manager._partition_readers) == 2
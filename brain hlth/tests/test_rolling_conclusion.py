@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import data_manager
+from conclusion_engine import RollingConclusion
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(data_manager, 'STORAGE_BACKEND', 'csv')
+    monkeypatch.setattr(data_manager, 'PARTITION_BY', None)
+    monkeypatch.setattr(data_manager, '_subjective_reader', data_manager.IncrementalCsvReader(data_manager._normalize_subjective))
+    return tmp_path
+
+
+@pytest.fixture
+def engine():
+    engine = RollingConclusion(window=3)
+    yield engine
+    engine.close()
+
+
+def _save(start, scores):
+    for i, score in enumerate(scores):
+        data_manager.save_subjective_data(start + timedelta(hours=i), 'Blue', 'Calm', score)
+
+
+def _recomputed(window):
+    """The conclusion's input computed from scratch: mean of the newest `window` scored entries."""
+    scores = data_manager.load_subjective_data()['SentimentScore'].dropna().tail(window)
+    return len(scores), (scores.mean() if len(scores) else None)
+
+
+def _assert_matches(engine):
+    count, average = _recomputed(engine.window)
+    assert engine.count == count
+    assert engine.average() == pytest.approx(average)
+
+
+def test_empty_history(data_dir, engine):
+    engine.seed()
+    assert engine.count == 0
+    assert engine.average() is None
+
+
+def test_saves_after_seeding_match_a_full_recompute(data_dir, engine):
+    _save(datetime(2024, 1, 1), [0.2, -0.4])
+    engine.seed()
+    _assert_matches(engine)
+
+    start = datetime(2024, 1, 2)
+    for i, score in enumerate([0.9, None, -0.7, 0.1, 0.3, float('nan'), -1.0]):
+        _save(start + timedelta(hours=i), [score])
+        _assert_matches(engine)
+
+
+def test_entries_saved_before_seeding_are_counted_once(data_dir, engine):
+    _save(datetime(2024, 1, 1), [0.5])
+    engine.push(0.5, datetime(2024, 1, 1)) # Seen through another path before seeding
+    engine.seed()
+    _save(datetime(2024, 1, 2), [0.1, -0.3])
+
+    _assert_matches(engine)
@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from startup_benchmark import HEAVY_MODULES
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _heavy_modules_after(statement):
+    """HEAVY_MODULES loaded by running `statement` in a fresh interpreter."""
+    code = f"import sys\n{statement}\nprint(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=APP_DIR, capture_output=True, text=True, check=True)
+    return [name for name in result.stdout.strip().split(',') if name]
+
+
+def test_mood_mapping_import_is_cheap():
+    # mood_input_window imports hsb_mapping at module level, so it is loaded before the first paint
+    assert _heavy_modules_after("import hsb_mapping") == []
+
+
+def test_app_import_does_not_load_pandas():
+    pytest.importorskip('customtkinter')
+    assert _heavy_modules_after("import app") == []
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import data_manager
+import weekly_aggregates
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(data_manager, 'STORAGE_BACKEND', 'csv')
+    monkeypatch.setattr(data_manager, 'PARTITION_BY', None)
+    monkeypatch.setattr(data_manager, '_subjective_reader', data_manager.IncrementalCsvReader(data_manager._normalize_subjective))
+    return tmp_path
+
+
+@pytest.fixture
+def table(data_dir):
+    table = weekly_aggregates.WeeklySentimentAggregates()
+    yield table
+    table.close()
+
+
+# Around the Sunday/Monday boundary that separates resample('W') bins, plus gaps and unscored entries
+TIMESTAMPS = [datetime(2024, 1, 7, 23, 59, 59), datetime(2024, 1, 8), datetime(2024, 1, 3, 12), datetime(2024, 1, 14),
+              datetime(2024, 2, 1, 8), datetime(2024, 2, 4, 20), datetime(2024, 2, 5, 0, 0, 1)]
+SCORES = [0.5, -0.25, 1.0, None, 0.75, -1.0, 0.1]
+
+
+def _resampled():
+    df = data_manager.load_subjective_data()
+    return df.set_index('Timestamp')['SentimentScore'].resample('W').mean().dropna()
+
+
+def _assert_matches(table):
+    version, total, means = table.snapshot()
+    expected = _resampled()
+    pd.testing.assert_series_equal(means, expected, check_names=False, check_freq=False, check_index_type=False)
+    assert total == int(data_manager.load_subjective_data()['SentimentScore'].notna().sum())
+
+
+def test_week_end_matches_resample_labels():
+    assert weekly_aggregates.week_end(datetime(2024, 1, 7, 23, 59)) == pd.Timestamp(2024, 1, 7)
+    assert weekly_aggregates.week_end(datetime(2024, 1, 8)) == pd.Timestamp(2024, 1, 14)
+
+
+def test_saves_match_resample(table):
+    data_manager.save_subjective_data(datetime(2023, 12, 30), 'Blue', 'Calm', 0.2)
+    _assert_matches(table) # Built from disk on first use
+    for timestamp, score in zip(TIMESTAMPS, SCORES):
+        data_manager.save_subjective_data(timestamp, 'Blue', 'Calm', score)
+        _assert_matches(table)
+
+
+def test_persisted_table_is_reused_until_the_data_changes(table, monkeypatch):
+    for timestamp, score in zip(TIMESTAMPS, SCORES):
+        data_manager.save_subjective_data(timestamp, 'Blue', 'Calm', score)
+    _assert_matches(table)
+    table.close()
+
+    reloaded = weekly_aggregates.WeeklySentimentAggregates()
+    monkeypatch.setattr(reloaded, '_rebuild_locked', lambda: pytest.fail("an up-to-date table was rebuilt"))
+    _assert_matches(reloaded)
+    reloaded.close()
+
+    # Rewritten behind the table's back: the stored signature no longer matches, so it is rebuilt
+    df = pd.read_csv(data_manager.SUBJECTIVE_FILE)
+    df.loc[0, 'SentimentScore'] = -0.5
+    df.to_csv(data_manager.SUBJECTIVE_FILE, index=False)
+    rebuilt = weekly_aggregates.WeeklySentimentAggregates()
+    _assert_matches(rebuilt)
+    rebuilt.close()
+
+
+def test_saves_spanning_months(table):
+    start = datetime(2024, 3, 1)
+    for i in range(90):
+        data_manager.save_subjective_data(start + timedelta(hours=17 * i), 'Blue', 'Calm', (i % 7 - 3) / 3)
+    _assert_matches(table)
@@ -0,0 +1,237 @@
+"""
+Accelerated-clock soak run of ActivityTracker's ingest path. The real tracking loop and activity
+writer run against SimulatedClock, whose wait() times out immediately and moves simulated time
+forward (the loop waits on its stop event through the clock), so months of 10-second samples are written in seconds. Real time spent in the loop
+(probe, buffering, file writes) is added to simulated time as well, so loop drift is measured as
+on a real machine. Reports:
+    throughput    samples written per real second
+    add latency   p50/p99/max of the per-sample writer.add() call (includes the batch flushes)
+    file growth   bytes on disk per sample and per simulated day, projected to a year
+    loop drift    how far the last sample lags the ideal schedule (start + n * interval), and
+                  how often the loop woke up per sample
+    memory        resident memory growth over the run
+
+    python tracker_soak.py [--days 90] [--format samples|sessions] [--fsync] [--out DIR] [--json FILE]
+
+Data is written to --out (default: a temporary directory that is removed afterwards).
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+
+import numpy as np
+import psutil
+import data_manager
+import metrics
+from activity_tracker import ActivityTracker
+
+SOAK_APPLICATIONS = ["Visual Studio Code", "Google Chrome", "Microsoft Outlook", "Slack", "Microsoft Teams",
+                     "Microsoft Word", "Microsoft Excel", "Windows Terminal", "Spotify", "File Explorer"]
+
+
+class SimulatedClock:
+    """
+    Clock for ActivityTracker (now()/monotonic()/wait()) that runs from `start` for `duration`
+    seconds of simulated time. A wait that times out advances simulated time instantly; real time
+    elapsed between calls (scaled by work_scale) is added too. Once the duration is used up,
+    on_end() is called from the waiting thread and `finished` is set. `waits` counts the wakeups.
+    """
+    def __init__(self, start, duration, on_end=None, work_scale=1.0):
+        self.start = start
+        self.duration = duration
+        self.on_end = on_end
+        self.work_scale = work_scale
+        self.finished = threading.Event()
+        self.waits = 0
+        self._elapsed = 0.0 # Simulated seconds since start
+        self._real_mark = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _advance_work_locked(self):
+        real_now = time.perf_counter()
+        self._elapsed += (real_now - self._real_mark) * self.work_scale
+        self._real_mark = real_now
+
+    def now(self):
+        return self.start + timedelta(seconds=self.monotonic())
+
+    def monotonic(self):
+        with self._lock:
+            self._advance_work_locked()
+            return self._elapsed
+
+    def wait(self, event, timeout):
+        with self._lock:
+            self.waits += 1
+            self._advance_work_locked()
+            if event.is_set():
+                return True
+            self._elapsed += max(timeout, 0)
+            ended = self._elapsed >= self.duration and not self.finished.is_set()
+            if ended:
+                self.finished.set()
+        if ended and self.on_end is not None:
+            self.on_end()
+        return event.is_set()
+
+
+class SoakProbe:
+    """Seeded stand-in for the foreground window: applications used in runs of mean_run samples."""
+    def __init__(self, applications=SOAK_APPLICATIONS, mean_run=30, seed=0):
+        self.applications = applications
+        self.switch_probability = 1.0 / mean_run
+        self._random = random.Random(seed)
+        self._current = self._random.choice(applications)
+
+    def __call__(self):
+        if self._random.random() < self.switch_probability:
+            self._current = self._random.choice(self.applications)
+        return self._current
+
+
+class TimedWriter:
+    """Wraps an activity writer, timing every add() and recording the data size once per simulated day."""
+    def __init__(self, writer, data_dir):
+        self.writer = writer
+        self.data_dir = data_dir
+        self.latencies = array('d') # Seconds per add(), compact even for millions of samples
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.daily_sizes = [] # (simulated day index, bytes on disk)
+        self._day = None
+
+    def add(self, timestamp, active_info):
+        started = time.perf_counter()
+        self.writer.add(timestamp, active_info)
+        self.latencies.append(time.perf_counter() - started)
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+        day = (timestamp - self.first_timestamp).days
+        if day != self._day:
+            self._day = day
+            self.daily_sizes.append((day, data_size(self.data_dir)))
+
+    def flush(self):
+        return self.writer.flush()
+
+    def set_interval(self, seconds):
+        if hasattr(self.writer, 'set_interval'):
+            self.writer.set_interval(seconds)
+
+    def pending_count(self):
+        return self.writer.pending_count()
+
+
+def data_size(path):
+    """Total bytes of all files under path."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass # Replaced between listing and stat
+    return total
+
+
+def run_soak(days, data_dir, interval=10, fsync=False, seed=0, work_scale=1.0):
+    """Simulates `days` of tracking into data_dir (the working directory during the run). Returns the report dict."""
+    previous_dir = os.getcwd()
+    os.makedirs(data_dir, exist_ok=True)
+    os.chdir(data_dir) # data_manager resolves its data files relative to the working directory
+    try:
+        clock = SimulatedClock(datetime(2024, 1, 1, 8, 0, 0), days * 86400, work_scale=work_scale)
+        writer = TimedWriter(data_manager.create_activity_writer(interval=interval, fsync=fsync, monotonic=clock.monotonic),
+                             data_dir)
+        tracker = ActivityTracker(clock=clock, probe=SoakProbe(seed=seed), writer=writer, sleep_interval=interval)
+        clock.on_end = tracker.request_stop
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+        started = time.perf_counter()
+        tracker.start_tracking()
+        clock.finished.wait()
+        tracker.stop_tracking() # Joins the loop and flushes what is still buffered
+        real_seconds = time.perf_counter() - started
+        rss_after = process.memory_info().rss
+        final_size = data_size(data_dir)
+    finally:
+        os.chdir(previous_dir)
+
+    samples = len(writer.latencies)
+    latencies = np.frombuffer(writer.latencies, dtype=np.float64) * 1e6 # Microseconds
+    simulated_days = (writer.last_timestamp - writer.first_timestamp).total_seconds() / 86400 if samples > 1 else 0.0
+    drift = (writer.last_timestamp - writer.first_timestamp).total_seconds() - (samples - 1) * interval if samples > 1 else 0.0
+    return {
+        'format': data_manager.ACTIVITY_FORMAT,
+        'fsync': fsync,
+        'simulated_days': round(simulated_days, 3),
+        'samples': samples,
+        'real_seconds': round(real_seconds, 3),
+        'acceleration': round(simulated_days * 86400 / real_seconds) if real_seconds else None,
+        'samples_per_second': round(samples / real_seconds) if real_seconds else None,
+        'add_latency_us': {'p50': round(float(np.percentile(latencies, 50)), 1),
+                           'p99': round(float(np.percentile(latencies, 99)), 1),
+                           'max': round(float(latencies.max()), 1)} if samples else None,
+        'bytes_on_disk': final_size,
+        'bytes_per_sample': round(final_size / samples, 1) if samples else None,
+        'mb_per_day': round(final_size / 1e6 / simulated_days, 3) if simulated_days else None,
+        'projected_mb_per_year': round(final_size / 1e6 / simulated_days * 365, 1) if simulated_days else None,
+        'daily_sizes': writer.daily_sizes,
+        'wakeups_per_sample': round(clock.waits / samples, 3) if samples else None,
+        'drift_seconds': round(drift, 3),
+        'drift_seconds_per_day': round(drift / simulated_days, 3) if simulated_days else None,
+        'rss_growth_mb': round((rss_after - rss_before) / (1024 * 1024), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak-test ActivityTracker's write path on an accelerated clock.")
+    parser.add_argument('--days', type=float, default=90, help="Simulated days of tracking")
+    parser.add_argument('--interval', type=int, default=10, help="Seconds between samples")
+    parser.add_argument('--format', choices=['samples', 'sessions'], default=data_manager.ACTIVITY_FORMAT,
+                        help="data_manager.ACTIVITY_FORMAT to write")
+    parser.add_argument('--fsync', action='store_true', help="fsync after every flush")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the simulated application switches")
+    parser.add_argument('--work-scale', type=float, default=1.0,
+                        help="How much real loop time counts as simulated time (0 = ideal loop)")
+    parser.add_argument('--out', default=None, help="Data directory to write (default: temporary, removed afterwards)")
+    parser.add_argument('--json', default=None, help="Also write the full report (with daily sizes) to this file")
+    args = parser.parse_args(argv)
+
+    metrics.configure_logging()
+    data_manager.ACTIVITY_FORMAT = args.format
+    data_dir = os.path.abspath(args.out) if args.out else tempfile.mkdtemp(prefix='tracker_soak_')
+    try:
+        report = run_soak(args.days, data_dir, args.interval, args.fsync, args.seed, args.work_scale)
+    finally:
+        if not args.out:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    latency = report['add_latency_us'] or {'p50': 0, 'p99': 0, 'max': 0}
+    print(f"Simulated {report['simulated_days']} days ({report['samples']} samples, format={report['format']}, "
+          f"fsync={report['fsync']}) in {report['real_seconds']} s ({report['acceleration']}x real time)")
+    print(f"Throughput:  {report['samples_per_second']} samples/s")
+    print(f"add latency: p50 {latency['p50']} us, p99 {latency['p99']} us, max {latency['max']} us")
+    print(f"On disk:     {report['bytes_on_disk'] / 1e6:.1f} MB, {report['bytes_per_sample']} bytes/sample, "
+          f"{report['mb_per_day']} MB/day, ~{report['projected_mb_per_year']} MB/year")
+    print(f"Loop drift:  {report['drift_seconds']} s total, {report['drift_seconds_per_day']} s/day, "
+          f"{report['wakeups_per_sample']} wakeups/sample")
+    print(f"Memory:      {report['rss_growth_mb']} MB resident growth")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
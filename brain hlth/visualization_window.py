@@ -1,8 +1,13 @@
 import customtkinter as ctk
 import tkinter as tk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import insights_generator
-import matplotlib.pyplot as plt # Import matplotlib to close figures
+import insights_generator as insights_generator_module
+import logging
+import time
+import metrics
+from task_runner import LatestTaskRunner # Plot data is computed off the main thread
+
+logger = logging.getLogger(__name__)
 
 class VisualizationWindow(ctk.CTkToplevel):
     """
@@ -10,7 +15,8 @@ class VisualizationWindow(ctk.CTkToplevel):
     Minimalist version with only the weekly plot, with a Back button.
     Ensures the correct method from InsightsGenerator is called.
     """
-    def __init__(self, master=None):
+    def __init__(self, master=None, insights_generator=None):
+        self._opened_at = time.perf_counter() # For the open latency printed once the plot is shown
         super().__init__(master)
 
         self.title("Weekly Mood Insights") # Updated title to Weekly
@@ -19,7 +25,8 @@ class VisualizationWindow(ctk.CTkToplevel):
         self.transient(master)
         self.grab_set()
 
-        self.insights_generator = insights_generator.InsightsGenerator()
+        # Reuse the caller's generator (and its shared data) when given one
+        self.insights_generator = insights_generator or insights_generator_module.InsightsGenerator()
 
         # --- Layout ---
         self.frame = ctk.CTkFrame(master=self)
@@ -45,31 +52,66 @@ class VisualizationWindow(ctk.CTkToplevel):
         # We will embed the FigureCanvasTkAgg widget directly into this frame
         self.sentiment_canvas_widget = None # To hold the Matplotlib canvas widget
 
+        # Shown while the plot data is computed in the background
+        self.status_label = ctk.CTkLabel(master=self.plot_area_frame, text="Computing weekly insights...")
+        self.status_label.grid(row=0, column=0, sticky="nsew")
+        self.task_runner = LatestTaskRunner(self, name="VisualizationWorker")
+
         # --- Initial Plot Display ---
         self.update_plot() # Display the initial weekly plot
 
+        # Re-plot when new mood entries are saved while the window is open
+        self.insights_generator.repository.subscribe(self.on_data_changed, kinds=('subjective',))
+        self.bind("<Destroy>", self.on_destroy, add="+")
+
+
+    def on_data_changed(self, kind, version):
+        """Repository subscriber: redraws the plot with the new data."""
+        self.after(0, self.update_plot)
+
+    def on_destroy(self, event):
+        """Stops listening for data changes once the window is gone."""
+        if event.widget is self:
+            self.insights_generator.repository.unsubscribe(self.on_data_changed)
+            self.task_runner.shutdown()
+
 
     def update_plot(self):
-        """Generates and displays the weekly sentiment plot."""
-        print("VisualizationWindow: Updating weekly sentiment plot.")
-
-        # Clear previous plot and destroy old canvas widget
-        if self.sentiment_canvas_widget:
-            self.sentiment_canvas_widget.get_tk_widget().grid_forget()
-            self.sentiment_canvas_widget.get_tk_widget().destroy()
-            self.sentiment_canvas_widget = None
-
-        # Generate the weekly sentiment plot (CALLING THE CORRECTED METHOD)
-        sentiment_fig = self.insights_generator.generate_weekly_sentiment_plot() # CORRECTED METHOD CALL
-
-        # Embed the sentiment plot on its dedicated grid cell
-        self.sentiment_canvas_widget = FigureCanvasTkAgg(sentiment_fig, master=self.plot_area_frame)
-        self.sentiment_canvas_widget.draw()
-        # Use grid with sticky="nsew" to make it fill the cell
-        self.sentiment_canvas_widget.get_tk_widget().grid(row=0, column=0, sticky="nsew")
-
-        # Close the Matplotlib figure to free up memory
-        plt.close(sentiment_fig)
+        """Recomputes the weekly plot data on the worker thread; show_plot() draws it when done."""
+        logger.debug("Updating weekly sentiment plot.")
+        self.task_runner.submit("weekly_plot", self.insights_generator.get_weekly_sentiment_data,
+                                on_done=self.show_plot, on_error=self.show_plot_error)
+
+    def show_plot_error(self, error):
+        """Worker callback (on the main loop): the plot data could not be computed."""
+        self.status_label.configure(text=f"Could not compute weekly insights: {error}")
+        self.status_label.grid(row=0, column=0, sticky="nsew")
+
+    def show_plot(self, weekly_data):
+        """
+        Worker callback (on the main loop): shows the weekly figure for the computed data.
+        The generator caches the figure per data version, so the canvas is created once per window
+        and only redrawn when the data actually changed.
+        """
+        self.status_label.grid_forget()
+
+        sentiment_fig, changed = self.insights_generator.get_weekly_sentiment_figure(weekly_data)
+
+        if self.sentiment_canvas_widget is None:
+            # Embed the sentiment plot on its dedicated grid cell
+            self.sentiment_canvas_widget = FigureCanvasTkAgg(sentiment_fig, master=self.plot_area_frame)
+            self.sentiment_canvas_widget.draw()
+            # Use grid with sticky="nsew" to make it fill the cell
+            self.sentiment_canvas_widget.get_tk_widget().grid(row=0, column=0, sticky="nsew")
+        elif changed:
+            self.sentiment_canvas_widget.draw_idle() # Re-render with the moved line on the next idle
+        # The figure is cached by the generator for the next window, so it is not closed here
+
+        if self._opened_at is not None:
+            open_seconds = time.perf_counter() - self._opened_at
+            metrics.record('ui.weekly_plot_open', open_seconds)
+            logger.info("Plot shown %.0f ms after opening.", open_seconds * 1000)
+            self._opened_at = None
 
 # Example usage (for testing independently - requires dummy subjective_data.csv with SentimentScore)
 # if __name__ == "__main__":
@@ -0,0 +1,154 @@
+import json
+import logging
+import math
+import os
+import threading
+from datetime import datetime
+import pandas as pd
+import data_manager
+
+logger = logging.getLogger(__name__)
+
+WEEKLY_SENTIMENT_FILE = 'weekly_sentiment.json'
+
+# Weeks end on Sunday, matching pandas' resample('W') bins and labels
+_WEEK_END = pd.offsets.Week(weekday=6)
+
+
+def week_end(timestamp):
+    """The Sunday that labels the resample('W') bin containing timestamp."""
+    return _WEEK_END.rollforward(pd.Timestamp(timestamp).normalize())
+
+
+class WeeklySentimentAggregates:
+    """
+    Persisted materialized table of (week, sentiment sum, entry count).
+    New entries update their week in place from data_manager's write notifications, so the weekly
+    plot never has to resample the full history. The table stores the storage_signature() of the
+    subjective data it reflects; if the data changed behind its back it is rebuilt on load.
+    """
+    def __init__(self, file_path=None):
+        """file_path: Where the table is persisted. Defaults to WEEKLY_SENTIMENT_FILE."""
+        self.file_path = file_path or WEEKLY_SENTIMENT_FILE
+        self._weeks = {} # week end Timestamp -> [sum, count]
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._version = 0 # Bumped on every change, so consumers (e.g. the plot cache) can tell if anything moved
+        data_manager.add_write_listener(self._on_write)
+
+    def close(self):
+        """Stops following new writes."""
+        data_manager.remove_write_listener(self._on_write)
+
+    def _ensure_loaded(self):
+        """Loads the persisted table, rebuilding it if it is missing or out of date. Caller holds the lock."""
+        if self._loaded:
+            return
+        try:
+            with open(self.file_path, 'r') as f:
+                saved = json.load(f)
+            if saved.get('signature') == data_manager.storage_signature('subjective'):
+                self._weeks = {pd.Timestamp(week): [total, count] for week, total, count in saved['weeks']}
+                self._loaded = True
+                return
+            logger.info("Stored table is out of date, rebuilding.")
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, ValueError):
+            pass
+        self._rebuild_locked()
+
+    def rebuild(self):
+        """Recomputes the whole table from the subjective data and persists it."""
+        with self._lock:
+            self._rebuild_locked()
+
+    def _rebuild_locked(self):
+        df = data_manager.load_subjective_data(columns=['Timestamp', 'SentimentScore'])
+        scores = pd.to_numeric(df['SentimentScore'], errors='coerce')
+        valid = scores.notna()
+        self._weeks = {}
+        if valid.any():
+            weekly = pd.Series(scores[valid].to_numpy(dtype=float), index=pd.DatetimeIndex(df['Timestamp'][valid])) \
+                       .resample('W').agg(['sum', 'count'])
+            weekly = weekly[weekly['count'] > 0]
+            self._weeks = {week: [float(row['sum']), int(row['count'])] for week, row in weekly.iterrows()}
+        self._loaded = True
+        self._version += 1
+        self._save_locked()
+
+    def _save_locked(self):
+        saved = {
+            'signature': data_manager.storage_signature('subjective'),
+            'weeks': [[week.isoformat(), total, count] for week, (total, count) in sorted(self._weeks.items())],
+        }
+        tmp_path = self.file_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(saved, f)
+        os.replace(tmp_path, self.file_path) # Never leave a half-written table behind
+
+    def add(self, timestamp, score):
+        """Adds one entry to its week. NaN/None scores are ignored (the weekly mean drops them too)."""
+        with self._lock:
+            self._ensure_loaded()
+            if self._add_locked(timestamp, score):
+                self._save_locked()
+
+    def _add_locked(self, timestamp, score):
+        try:
+            score = float(score)
+        except (TypeError, ValueError):
+            return False
+        if math.isnan(score):
+            return False
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        bucket = self._weeks.setdefault(week_end(timestamp), [0.0, 0])
+        bucket[0] += score
+        bucket[1] += 1
+        self._version += 1
+        return True
+
+    def _on_write(self, kind, records):
+        """data_manager write listener."""
+        if kind != 'subjective':
+            return
+        with self._lock:
+            if not self._loaded:
+                return # The table is built from disk (including these rows) on first use
+            for record in records:
+                self._add_locked(record.get('Timestamp'), record.get('SentimentScore'))
+            # Always re-save: the data's signature changed even if the row had no usable score
+            self._save_locked()
+
+    def weekly_means(self):
+        """Average sentiment per week as a Series indexed by week end (like resample('W').mean().dropna())."""
+        return self.snapshot()[2]
+
+    def snapshot(self):
+        """Consistent (version, total_count(), weekly_means()) triple, read under one lock."""
+        with self._lock:
+            self._ensure_loaded()
+            weeks = sorted(self._weeks.items())
+            version = self._version
+            total = sum(count for _, (_, count) in weeks)
+        means = pd.Series([t / count for _, (t, count) in weeks],
+                          index=pd.DatetimeIndex([week for week, _ in weeks]), dtype=float)
+        return version, total, means
+
+    def total_count(self):
+        """Number of scored entries in the table."""
+        with self._lock:
+            self._ensure_loaded()
+            return sum(count for _, count in self._weeks.values())
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_weekly_aggregates():
+    """Returns the process-wide table, creating it on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = WeeklySentimentAggregates()
+        return _shared